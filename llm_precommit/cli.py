@@ -2,13 +2,32 @@
 """
 Command-line interface for LLM pre-commit hooks.
 """
+import io
 import os
 import sys
+import time
+import logging
 import argparse
-from typing import List, Optional
+import contextlib
+from typing import Any, Dict, List, Optional
 
+from llm_precommit.constants import (
+    DEFAULT_HOOK_TEMPLATE,
+    DEFAULT_LOG_FORMAT,
+    DEFAULT_WATCH_DEBOUNCE_SECONDS,
+    DEFAULT_WATCH_INTERVAL_SECONDS,
+)
 from llm_precommit.utils.config import load_config, create_default_config_file
-from llm_precommit.hooks.llm_code_review import main as run_code_review
+from llm_precommit.utils.git_utils import get_git_path, get_staged_files
+from llm_precommit.utils.logging_utils import setup_logging
+from llm_precommit.utils.output_utils import print_summary
+from llm_precommit.utils.result_sink import ResultSink
+from llm_precommit.utils.review_cache import create_review_cache
+from llm_precommit.utils.sharding import merge_results_json, write_results_json
+from llm_precommit.utils.watch import IndexWatcher
+from llm_precommit.hooks.llm_code_review import analyze_files, get_api_key, main as run_code_review
+
+logger = logging.getLogger(__name__)
 
 
 def install_hook(args) -> int:
@@ -25,31 +44,30 @@ def install_hook(args) -> int:
         # Get the git hooks directory
         hooks_dir = os.path.join(os.getcwd(), ".git", "hooks")
         if not os.path.isdir(hooks_dir):
-            print(f"Error: Git hooks directory not found at {hooks_dir}")
-            print("Are you in a git repository?")
+            logger.error(f"Error: Git hooks directory not found at {hooks_dir}")
+            logger.error("Are you in a git repository?")
             return 1
         
         # Create the pre-commit hook file
         hook_path = os.path.join(hooks_dir, "pre-commit")
         
-        # Get the path to the llm_code_review.py script
+        # Get the path to the llm_code_review.py script and its precheck
         script_dir = os.path.dirname(os.path.abspath(__file__))
         hook_script_path = os.path.join(script_dir, "hooks", "llm_code_review.py")
+        precheck_script_path = os.path.join(script_dir, "hooks", "precheck.py")
         
         # Write the hook file
         with open(hook_path, 'w', encoding='utf-8') as f:
-            f.write(f"""#!/bin/sh
-# LLM pre-commit hook for code review
-# Auto-generated by llm-precommit
-
-{sys.executable} {hook_script_path} "$@"
-"""
-            )
+            f.write(DEFAULT_HOOK_TEMPLATE.format(
+                python_executable=sys.executable,
+                precheck_script_path=precheck_script_path,
+                hook_script_path=hook_script_path,
+            ))
         
         # Make the hook executable
         os.chmod(hook_path, 0o755)
         
-        print(f"Pre-commit hook installed at {hook_path}")
+        logger.info(f"Pre-commit hook installed at {hook_path}")
         
         # Create a default config file if it doesn't exist
         config_path = os.path.join(os.getcwd(), ".llm-precommit.yml")
@@ -59,7 +77,7 @@ def install_hook(args) -> int:
         return 0
     
     except Exception as e:
-        print(f"Error installing pre-commit hook: {e}")
+        logger.error(f"Error installing pre-commit hook: {e}")
         return 1
 
 
@@ -79,25 +97,25 @@ def uninstall_hook(args) -> int:
         
         # Check if the hook exists
         if not os.path.isfile(hook_path):
-            print("No pre-commit hook found.")
+            logger.info("No pre-commit hook found.")
             return 0
         
         # Check if the hook is our hook
         with open(hook_path, 'r', encoding='utf-8') as f:
             content = f.read()
             if "LLM pre-commit hook for code review" not in content:
-                print("The existing pre-commit hook was not created by llm-precommit.")
-                print(f"Please remove {hook_path} manually if you want to uninstall it.")
+                logger.error("The existing pre-commit hook was not created by llm-precommit.")
+                logger.error(f"Please remove {hook_path} manually if you want to uninstall it.")
                 return 1
         
         # Remove the hook
         os.remove(hook_path)
-        print(f"Pre-commit hook removed from {hook_path}")
+        logger.info(f"Pre-commit hook removed from {hook_path}")
         
         return 0
     
     except Exception as e:
-        print(f"Error uninstalling pre-commit hook: {e}")
+        logger.error(f"Error uninstalling pre-commit hook: {e}")
         return 1
 
 
@@ -114,8 +132,8 @@ def create_config(args) -> int:
     config_path = args.output or ".llm-precommit.yml"
     
     if os.path.exists(config_path) and not args.force:
-        print(f"Error: Config file already exists at {config_path}")
-        print("Use --force to overwrite.")
+        logger.error(f"Error: Config file already exists at {config_path}")
+        logger.error("Use --force to overwrite.")
         return 1
     
     success = create_default_config_file(config_path)
@@ -140,10 +158,114 @@ def run_review(args) -> int:
         sys.argv.append("--all")
     if args.verbose:
         sys.argv.append("--verbose")
+    if args.shard:
+        sys.argv.extend(["--shard", args.shard])
+    if args.output_json:
+        sys.argv.extend(["--output-json", args.output_json])
+    if args.revision_range:
+        sys.argv.extend(["--range", args.revision_range])
+    if args.metrics_file:
+        sys.argv.extend(["--metrics-file", args.metrics_file])
+    sys.argv.extend(args.filenames)
     
     return run_code_review()
 
 
+def merge_results(args) -> int:
+    """
+    Merge the JSON outputs of sharded runs into one summary and exit code.
+    
+    Args:
+        args: Command line arguments.
+        
+    Returns:
+        The highest exit code of the merged shards, or 1 on error.
+    """
+    try:
+        results, run_stats, exit_code = merge_results_json(args.inputs)
+    except Exception as e:
+        logger.error(f"Error merging results: {e}")
+        return 1
+    
+    if results:
+        summary = ResultSink()
+        for file_path, result in results.items():
+            summary.add(file_path, result)
+        print_summary(summary, run_stats)
+    else:
+        logger.info("No results to merge.")
+    
+    if args.output_json:
+        try:
+            write_results_json(args.output_json, results, run_stats, exit_code)
+        except Exception as e:
+            logger.error(f"Error writing merged results: {e}")
+            return 1
+    
+    return exit_code
+
+
+def watch_staged(args) -> int:
+    """
+    Review staged changes in the background as they are staged, so that the
+    pre-commit hook finds their results in the review cache.
+    
+    Args:
+        args: Command line arguments.
+        
+    Returns:
+        Exit code (0 for success, non-zero for failure).
+    """
+    config = load_config(args.config)
+    if args.verbose:
+        config["verbose"] = True
+    verbose = config.get("verbose", False)
+    setup_logging(
+        verbose=verbose,
+        log_file=config.get("log_file"),
+        log_format=config.get("log_format", DEFAULT_LOG_FORMAT),
+    )
+    
+    # The reviews are only useful to the hook through the cache
+    if not create_review_cache(config):
+        logger.error("Error: The review cache is disabled or unavailable; watch mode needs cache_enabled: true")
+        return 1
+    if not get_api_key(config):
+        return 1
+    index_path = get_git_path("index")
+    if not index_path:
+        logger.error("Error: Not in a git repository")
+        return 1
+    
+    def review_staged() -> None:
+        files = get_staged_files()
+        if not files:
+            return
+        run_stats: Dict[str, Any] = {}
+        # The hook prints the findings at commit time; only report progress here
+        output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+        with output:
+            summary = analyze_files(files, config, run_stats)
+        cache_stats = run_stats.get("review_cache", {})
+        logger.info(f"[{time.strftime('%H:%M:%S')}] Pre-reviewed {summary.files} staged files: "
+                    f"{cache_stats.get('misses', 0)} reviewed, {cache_stats.get('hits', 0)} already cached")
+    
+    if args.once:
+        review_staged()
+        return 0
+    
+    watcher = IndexWatcher(index_path, debounce_seconds=args.debounce)
+    logger.info(f"Watching {index_path} for staged changes (Ctrl+C to stop)")
+    try:
+        while True:
+            if watcher.poll():
+                review_staged()
+                watcher.mark_reviewed()
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        return 0
+
+
 def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
     """
     Parse command line arguments.
@@ -175,6 +297,29 @@ def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
     run_parser.add_argument("--config", help="Path to config file")
     run_parser.add_argument("--all", action="store_true", help="Check all files in repo, not just staged files")
     run_parser.add_argument("--verbose", action="store_true", help="Enable verbose output")
+    run_parser.add_argument("--shard", help="Only review shard i of N (e.g. 1/4), balanced by diff size")
+    run_parser.add_argument("--output-json", help="Write the results to a JSON file")
+    run_parser.add_argument("--range", dest="revision_range",
+                            help="Review the net changes of a commit range (base..head or base...head)")
+    run_parser.add_argument("--metrics-file", help="Add the run's metrics to a Prometheus textfile collector file")
+    run_parser.add_argument("filenames", nargs="*",
+                            help="Staged files to review (default: all staged files)")
+    
+    # Merge command
+    merge_parser = subparsers.add_parser("merge", help="Merge JSON outputs of sharded runs")
+    merge_parser.add_argument("inputs", nargs="+", help="Per-shard JSON output files")
+    merge_parser.add_argument("--output-json", help="Write the merged results to a JSON file")
+    
+    # Watch command
+    watch_parser = subparsers.add_parser("watch", help="Review staged changes in the background to warm the cache")
+    watch_parser.add_argument("--config", help="Path to config file")
+    watch_parser.add_argument("--verbose", action="store_true", help="Enable verbose output")
+    watch_parser.add_argument("--interval", type=float, default=DEFAULT_WATCH_INTERVAL_SECONDS,
+                              help="Seconds between checks of the git index")
+    watch_parser.add_argument("--debounce", type=float, default=DEFAULT_WATCH_DEBOUNCE_SECONDS,
+                              help="Seconds the index must stay unchanged before reviewing")
+    watch_parser.add_argument("--once", action="store_true",
+                              help="Review the currently staged changes once and exit")
     
     return parser.parse_args(args)
 
@@ -188,6 +333,10 @@ def main() -> int:
     """
     args = parse_args()
     
+    # Diagnostics go through logging; the run and watch commands reconfigure
+    # it from their configuration file
+    setup_logging(verbose=getattr(args, "verbose", False))
+    
     if args.command == "install":
         return install_hook(args)
     elif args.command == "uninstall":
@@ -196,8 +345,12 @@ def main() -> int:
         return create_config(args)
     elif args.command == "run":
         return run_review(args)
+    elif args.command == "merge":
+        return merge_results(args)
+    elif args.command == "watch":
+        return watch_staged(args)
     else:
-        print("Please specify a command: install, uninstall, config, or run")
+        logger.error("Please specify a command: install, uninstall, config, run, merge, or watch")
         return 1
 
 
@@ -29,11 +29,76 @@ AVAILABLE_MODELS = {
             "gemini-1.5-pro",
             "gemini-1.5-flash",
         ]
-    }
+    },
+    # Any server implementing the OpenAI chat completions API (OpenAI, vLLM,
+    # Ollama, ...); model names depend on the server
+    "openai": {
+        "name": "OpenAI-compatible",
+        "default_model": "gpt-4o-mini",
+        "env_var": "OPENAI_API_KEY",
+        "models": [],
+    },
 }
 
+# OpenAI-compatible servers
+DEFAULT_OPENAI_BASE_URL = "https://api.openai.com/v1"
+DEFAULT_CONNECT_TIMEOUT_SECONDS = 10
+DEFAULT_READ_TIMEOUT_SECONDS = 120  # Local models can take a while on large diffs
+
+# Model routing rules, evaluated in order; the first matching rule picks the model.
+# Example:
+#   - {model: gemini-1.5-pro, paths: ["auth/", "security/"]}
+#   - {model: gemini-1.5-pro, min_diff_lines: 400}
+#   - {model: gemini-1.5-flash, max_diff_lines: 50}
+DEFAULT_MODEL_ROUTING_RULES: List[Dict[str, Any]] = []
+
+# Review order: files are reviewed by decreasing risk, the sum of the weights
+# of the rules they match (same conditions as model routing rules), and by
+# increasing diff size within the same risk. The riskiest files are reviewed
+# before a token budget runs out, and the first results come back early
+DEFAULT_PRIORITY_SCHEDULING = True
+DEFAULT_RISK_RULES: List[Dict[str, Any]] = [
+    {"weight": 3, "paths": [
+        "auth", "login", "password", "passwd", "secret", "credential", "token", "session",
+        "permission", "crypto", "security", "sanitiz", "payment", "billing",
+    ]},
+    {"weight": 1, "extensions": [".c", ".cpp", ".h", ".php", ".sql", ".sh"]},
+    {"weight": 1, "min_diff_lines": 200},
+    {"weight": -1, "extensions": [".css", ".html", ".md"]},
+    {"weight": -2, "paths": ["tests/", "test_", "_test.", ".spec.", ".test.", "docs/", "examples/"]},
+]
+
 # File settings
 DEFAULT_MAX_FILE_SIZE_KB = 100
+DEFAULT_LARGE_FILE_MODE = "skip"  # "skip" or "chunk" for files over max_file_size_kb
+DEFAULT_CHUNK_TOKEN_BUDGET = 4000
+DEFAULT_MAX_CONCURRENT_ANALYSES = 4
+
+# How diffs sent to the LLM are produced. The defaults match plain git diff
+# except for the histogram algorithm, which gives smaller diffs for moved and
+# repetitive code
+DEFAULT_DIFF_OPTIONS = {
+    "context_lines": 3,
+    "algorithm": "histogram",  # default, minimal, patience or histogram
+    "ignore_whitespace_changes": False,  # git diff -b
+    "collapse_moved_code": False,  # Replace blocks moved unchanged within a file by short markers
+    "moved_code_min_lines": 3,
+    # Minimum similarity (%) for git to pair a deleted and an added file as a
+    # rename, so renamed files are reviewed by their edits only (None to disable)
+    "find_renames": 50,
+}
+DIFF_ALGORITHMS = ("default", "myers", "minimal", "patience", "histogram")
+
+# Adaptive concurrency of LLM calls (AIMD between 1 and max_concurrent_analyses)
+DEFAULT_ADAPTIVE_CONCURRENCY = True
+DEFAULT_INITIAL_CONCURRENCY = 2
+DEFAULT_LATENCY_SPIKE_FACTOR = 3.0  # Calls slower than this multiple of the baseline count as overload
+DEFAULT_MAX_RETRIES = 3  # Retries of calls rejected with rate limit or overload errors
+DEFAULT_RETRY_BACKOFF_SECONDS = 1.0
+OVERLOAD_ERROR_MARKERS = (
+    "429", "503", "resource exhausted", "resourceexhausted", "rate limit", "ratelimit",
+    "too many requests", "quota", "overloaded", "serviceunavailable", "service unavailable",
+)
 DEFAULT_INCLUDE_EXTENSIONS = [
     ".py", ".js", ".jsx", ".ts", ".tsx", ".css", ".html", ".go", ".java", ".c", ".cpp", ".rs"
 ]
@@ -41,6 +106,105 @@ DEFAULT_EXCLUDE_PATTERNS = [
     "node_modules/", "venv/", "env/", "__pycache__/", "*.min.js", "*.min.css", "build/", "dist/"
 ]
 
+# Review cache
+DEFAULT_CACHE_ENABLED = True
+DEFAULT_CACHE_TTL_DAYS = 14
+DEFAULT_PATCH_ID_CACHE = True  # Also index results by patch ID, reused after rebases and cherry-picks
+
+# Log file format: "text", or "json" for one JSON object per line
+DEFAULT_LOG_FORMAT = "text"
+
+# Metrics file for node_exporter's textfile collector (None to disable)
+DEFAULT_METRICS_FILE = None
+HOOK_DURATION_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)  # Seconds
+LLM_LATENCY_BUCKETS = (0.5, 1, 2.5, 5, 10, 20, 40, 80)  # Seconds
+# Token budgets (None means unlimited). Files that do not fit the remaining
+# budget are reviewed without their full content, or skipped
+DEFAULT_MAX_TOKENS_PER_RUN = None
+DEFAULT_MAX_TOKENS_PER_DAY = None
+DEFAULT_RESPONSE_TOKEN_ESTIMATE = 800  # Typical response length, used to estimate a review before sending it
+USAGE_HISTORY_DAYS = 31  # Days of token totals kept in the usage ledger
+BUDGET_SKIP_REASON = "token-budget"
+
+DEFAULT_SINGLE_FLIGHT_TIMEOUT_SECONDS = 300  # Wait for another process reviewing the same change
+CACHE_DIR_NAME = "llm-precommit"  # Created inside the common git directory
+
+# Content sniffing for binary, minified and generated files
+DEFAULT_CONTENT_SNIFFING = True
+DEFAULT_SNIFF_SAMPLE_KB = 8
+DEFAULT_SNIFF_MAX_LINE_LENGTH = 1000
+DEFAULT_SNIFF_MAX_ENTROPY = 6.0  # Bits per byte; source code is typically 4.5-5.5
+# Established generated-file headers, matched against the stripped leading
+# lines: @generated in a comment, Go's "Code generated ... DO NOT EDIT." and
+# protoc's header
+GENERATED_FILE_PATTERNS = [
+    r"^(#|//|/\*|\*|--|<!--|;).*@generated\b",
+    r"^// Code generated .* DO NOT EDIT\.$",
+    r"^(#|//|/\*|\*|--)\s*Generated by the protocol buffer compiler\.\s+DO NOT EDIT!",
+]
+SNIFF_REASONS = {
+    "binary": "binary content",
+    "minified": "minified content",
+    "high-entropy": "high-entropy content",
+    "generated": "generated file",
+    "linguist-generated": "marked linguist-generated in .gitattributes",
+    "linguist-vendored": "marked linguist-vendored in .gitattributes",
+}
+
+# Triage of trivial changes that do not need an LLM review
+DEFAULT_TRIAGE_TRIVIAL_CHANGES = True
+LOCKFILE_NAMES = [
+    "package-lock.json", "yarn.lock", "pnpm-lock.yaml", "poetry.lock", "Pipfile.lock",
+    "uv.lock", "Cargo.lock", "go.sum", "composer.lock", "Gemfile.lock",
+]
+TRIAGE_REASONS = {
+    "lockfile": "lockfile update",
+    "rename": "pure rename",
+    "whitespace": "whitespace-only change",
+    "comment": "comment-only change",
+    "docstring": "comment/docstring-only change",
+    "import-order": "import reordering",
+}
+# Line comment prefixes and block comment delimiters of the languages whose
+# comment-only changes are recognized from the diff (Python uses its AST)
+COMMENT_PREFIXES = {
+    ".js": ("//",),
+    ".jsx": ("//",),
+    ".ts": ("//",),
+    ".tsx": ("//",),
+    ".css": (),
+    ".html": (),
+    ".go": ("//",),
+    ".java": ("//",),
+    ".c": ("//",),
+    ".cpp": ("//",),
+    ".rs": ("//",),
+    ".sql": ("--",),
+}
+BLOCK_COMMENT_DELIMITERS = {
+    ".js": ("/*", "*/"),
+    ".jsx": ("/*", "*/"),
+    ".ts": ("/*", "*/"),
+    ".tsx": ("/*", "*/"),
+    ".css": ("/*", "*/"),
+    ".html": ("<!--", "-->"),
+    ".go": ("/*", "*/"),
+    ".java": ("/*", "*/"),
+    ".c": ("/*", "*/"),
+    ".cpp": ("/*", "*/"),
+    ".rs": ("/*", "*/"),
+    ".sql": ("/*", "*/"),
+}
+IMPORT_PREFIXES = ("import ", "from ", "#include ", "use ", "using ")
+# Languages where moving a line break changes the code: automatic semicolon
+# insertion (JavaScript, TypeScript, Go) or newline-terminated statements
+LINE_BREAK_SENSITIVE_EXTENSIONS = (
+    ".js", ".jsx", ".mjs", ".cjs", ".ts", ".tsx", ".go",
+    ".rb", ".kt", ".kts", ".swift", ".scala", ".lua", ".sh", ".bash",
+)
+# Languages where indentation is part of the structure
+INDENTATION_SENSITIVE_EXTENSIONS = (".py", ".yaml", ".yml")
+
 # CLI messages
 CLI_INSTALL_SUCCESS = "Pre-commit hook installed at {}"
 CLI_INSTALL_ERROR = "Error installing pre-commit hook: {}"
@@ -53,31 +217,98 @@ CLI_ANALYZING_FILE = "Analyzing {}..."
 CLI_SKIPPING_FILE_SIZE = "Skipping {}: File size ({:.2f} KB) exceeds limit ({} KB)"
 CLI_SKIPPING_NO_CHANGES = "Skipping {}: No changes detected"
 
+# Per-language prompt profiles, keyed by file extension. Only the profile of the
+# file under review is included in its prompt. Users can override or add profiles
+# with the language_profiles config option.
+DEFAULT_LANGUAGE_PROFILES: Dict[str, Dict[str, str]] = {
+    ".py": {
+        "language": "Python",
+        "conventions": "PEP 8",
+        "focus": "Type hints, docstrings, exception handling, context managers",
+    },
+    ".js": {
+        "language": "JavaScript",
+        "conventions": "ESLint standards",
+        "focus": "Asynchronous patterns, error handling",
+    },
+    ".jsx": {
+        "language": "JavaScript (React)",
+        "conventions": "ESLint standards",
+        "focus": "Asynchronous patterns, error handling, component state and effects",
+    },
+    ".ts": {
+        "language": "TypeScript",
+        "conventions": "ESLint standards",
+        "focus": "Asynchronous patterns, error handling, type safety",
+    },
+    ".tsx": {
+        "language": "TypeScript (React)",
+        "conventions": "ESLint standards",
+        "focus": "Asynchronous patterns, error handling, type safety, component state and effects",
+    },
+    ".css": {
+        "language": "CSS",
+        "conventions": "Industry standard conventions",
+        "focus": "Accessibility, responsive design",
+    },
+    ".html": {
+        "language": "HTML",
+        "conventions": "Industry standard conventions",
+        "focus": "Accessibility, responsive design, semantic markup",
+    },
+    ".go": {
+        "language": "Go",
+        "conventions": "Effective Go and gofmt",
+        "focus": "Error handling, goroutines, channels",
+    },
+    ".java": {
+        "language": "Java",
+        "conventions": "Google Java Style Guide",
+        "focus": "Exception handling, resource management, thread safety",
+    },
+    ".c": {
+        "language": "C",
+        "conventions": "Industry standard conventions",
+        "focus": "Memory management, pointer safety, undefined behavior",
+    },
+    ".cpp": {
+        "language": "C++",
+        "conventions": "Industry standard conventions",
+        "focus": "Memory management, pointer safety, undefined behavior",
+    },
+    ".rs": {
+        "language": "Rust",
+        "conventions": "rustfmt and Clippy",
+        "focus": "Ownership and borrowing, unsafe blocks, error handling with Result",
+    },
+    ".sql": {
+        "language": "SQL",
+        "conventions": "Industry standard conventions",
+        "focus": "Injection prevention, query optimization",
+    },
+}
+
 # Default pre-commit hook template
+# Installed pre-commit script. The precheck only uses the standard library and
+# exits 0 when there is nothing to review, without loading the reviewer
 DEFAULT_HOOK_TEMPLATE = """#!/bin/sh
 # LLM pre-commit hook for code review
 # Auto-generated by llm-precommit
 
-{python_executable} {hook_script_path} "$@"
+"{python_executable}" "{precheck_script_path}" "$@" && exit 0
+exec "{python_executable}" "{hook_script_path}" "$@"
 """
 
-# Default prompt template
-DEFAULT_PROMPT_TEMPLATE = """
-You are an expert code reviewer with deep knowledge of software engineering best practices, security, and performance optimization. Your task is to analyze the following code changes and provide high-quality, actionable feedback.
+# Static system instruction shared by every file in a run. This is sent as-is
+# (not passed through str.format), so braces are literal. Providers that support
+# it send this as a system instruction and may cache it server-side.
+REVIEW_INSTRUCTIONS = """
+You are an expert code reviewer with deep knowledge of software engineering best practices, security, and performance optimization. Your task is to analyze the code changes you are given and provide high-quality, actionable feedback.
 
 ## Review Context
-- File path: {file_path}
 - Focus on identifying actionable issues that can improve code quality, security, and maintainability
 - Consider both immediate problems and potential long-term implications
 
-## Code to Review
-Git diff:
-```
-{diff}
-```
-
-{full_content_section}
-
 ## Review Guidelines
 Analyze the code for the following aspects:
 
@@ -99,33 +330,22 @@ Analyze the code for the following aspects:
    - N+1 query problems
 
 4. **Code Style & Conventions**:
-   - For Python: Follow PEP 8
-   - For JavaScript/TypeScript: Follow ESLint standards
-   - For Java: Follow Google Java Style Guide
-   - For other languages: Follow industry standard conventions
+   - Follow the conventions given in the Language Guidelines for the file
+   - For languages without guidelines: Follow industry standard conventions
    - Naming conventions, indentation, function length, complexity
 
 5. **Documentation & Readability**:
    - Missing or unclear comments
    - Self-documenting code principles
    - Poor variable/function naming
+"""
 
-## Language-Specific Guidelines
-Depending on the file type, pay special attention to:
-
-- **Python**: Type hints, docstrings, exception handling, context managers
-- **JavaScript/TypeScript**: Asynchronous patterns, error handling, type safety
-- **Java**: Exception handling, resource management, thread safety
-- **CSS/HTML**: Accessibility, responsive design, semantic markup
-- **SQL**: Injection prevention, query optimization
-- **Go**: Error handling, goroutines, channels
-- **C/C++**: Memory management, pointer safety, undefined behavior
-
+FULL_RESPONSE_FORMAT = """
 ## Response Format
 Provide your feedback in the following JSON format:
-{{
+{
     "issues": [
-        {{
+        {
             "severity": "critical|high|medium|low|info",
             "category": "bug|logic|syntax|typo|optimization",
             "description": "Clear description of the issue",
@@ -133,25 +353,25 @@ Provide your feedback in the following JSON format:
             "code_snippet": "Relevant code snippet (if needed)",
             "suggestion": "Specific suggestion to fix the issue",
             "explanation": "Why this is a problem and why the suggested fix works"
-        }}
+        }
     ],
     "coding_convention_issues": [
-        {{
+        {
             "line_number": "line number or range",
             "convention": "The specific convention being violated",
             "description": "Description of the convention issue",
             "suggestion": "Suggestion to fix the issue"
-        }}
+        }
     ],
     "security_concerns": [
-        {{
+        {
             "severity": "critical|high|medium|low",
             "vulnerability_type": "injection|authentication|data-exposure|etc",
             "description": "Description of the security concern",
             "potential_impact": "What could happen if exploited",
             "suggestion": "Suggestion to address the security concern",
             "cwe_id": "Common Weakness Enumeration ID if applicable"
-        }}
+        }
     ],
     "general_feedback": "Overall thoughts and general feedback about code quality, architecture, and design patterns",
     "positive_aspects": [
@@ -159,7 +379,176 @@ Provide your feedback in the following JSON format:
     ],
     "file_type": "The type of file (e.g., Python, JavaScript, HTML, etc.)",
     "summary": "A brief summary of the key findings (limit to 2-3 sentences)"
-}}
+}
 
 Ensure your response is strictly in this JSON format and correctly escaped. Focus on providing specific, actionable feedback rather than general comments. Suggest real code fixes where possible.
 """
+
+LEAN_RESPONSE_FORMAT = """
+## Response Format
+Provide your feedback in the following JSON format, with only these fields:
+{
+    "issues": [
+        {
+            "severity": "critical|high|medium|low|info",
+            "description": "Clear, concise description of the issue",
+            "line_number": "line number or range (if applicable)",
+            "suggestion": "Specific suggestion to fix the issue"
+        }
+    ],
+    "coding_convention_issues": [
+        {
+            "line_number": "line number or range",
+            "description": "Description of the convention issue",
+            "suggestion": "Suggestion to fix the issue"
+        }
+    ],
+    "security_concerns": [
+        {
+            "severity": "critical|high|medium|low",
+            "description": "Description of the security concern and its impact",
+            "suggestion": "Suggestion to address the security concern"
+        }
+    ],
+    "general_feedback": "One or two sentences of overall feedback, or an empty string",
+    "file_type": "The type of file (e.g., Python, JavaScript, HTML, etc.)"
+}
+
+Ensure your response is strictly in this JSON format and correctly escaped. Report only actionable findings and keep each field short; leave the lists empty when there is nothing to report.
+"""
+
+# Static review instructions, sent once per run as the system instruction where
+# the provider supports it. The response profile selects the fields requested:
+# "full" asks for everything; "lean" for exactly the fields OutputFormatter
+# displays, so no output tokens are spent on fields that are never shown
+DEFAULT_SYSTEM_INSTRUCTION = REVIEW_INSTRUCTIONS + FULL_RESPONSE_FORMAT
+SYSTEM_INSTRUCTIONS = {
+    "lean": REVIEW_INSTRUCTIONS + LEAN_RESPONSE_FORMAT,
+    "full": DEFAULT_SYSTEM_INSTRUCTION,
+}
+DEFAULT_RESPONSE_PROFILE = "full"
+RESPONSE_PROFILES = tuple(SYSTEM_INSTRUCTIONS)
+
+# JSON schemas of the response for providers with structured output (JSON
+# mime type / response schema), so responses always parse
+_SEVERITY_SCHEMA = {"type": "string", "enum": ["critical", "high", "medium", "low", "info"]}
+_STRING_SCHEMA = {"type": "string"}
+
+
+def _object_schema(properties: Dict[str, Any], required: List[str]) -> Dict[str, Any]:
+    """Build the schema of an object with the given properties."""
+    return {"type": "object", "properties": properties, "required": required}
+
+
+def _list_schema(properties: Dict[str, Any], required: List[str]) -> Dict[str, Any]:
+    """Build the schema of a list of objects with the given properties."""
+    return {"type": "array", "items": _object_schema(properties, required)}
+
+
+RESPONSE_SCHEMAS: Dict[str, Dict[str, Any]] = {
+    "lean": _object_schema({
+        "issues": _list_schema({
+            "severity": _SEVERITY_SCHEMA,
+            "description": _STRING_SCHEMA,
+            "line_number": _STRING_SCHEMA,
+            "suggestion": _STRING_SCHEMA,
+        }, ["severity", "description"]),
+        "coding_convention_issues": _list_schema({
+            "line_number": _STRING_SCHEMA,
+            "description": _STRING_SCHEMA,
+            "suggestion": _STRING_SCHEMA,
+        }, ["description"]),
+        "security_concerns": _list_schema({
+            "severity": _SEVERITY_SCHEMA,
+            "description": _STRING_SCHEMA,
+            "suggestion": _STRING_SCHEMA,
+        }, ["severity", "description"]),
+        "general_feedback": _STRING_SCHEMA,
+        "file_type": _STRING_SCHEMA,
+    }, ["issues", "coding_convention_issues", "security_concerns"]),
+    "full": _object_schema({
+        "issues": _list_schema({
+            "severity": _SEVERITY_SCHEMA,
+            "category": _STRING_SCHEMA,
+            "description": _STRING_SCHEMA,
+            "line_number": _STRING_SCHEMA,
+            "code_snippet": _STRING_SCHEMA,
+            "suggestion": _STRING_SCHEMA,
+            "explanation": _STRING_SCHEMA,
+        }, ["severity", "description"]),
+        "coding_convention_issues": _list_schema({
+            "line_number": _STRING_SCHEMA,
+            "convention": _STRING_SCHEMA,
+            "description": _STRING_SCHEMA,
+            "suggestion": _STRING_SCHEMA,
+        }, ["description"]),
+        "security_concerns": _list_schema({
+            "severity": _SEVERITY_SCHEMA,
+            "vulnerability_type": _STRING_SCHEMA,
+            "description": _STRING_SCHEMA,
+            "potential_impact": _STRING_SCHEMA,
+            "suggestion": _STRING_SCHEMA,
+            "cwe_id": _STRING_SCHEMA,
+        }, ["severity", "description"]),
+        "general_feedback": _STRING_SCHEMA,
+        "positive_aspects": {"type": "array", "items": _STRING_SCHEMA},
+        "file_type": _STRING_SCHEMA,
+        "summary": _STRING_SCHEMA,
+    }, ["issues", "coding_convention_issues", "security_concerns", "summary"]),
+}
+DEFAULT_STRUCTURED_OUTPUT = True
+
+# Two-phase review: a short-output screening pass over the hunks of many files
+# at once flags suspicious hunks, and only those get the full review
+DEFAULT_TWO_PHASE_REVIEW = False
+DEFAULT_TWO_PHASE_BATCH_TOKENS = 6000  # Diff tokens screened per call; larger diffs skip screening
+HUNK_SCREENING_INSTRUCTION = """
+You are screening code changes before an in-depth code review. Each hunk below is a part of a git diff, labeled with an id and its file path.
+
+Flag every hunk that may contain a bug, a logic error, a security vulnerability, a performance problem or a significant maintainability issue. Do not flag hunks that are clearly fine, such as simple renames, formatting, documentation, straightforward configuration or test data. When in doubt, flag the hunk.
+
+Respond only with JSON in the following format, listing the ids of the flagged hunks:
+{"suspicious": ["h1", "h4"]}
+"""
+HUNK_SCREENING_SCHEMA: Dict[str, Any] = _object_schema(
+    {"suspicious": {"type": "array", "items": _STRING_SCHEMA}}, ["suspicious"]
+)
+
+# Per-file part of the prompt, formatted with str.format for every file
+DEFAULT_FILE_PROMPT_TEMPLATE = """
+## File Under Review
+- File path: {file_path}
+
+{language_section}
+
+{related_section}
+
+## Code to Review
+Git diff:
+```
+{diff}
+```
+
+{full_content_section}
+"""
+
+# Single-string prompt template, used for providers without system instruction
+# support and as the reference layout for custom_prompt_template
+DEFAULT_PROMPT_TEMPLATE = (
+    DEFAULT_SYSTEM_INSTRUCTION.replace("{", "{{").replace("}", "}}")
+    + DEFAULT_FILE_PROMPT_TEMPLATE
+)
+
+# Signatures of symbols referenced by a diff and defined in other files,
+# looked up in a local index updated incrementally by blob SHA
+DEFAULT_SYMBOL_CONTEXT = True
+DEFAULT_SYMBOL_CONTEXT_TOKEN_BUDGET = 400
+SYMBOL_INDEX_RETENTION_DAYS = 30  # Blobs unused by any worktree for this long are dropped
+
+# Background pre-review of staged changes (llm-precommit watch)
+DEFAULT_WATCH_INTERVAL_SECONDS = 1.0  # How often the git index is polled
+DEFAULT_WATCH_DEBOUNCE_SECONDS = 2.0  # Quiet time after the last staging before reviewing
+
+# Provider-side prompt caching
+DEFAULT_PROMPT_CACHING = True
+DEFAULT_PROMPT_CACHE_TTL_MINUTES = 10
@@ -4,23 +4,103 @@ Main pre-commit hook for code review using LLM.
 """
 import os
 import sys
+import copy
 import argparse
+import hashlib
 import time
-from typing import Dict, Any, List, Optional, Tuple
+import logging
+import threading
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
 
 # Add parent directory to path to enable imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from llm_precommit.constants import (
+    DEFAULT_CHUNK_TOKEN_BUDGET,
+    DEFAULT_CONNECT_TIMEOUT_SECONDS,
+    DEFAULT_DIFF_OPTIONS,
+    DEFAULT_INCLUDE_EXTENSIONS,
+    DEFAULT_MAX_CONCURRENT_ANALYSES,
+    DEFAULT_LOG_FORMAT,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_OPENAI_BASE_URL,
+    DEFAULT_PATCH_ID_CACHE,
+    DEFAULT_PRIORITY_SCHEDULING,
+    DEFAULT_SYMBOL_CONTEXT_TOKEN_BUDGET,
+    DEFAULT_SYSTEM_INSTRUCTION,
+    DEFAULT_FILE_PROMPT_TEMPLATE,
+    DEFAULT_PROMPT_CACHING,
+    DEFAULT_PROMPT_CACHE_TTL_MINUTES,
+    DEFAULT_READ_TIMEOUT_SECONDS,
+    DEFAULT_RESPONSE_PROFILE,
+    DEFAULT_RISK_RULES,
+    DEFAULT_STRUCTURED_OUTPUT,
+    DEFAULT_TRIAGE_TRIVIAL_CHANGES,
+    DEFAULT_TWO_PHASE_BATCH_TOKENS,
+    DEFAULT_TWO_PHASE_REVIEW,
+    TRIAGE_REASONS,
+    HUNK_SCREENING_INSTRUCTION,
+    SYSTEM_INSTRUCTIONS,
+)
 from llm_precommit.utils.llm_client import LLMClientFactory
+from llm_precommit.utils import gemini_client  # noqa: F401  (registers the Gemini client)
+from llm_precommit.utils import openai_client  # noqa: F401  (registers the OpenAI-compatible client)
 from llm_precommit.utils.git_utils import (
+    EMPTY_TREE_SHA,
     get_staged_files, 
+    get_tracked_files,
+    get_diff_stats,
     get_file_diff, 
     get_file_content, 
+    get_file_content_at_revision,
+    get_patch_id,
+    get_range_diffs,
+    get_renamed_files,
+    resolve_revision_range,
     filter_files_by_extension,
+    get_git_common_dir,
+)
+from llm_precommit.utils.config import compile_precheck_rules, load_config, should_analyze_file, is_large_file
+from llm_precommit.hooks import precheck
+from llm_precommit.utils.sharding import parse_shard_spec, shard_files
+from llm_precommit.utils.result_sink import ResultSink
+from llm_precommit.utils.chunking import analyze_in_chunks
+from llm_precommit.utils.diff_utils import collapse_moved_blocks, get_hunk_starts, parse_hunks
+from llm_precommit.utils.pipeline import StageTimer, bounded_map
+from llm_precommit.utils.review_cache import ReviewCache, create_review_cache, normalize_diff_for_cache
+from llm_precommit.utils.symbol_index import create_symbol_index
+from llm_precommit.utils.model_router import ModelRouter, count_changed_lines
+from llm_precommit.utils.scheduling import prioritize_files
+from llm_precommit.utils.triage import classify_trivial_change, make_triage_result
+from llm_precommit.utils.two_phase import (
+    build_screening_prompt,
+    keep_hunks,
+    label_hunks,
+    make_cleared_result,
+    parse_flagged_hunks,
+)
+from llm_precommit.utils.language_profiles import (
+    get_language_profiles,
+    get_language_profile,
+    format_language_section,
 )
-from llm_precommit.utils.config import load_config, should_analyze_file
-from llm_precommit.utils.output_utils import OutputFormatter, print_summary
-from llm_precommit.utils.logging_utils import setup_logging
+from llm_precommit.utils.concurrency import create_concurrency_controller
+from llm_precommit.utils.token_budget import (
+    TokenBudget,
+    DailyUsageLedger,
+    get_default_ledger_path,
+    estimate_review_tokens,
+    compute_cost,
+    make_budget_skip_result,
+)
+from llm_precommit.utils.token_utils import estimate_tokens
+from llm_precommit.utils.output_utils import OutputFormatter, format_concurrency_timeline, print_summary
+from llm_precommit.utils.logging_utils import LOGGER_NAME, setup_logging
+from llm_precommit.utils.metrics import write_run_metrics
+
+# Not __name__: the installed hook runs this file as a script, where the
+# messages of a "__main__" logger would not reach the configured handlers
+logger = logging.getLogger(f"{LOGGER_NAME}.hooks.llm_code_review")
 
 
 def get_api_key(config: Dict[str, Any]) -> Optional[str]:
@@ -37,92 +117,825 @@ def get_api_key(config: Dict[str, Any]) -> Optional[str]:
     api_key = os.environ.get(env_var_name)
     
     if not api_key:
-        print(f"Error: API key not found in environment variable {env_var_name}")
-        print("Please set the API key in your environment or config file.")
+        logger.error(f"Error: API key not found in environment variable {env_var_name}")
+        logger.error("Please set the API key in your environment or config file.")
     
     return api_key
 
 
-def analyze_files(files: List[str], config: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+def get_client_kwargs(config: Dict[str, Any], llm_type: str, api_key: str) -> Dict[str, Any]:
     """
-    Analyze a list of files using the LLM.
+    Build the constructor arguments for the configured LLM client.
     
+    Args:
+        config: The configuration dictionary.
+        llm_type: The registered name of the LLM client.
+        api_key: The API key for the LLM service.
+        
+    Returns:
+        Keyword arguments for LLMClientFactory.create.
+    """
+    kwargs = {
+        "api_key": api_key,
+        "model_name": config.get("model_name"),
+        "concurrency_controller": create_concurrency_controller(config),
+        "max_retries": config.get("max_retries", DEFAULT_MAX_RETRIES),
+        "response_profile": config.get("response_profile", DEFAULT_RESPONSE_PROFILE),
+        "structured_output": config.get("structured_output", DEFAULT_STRUCTURED_OUTPUT),
+    }
+    if llm_type == "gemini":
+        kwargs["prompt_caching"] = config.get("prompt_caching", DEFAULT_PROMPT_CACHING)
+        kwargs["prompt_cache_ttl_minutes"] = config.get(
+            "prompt_cache_ttl_minutes", DEFAULT_PROMPT_CACHE_TTL_MINUTES
+        )
+    elif llm_type == "openai":
+        kwargs["base_url"] = config.get("base_url") or DEFAULT_OPENAI_BASE_URL
+        kwargs["connect_timeout"] = config.get("connect_timeout_seconds", DEFAULT_CONNECT_TIMEOUT_SECONDS)
+        kwargs["read_timeout"] = config.get("read_timeout_seconds", DEFAULT_READ_TIMEOUT_SECONDS)
+        kwargs["max_connections"] = config.get("max_concurrent_analyses", DEFAULT_MAX_CONCURRENT_ANALYSES)
+    return kwargs
+
+
+class ReviewRun:
+    """
+    State of one review run, shared by the stages of the review pipeline:
+    clients, caches, token budgets and statistics.
+
+    The review is a chain of lazy stages, each holding only the files it is
+    working on, so memory is proportional to the concurrency, not the number
+    of files: enumerate -> filter -> load -> build prompt -> screen (two-phase
+    review only) -> call and parse (concurrently) -> render -> sink. The sink
+    keeps counts and streams the results out, not the results themselves.
+    """
+
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        llm_client: Any,
+        formatter: OutputFormatter,
+        model_router: ModelRouter,
+        revision_range: Optional[Tuple[str, str]] = None,
+        file_diffs: Optional[Dict[str, str]] = None,
+    ):
+        """
+        Initialize the run.
+
+        Args:
+            config: Configuration dictionary.
+            llm_client: The LLM client reviewing the files.
+            formatter: Formatter of the displayed results.
+            model_router: Router picking the model of each file.
+            revision_range: Base and head revisions when reviewing a commit range
+                instead of the staged changes (optional). File contents are then
+                read from head in the object database.
+            file_diffs: Pre-computed diffs by file path, e.g. of a commit range (optional).
+        """
+        self.config = config
+        self.llm_client = llm_client
+        self.formatter = formatter
+        self.model_router = model_router
+        self.revision_range = revision_range
+        self.file_diffs = file_diffs
+        self.llm_type = config.get("llm_type", "gemini")
+        self.verbose = config.get("verbose", False)
+
+        # Custom prompt template if provided
+        self.custom_prompt = config.get("custom_prompt_template")
+        response_profile = config.get("response_profile", DEFAULT_RESPONSE_PROFILE)
+        system_instruction = SYSTEM_INSTRUCTIONS.get(response_profile, DEFAULT_SYSTEM_INSTRUCTION)
+        self.prompt_overhead = self.custom_prompt or system_instruction + DEFAULT_FILE_PROMPT_TEMPLATE
+        self.prompt_fingerprint = hashlib.sha256(self.prompt_overhead.encode("utf-8")).hexdigest()
+        self.structured_output = (
+            bool(config.get("structured_output", DEFAULT_STRUCTURED_OUTPUT)) and not self.custom_prompt
+        )
+        self.language_profiles = get_language_profiles(config)
+
+        # When checking all files, whole files are diffed against the empty tree;
+        # files reviewed outside of a commit, against HEAD
+        self.check_all_files = config.get("check_all_files", False)
+        if self.check_all_files:
+            self.diff_base = EMPTY_TREE_SHA
+        elif config.get("review_working_tree"):
+            self.diff_base = "HEAD"
+        else:
+            self.diff_base = None
+        self.base_revision, self.head_revision = revision_range or ("HEAD", None)
+        self.diff_options = {**DEFAULT_DIFF_OPTIONS, **(config.get("diff_options") or {})}
+
+        # Local triage of trivial changes, in commits or commit ranges
+        self.triage_enabled = self.diff_base is None and config.get(
+            "triage_trivial_changes", DEFAULT_TRIAGE_TRIVIAL_CHANGES
+        )
+        # Renamed files are diffed against their old path, so only their edits are
+        # reviewed; pure renames are skipped by the triage
+        self.find_renames = self.diff_options.get("find_renames")
+        self.renamed_files: Dict[str, Tuple[str, int]] = {}
+        if self.diff_base is None and (self.triage_enabled or self.find_renames is not None):
+            self.renamed_files = get_renamed_files(*(revision_range or ()), min_similarity=self.find_renames)
+
+        # Results already reviewed, e.g. at pre-commit time, are not paid for again
+        self.review_cache = create_review_cache(config)
+        self.cache_stats = {"hits": 0, "misses": 0}
+        # The same patch applied elsewhere in the file, e.g. after a rebase or a
+        # cherry-pick, reuses its findings with shifted line numbers
+        self.patch_id_cache = bool(self.review_cache) and config.get("patch_id_cache", DEFAULT_PATCH_ID_CACHE)
+
+        # Token budgets of the run and of the day; usage is recorded in a ledger
+        # shared by all runs on the machine
+        ledger_path = get_default_ledger_path()
+        self.usage_ledger = DailyUsageLedger(ledger_path) if ledger_path else None
+        budget_limit = config.get("max_tokens_per_run")
+        max_tokens_per_day = config.get("max_tokens_per_day")
+        if max_tokens_per_day is not None and self.usage_ledger:
+            remaining_today = max(0, max_tokens_per_day - self.usage_ledger.get_today())
+            budget_limit = remaining_today if budget_limit is None else min(budget_limit, remaining_today)
+        self.token_budget = TokenBudget(budget_limit)
+        self.chunk_token_budget = config.get("chunk_token_budget", DEFAULT_CHUNK_TOKEN_BUDGET)
+
+        # Signatures of definitions in other files that the changes refer to
+        self.symbol_index = None
+        self.symbol_context_budget = config.get(
+            "symbol_context_token_budget", DEFAULT_SYMBOL_CONTEXT_TOKEN_BUDGET
+        )
+        try:
+            self.symbol_index = create_symbol_index(config, self.head_revision)
+        except Exception as e:
+            logger.error(f"Error updating symbol index: {e}")
+        self.payload_stats = {"raw_bytes": 0, "sent_bytes": 0}
+        self.max_workers = max(1, config.get("max_concurrent_analyses", DEFAULT_MAX_CONCURRENT_ANALYSES))
+
+        # Two-phase review: screen the hunks of several files per call, then review
+        # only the flagged hunks in full
+        self.two_phase = config.get("two_phase_review", DEFAULT_TWO_PHASE_REVIEW)
+        self.screening_model = config.get("two_phase_screening_model") or None
+        self.batch_tokens_limit = config.get("two_phase_batch_tokens", DEFAULT_TWO_PHASE_BATCH_TOKENS)
+        self.phase_stats = {
+            "screening_calls": 0, "screening_seconds": 0.0, "screening_failures": 0,
+            "hunks": 0, "flagged_hunks": 0, "files_cleared": 0,
+        }
+
+        # Identical changes in several files of the run (copies, vendored or
+        # generated variants) are reviewed once; the other files share the result.
+        # A leader is released once it and the duplicates seen so far are
+        # rendered, so later copies are served by the review cache instead
+        self.dedup_leaders: Dict[str, Dict[str, Any]] = {}
+        self.dedup_stats = {"duplicates": 0}
+
+        self.stage_timer = StageTimer()
+
+    def run(self, files: List[str], sink: ResultSink) -> None:
+        """
+        Review files through the pipeline, displaying each result.
+
+        Args:
+            files: List of file paths to analyze.
+            sink: Sink receiving each file's analysis result.
+        """
+        jobs = self.stage_timer.wrap("filter", self.filter_files(iter(self.prioritize(files))))
+        jobs = self.stage_timer.wrap("load", self.load(jobs))
+        jobs = self.stage_timer.wrap("build_prompts", self.build_prompts(jobs))
+        if self.two_phase:
+            jobs = self.stage_timer.wrap("screen", self.screen(jobs))
+        # Files are analyzed concurrently; the client's concurrency controller
+        # decides how many LLM calls are actually in flight. Waiting for the
+        # workers is not charged to rendering; calls are timed by the workers
+        # themselves
+        calls = self.stage_timer.wrap(
+            None, bounded_map(self.call, jobs, self.max_workers, max_pending=2 * self.max_workers)
+        )
+        for file_path, result in self.stage_timer.wrap("render", self.render(calls)):
+            sink.add(file_path, result)
+
+    def get_run_stats(self) -> Dict[str, Any]:
+        """
+        Get the statistics of the run's stages.
+
+        Returns:
+            Review cache, diff payload, two-phase review and deduplication
+            statistics where they apply, and the time spent in each stage.
+        """
+        stats: Dict[str, Any] = {}
+        if self.review_cache:
+            stats["review_cache"] = self.cache_stats
+        if self.payload_stats["raw_bytes"]:
+            stats["diff_payload"] = self.payload_stats
+        if self.two_phase:
+            stats["two_phase"] = self.phase_stats
+        if self.dedup_stats["duplicates"]:
+            stats["dedup"] = self.dedup_stats
+        stats["stage_seconds"] = dict(self.stage_timer.seconds)
+        return stats
+
+    def prioritize(self, files: List[str]) -> List[str]:
+        """
+        Order the files for review: riskiest first, so a token budget running
+        out drops the least important ones, then shortest diffs first for early
+        feedback. Files are rendered in the order they are submitted.
+
+        Args:
+            files: List of file paths to analyze.
+
+        Returns:
+            The files in review order, unchanged without priority scheduling.
+        """
+        if not self.config.get("priority_scheduling", DEFAULT_PRIORITY_SCHEDULING) or len(files) < 2:
+            return files
+        if self.file_diffs is not None:
+            diff_stats = {path: count_changed_lines(diff) for path, diff in self.file_diffs.items()}
+        else:
+            diff_stats = get_diff_stats(self.diff_base)
+        return prioritize_files(files, diff_stats, self.config.get("risk_rules", DEFAULT_RISK_RULES))
+
+    def filter_files(self, paths: Iterable[str]) -> Iterator[str]:
+        """
+        Keep the files selected by the configuration.
+
+        Args:
+            paths: File paths to analyze.
+
+        Yields:
+            The selected file paths.
+        """
+        for file_path in paths:
+            if should_analyze_file(file_path, self.config, self.head_revision):
+                yield file_path
+
+    def load(self, paths: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """
+        Load the diff and content of each file, short-circuiting trivial changes.
+
+        Args:
+            paths: File paths to analyze.
+
+        Yields:
+            A job per changed file: its diff and content, or its result when
+            the change needs no review.
+        """
+        for file_path in paths:
+            if self.file_diffs is not None:
+                diff = self.file_diffs.get(file_path, "")
+            else:
+                rename = self.renamed_files.get(file_path) if self.find_renames is not None else None
+                diff = get_file_diff(
+                    file_path, base=self.diff_base, diff_options=self.diff_options,
+                    old_path=rename[0] if rename else None,
+                )
+            if diff and self.diff_options.get("collapse_moved_code"):
+                diff = collapse_moved_blocks(
+                    diff, self.diff_options.get("moved_code_min_lines", 3), os.path.splitext(file_path)[1]
+                )
+            if diff and self.verbose:
+                # Compare with what plain git diff would have sent
+                if self.revision_range:
+                    raw_diff = get_file_diff(file_path, base=self.base_revision, head=self.head_revision)
+                else:
+                    raw_diff = get_file_diff(file_path, base=self.diff_base)
+                raw_bytes, sent_bytes = len(raw_diff.encode("utf-8")), len(diff.encode("utf-8"))
+                self.payload_stats["raw_bytes"] += raw_bytes
+                self.payload_stats["sent_bytes"] += sent_bytes
+                logger.debug(f"Diff payload for {file_path}: {raw_bytes / 1024:.1f} KB -> {sent_bytes / 1024:.1f} KB",
+                             extra={"file_path": file_path, "stage": "load"})
+            if not diff:
+                logger.info(f"Skipping {file_path}: No changes detected", extra={"file_path": file_path, "stage": "load"})
+                continue
+
+            # Short-circuit changes that do not need a review
+            if self.triage_enabled:
+                rename = self.renamed_files.get(file_path)
+                reason = classify_trivial_change(
+                    file_path,
+                    diff,
+                    rename[1] if rename else None,
+                    old_revision=self.base_revision,
+                    new_revision=self.head_revision or "",
+                )
+                if reason:
+                    logger.info(f"Skipping {file_path}: No review needed ({TRIAGE_REASONS[reason]})",
+                                extra={"file_path": file_path, "stage": "load"})
+                    yield {"file_path": file_path, "result": make_triage_result(reason)}
+                    continue
+
+            # Large files are reviewed in chunks without their full content
+            large_file = is_large_file(file_path, self.config, self.head_revision)
+            if large_file:
+                file_content = None
+            elif self.head_revision:
+                file_content = get_file_content_at_revision(file_path, self.head_revision) or ""
+            else:
+                file_content = get_file_content(file_path)
+
+            yield {"file_path": file_path, "diff": diff, "file_content": file_content, "large_file": large_file}
+
+    def build_prompts(self, jobs: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Pick the model and guidelines, and resolve cache hits and budget limits.
+
+        Args:
+            jobs: Jobs of the load stage.
+
+        Yields:
+            The jobs, with their result when served from the cache or skipped
+            for the token budget, or else with the tokens reserved for them.
+        """
+        for job in jobs:
+            if "result" in job:
+                yield job
+                continue
+            file_path, diff, large_file = job["file_path"], job["diff"], job["large_file"]
+
+            # Pick the model and language guidelines for this file
+            model_name = self.model_router.select_model(file_path, diff)
+            language_section = format_language_section(
+                get_language_profile(file_path, self.config, self.language_profiles)
+            )
+            related_section = ""
+            if self.symbol_index:
+                related_section = self.symbol_index.build_related_section(file_path, diff, self.symbol_context_budget)
+            job.update(
+                model_name=model_name,
+                language_section=language_section,
+                related_section=related_section,
+                cache_key=None,
+            )
+
+            if self.review_cache:
+                job["cache_key"] = self._make_cache_key(
+                    file_path, model_name, language_section, diff, job["file_content"], large_file, related_section
+                )
+                cached_result = self.review_cache.get(job["cache_key"])
+                if cached_result is not None:
+                    self.cache_stats["hits"] += 1
+                    logger.info(f"Analyzing {file_path}... (cached)", extra={"file_path": file_path, "stage": "build_prompts"})
+                    cached_result["_meta"] = self._cache_hit_meta(model_name)
+                    yield {"file_path": file_path, "result": cached_result}
+                    continue
+                patch_id = get_patch_id(diff) if self.patch_id_cache else None
+                if patch_id:
+                    job["patch_key"] = self._make_patch_key(file_path, model_name, language_section, patch_id, large_file)
+                    job["hunk_starts"] = get_hunk_starts(diff)
+                    cached_result = self.review_cache.get_patch_result(job["patch_key"], job["hunk_starts"])
+                    if cached_result is not None:
+                        self.cache_stats["hits"] += 1
+                        self.cache_stats["patch_id_hits"] = self.cache_stats.get("patch_id_hits", 0) + 1
+                        logger.info(f"Analyzing {file_path}... (cached, same patch)",
+                                    extra={"file_path": file_path, "stage": "build_prompts"})
+                        self.review_cache.put(job["cache_key"], cached_result)
+                        cached_result["_meta"] = {**self._cache_hit_meta(model_name), "patch_id_hit": True}
+                        yield {"file_path": file_path, "result": cached_result}
+                        continue
+                self.cache_stats["misses"] += 1
+
+            # The same change was already sent for another file: share its result
+            dedup_key = self._make_dedup_key(job)
+            if dedup_key in self.dedup_leaders:
+                leader = self.dedup_leaders[dedup_key]
+                self.dedup_stats["duplicates"] += 1
+                if self.review_cache:
+                    self.cache_stats["misses"] -= 1
+                logger.info(f"Analyzing {file_path}... (same change as {leader['file_path']})",
+                            extra={"file_path": file_path, "stage": "build_prompts"})
+                leader["pending"] += 1
+                job.update(duplicate_of=leader, file_content=None)
+                yield job
+                continue
+
+            # Reserve the estimated tokens; when they do not fit, degrade to a
+            # diff-only review before skipping the file
+            calls = -(-estimate_tokens(diff) // self.chunk_token_budget) if large_file else 1
+            estimate = estimate_review_tokens(self.prompt_overhead, language_section, related_section) * calls + (
+                estimate_tokens(diff) + estimate_tokens(job["file_content"] or "")
+            )
+            if not self.token_budget.reserve(estimate):
+                reduced = estimate - estimate_tokens(job["file_content"] or "")
+                if job["file_content"] and self.token_budget.reserve(reduced):
+                    logger.warning(f"Reviewing {file_path} without its full content: Token budget is low",
+                                   extra={"file_path": file_path, "stage": "build_prompts"})
+                    job["file_content"] = None
+                    estimate = reduced
+                    if self.review_cache:
+                        job["cache_key"] = self._make_cache_key(
+                            file_path, model_name, language_section, diff, None, large_file, related_section
+                        )
+                else:
+                    logger.warning(f"Skipping {file_path}: Token budget exhausted",
+                                   extra={"file_path": file_path, "stage": "build_prompts"})
+                    if self.review_cache:
+                        self.cache_stats["misses"] -= 1
+                    yield {"file_path": file_path, "result": make_budget_skip_result()}
+                    continue
+            job["estimate"] = estimate
+            if dedup_key:
+                job["dedup"] = self.dedup_leaders[dedup_key] = {
+                    "file_path": file_path, "done": threading.Event(), "result": None,
+                    "key": dedup_key, "pending": 1,
+                }
+
+            logger.info(f"Analyzing {file_path}...", extra={"file_path": file_path, "stage": "build_prompts"})
+            logger.debug(f"Using model {model_name} for {file_path}", extra={"file_path": file_path, "stage": "build_prompts"})
+            if large_file:
+                logger.info(f"Reviewing {file_path} in chunks: File size exceeds limit",
+                            extra={"file_path": file_path, "stage": "build_prompts"})
+            yield job
+
+    def screen(self, jobs: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Batch files for the screening pass of the two-phase review.
+
+        Args:
+            jobs: Jobs of the build_prompts stage.
+
+        Yields:
+            The jobs, screened by batches of up to two_phase_batch_tokens.
+        """
+        batch: List[Dict[str, Any]] = []
+        batch_tokens = 0
+        for job in jobs:
+            diff_tokens = 0 if "result" in job or "duplicate_of" in job else estimate_tokens(job["diff"])
+            if diff_tokens > self.batch_tokens_limit:
+                # Too large to screen with others: reviewed in full directly
+                yield job
+                continue
+            if batch and batch_tokens + diff_tokens > self.batch_tokens_limit:
+                self.screen_batch(batch)
+                yield from batch
+                batch, batch_tokens = [], 0
+            batch.append(job)
+            batch_tokens += diff_tokens
+        self.screen_batch(batch)
+        yield from batch
+
+    def screen_batch(self, batch: List[Dict[str, Any]]) -> None:
+        """
+        Screen the hunks of a batch of files in one call, and reduce each file
+        to its flagged hunks or clear it.
+
+        Args:
+            batch: Jobs of the batch, updated in place.
+        """
+        to_screen = [job for job in batch if "result" not in job and "duplicate_of" not in job]
+        if not to_screen:
+            return
+        hunks_by_job = [label_hunks(i, job["file_path"], job["diff"]) for i, job in enumerate(to_screen)]
+        hunks = [hunk for job_hunks in hunks_by_job for hunk in job_hunks]
+        prompt = build_screening_prompt(hunks)
+        # The reviews of the batch are already reserved: without room for the
+        # screening call, they are done in full
+        estimate = estimate_review_tokens(HUNK_SCREENING_INSTRUCTION, prompt)
+        if not self.token_budget.reserve(estimate):
+            logger.debug(f"Reviewing {len(to_screen)} files without screening: Token budget is low",
+                         extra={"stage": "screen"})
+            return
+        logger.debug(f"Screening {len(hunks)} hunks of {len(to_screen)} files...", extra={"stage": "screen"})
+        start_time = time.time()
+        result = self.llm_client.screen_hunks(prompt, model_name=self.screening_model)
+        elapsed = time.time() - start_time
+        meta = result.get("_meta") or {}
+        used_tokens = meta.get("prompt_tokens", 0) + meta.get("response_tokens", 0)
+        self.token_budget.settle(estimate, used_tokens)
+        if self.usage_ledger:
+            self.usage_ledger.add(used_tokens)
+        flagged = parse_flagged_hunks(result)
+        self.phase_stats["screening_calls"] += 1
+        self.phase_stats["screening_seconds"] += elapsed
+        self.phase_stats["hunks"] += len(hunks)
+        if flagged is None:
+            # Fail open: review everything in full
+            self.phase_stats["screening_failures"] += 1
+            self.phase_stats["flagged_hunks"] += len(hunks)
+            return
+
+        for job, job_hunks in zip(to_screen, hunks_by_job):
+            keep = {i for i, (hunk_id, _, _) in enumerate(job_hunks) if hunk_id in flagged}
+            phase_meta = {"screening_seconds": elapsed, "hunks": len(job_hunks), "flagged_hunks": len(keep)}
+            self.phase_stats["flagged_hunks"] += len(keep)
+            if keep:
+                job["diff"] = keep_hunks(job["diff"], keep) if len(keep) < len(job_hunks) else job["diff"]
+                job["two_phase"] = phase_meta
+                continue
+            self.phase_stats["files_cleared"] += 1
+            job["result"] = make_cleared_result({**phase_meta, "deep_seconds": 0.0})
+            job["result"]["_meta"].update(model=job["model_name"], llm_type=self.llm_type)
+            if job["cache_key"]:
+                self.review_cache.put(job["cache_key"], job["result"])
+
+    def call(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Call the LLM and parse its response, unless another process on the
+        machine is already reviewing the same change. Runs on worker threads.
+
+        Args:
+            job: Job of the previous stage.
+
+        Returns:
+            The job, with its result.
+        """
+        start_time = time.perf_counter()
+        try:
+            if "duplicate_of" in job:
+                job["result"] = self._share_result(job)
+                if job["cache_key"]:
+                    self.review_cache.put(job["cache_key"], job["result"])
+            elif "result" not in job:
+                if job["cache_key"]:
+                    job["result"], job["shared"] = self.review_cache.get_or_compute(
+                        job["cache_key"], lambda: self._review(job)
+                    )
+                else:
+                    job["result"] = self._review(job)
+                self.stage_timer.add("call", time.perf_counter() - start_time)
+        finally:
+            # Release the files waiting for this identical change, even on failure
+            if "dedup" in job:
+                job["dedup"]["result"] = job.get("result")
+                job["dedup"]["done"].set()
+        return job
+
+    def render(self, jobs: Iterable[Dict[str, Any]]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Display each result and account for its tokens.
+
+        Args:
+            jobs: Jobs with their result, in review order.
+
+        Yields:
+            Tuples of the file path and its analysis result.
+        """
+        for job in jobs:
+            file_path, result = job["file_path"], job["result"]
+            if job.get("shared"):
+                # Computed meanwhile by a concurrent run of the hook
+                self.cache_stats["hits"] += 1
+                self.cache_stats["misses"] -= 1
+                self.cache_stats["shared"] = self.cache_stats.get("shared", 0) + 1
+                result["_meta"] = self._cache_hit_meta(job["model_name"])
+
+            if job.get("patch_key") and (job["file_content"] is not None or job["large_file"]):
+                self.review_cache.put_patch_result(job["patch_key"], result, job["hunk_starts"])
+
+            meta = result.get("_meta") or {}
+            if "estimate" in job and "analysis_time_seconds" in meta:
+                logger.debug(
+                    f"Reviewed {file_path} in {meta['analysis_time_seconds']:.2f}s",
+                    extra={"file_path": file_path, "stage": "call", "duration_seconds": meta["analysis_time_seconds"]},
+                )
+            if "parsing_error" in result and "_meta" not in result:
+                logger.error(f"Error analyzing {file_path}: {result['error']}", extra={"file_path": file_path, "stage": "call"})
+            elif not result.get("_meta", {}).get("skipped"):
+                print(self.formatter.format_analysis_result(result, file_path))
+
+            # Replace the reservation with the tokens actually used
+            if "estimate" in job:
+                meta = result.get("_meta") or {}
+                used_tokens = meta.get("prompt_tokens", 0) + meta.get("response_tokens", 0)
+                self.token_budget.settle(job["estimate"], used_tokens)
+                if self.usage_ledger:
+                    self.usage_ledger.add(used_tokens)
+            self._release_dedup_leader(job)
+            yield file_path, result
+
+    def _make_cache_key(
+        self,
+        file_path: str,
+        model_name: str,
+        language_section: str,
+        diff: str,
+        file_content: Optional[str],
+        large_file: bool,
+        related_section: str = "",
+    ) -> str:
+        """Build the cache key from everything that determines the LLM response."""
+        return self.review_cache.make_key(
+            llm_type=self.llm_type,
+            model=model_name,
+            prompt=self.prompt_fingerprint,
+            structured_output=self.structured_output,
+            language_section=language_section,
+            related_section=related_section,
+            file_path=file_path,
+            diff=normalize_diff_for_cache(diff),
+            content=hashlib.sha256((file_content or "").encode("utf-8")).hexdigest(),
+            chunk_token_budget=self.config.get("chunk_token_budget") if large_file else None,
+            two_phase=self.two_phase,
+        )
+
+    def _make_patch_key(
+        self,
+        file_path: str,
+        model_name: str,
+        language_section: str,
+        patch_id: str,
+        large_file: bool,
+    ) -> str:
+        """Build the cache key of a patch, independent of where it applies and
+        of the surrounding content."""
+        return self.review_cache.make_key(
+            index="patch-id",
+            llm_type=self.llm_type,
+            model=model_name,
+            prompt=self.prompt_fingerprint,
+            structured_output=self.structured_output,
+            language_section=language_section,
+            file_path=file_path,
+            patch_id=patch_id,
+            chunk_token_budget=self.config.get("chunk_token_budget") if large_file else None,
+            two_phase=self.two_phase,
+        )
+
+    def _make_dedup_key(self, job: Dict[str, Any]) -> Optional[str]:
+        """Build the key of a change from its hunks and content, without its
+        path. Related definitions are left out: copies of a file typically
+        refer to each other's definitions."""
+        _, hunks = parse_hunks(job["diff"])
+        if not hunks:
+            return None
+        return ReviewCache.make_key(
+            model=job["model_name"],
+            language_section=job["language_section"],
+            hunks=[[hunk["header"], *hunk["lines"]] for hunk in hunks],
+            content=hashlib.sha256((job["file_content"] or "").encode("utf-8")).hexdigest(),
+            large_file=job["large_file"],
+        )
+
+    def _release_dedup_leader(self, job: Dict[str, Any]) -> None:
+        """Forget a leader and its result once it and all its duplicates so
+        far are rendered. Called from the render stage, which runs on the same
+        thread as build_prompts."""
+        leader = job.get("dedup") or job.get("duplicate_of")
+        if not leader:
+            return
+        leader["pending"] -= 1
+        if leader["pending"] == 0:
+            self.dedup_leaders.pop(leader["key"], None)
+            leader["result"] = None
+
+    def _share_result(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Wait for the review of the identical change and copy its result."""
+        leader = job["duplicate_of"]
+        leader["done"].wait()
+        if leader["result"] is None:
+            return {"error": f"Review of {leader['file_path']} failed", "parsing_error": "Failed to analyze file"}
+        result = copy.deepcopy({k: v for k, v in leader["result"].items() if k != "_meta"})
+        if "parsing_error" not in result:
+            result["_meta"] = {
+                "analysis_time_seconds": 0.0,
+                "timestamp": time.time(),
+                "model": job["model_name"],
+                "llm_type": self.llm_type,
+                "duplicate_of": leader["file_path"],
+            }
+        return result
+
+    def _review(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Analyze one file with the LLM, in chunks for large files."""
+        start_time = time.time()
+        try:
+            def analyze(diff_part: str) -> Dict[str, Any]:
+                return self.llm_client.analyze_code_changes(
+                    diff=diff_part,
+                    file_path=job["file_path"],
+                    file_content=job["file_content"],
+                    prompt_template=self.custom_prompt,
+                    model_name=job["model_name"],
+                    language_section=job["language_section"],
+                    related_section=job["related_section"],
+                )
+
+            if job["large_file"]:
+                result = analyze_in_chunks(
+                    analyze, job["diff"], token_budget=self.chunk_token_budget, max_workers=self.max_workers
+                )
+            else:
+                result = analyze(job["diff"])
+        except Exception as e:
+            return {
+                "error": str(e),
+                "parsing_error": "Failed to analyze file"
+            }
+
+        # Add performance metrics
+        result.setdefault("_meta", {}).update({
+            "analysis_time_seconds": time.time() - start_time,
+            "timestamp": time.time(),
+            "model": job["model_name"],
+            "llm_type": self.llm_type,
+        })
+        if "two_phase" in job:
+            result["_meta"]["two_phase"] = {**job["two_phase"], "deep_seconds": time.time() - start_time}
+        return result
+
+    def _cache_hit_meta(self, model_name: str) -> Dict[str, Any]:
+        """Build the metadata of a result served from the review cache."""
+        return {
+            "analysis_time_seconds": 0.0,
+            "timestamp": time.time(),
+            "model": model_name,
+            "llm_type": self.llm_type,
+            "cache_hit": True,
+        }
+
+
+def analyze_files(
+    files: List[str],
+    config: Dict[str, Any],
+    run_stats: Optional[Dict[str, Any]] = None,
+    revision_range: Optional[Tuple[str, str]] = None,
+    file_diffs: Optional[Dict[str, str]] = None,
+    sink: Optional[ResultSink] = None,
+) -> ResultSink:
+    """
+    Analyze a list of files using the LLM.
+
     Args:
         files: List of file paths to analyze.
         config: Configuration dictionary.
-        
+        run_stats: Dictionary to fill with statistics about the run (optional).
+        revision_range: Base and head revisions when reviewing a commit range
+            instead of the staged changes (optional). File contents are then
+            read from head in the object database.
+        file_diffs: Pre-computed diffs by file path, e.g. of a commit range (optional).
+        sink: Sink receiving each file's analysis result as it is rendered
+            (optional, a new one that only counts results if not provided).
+
     Returns:
-        Dictionary mapping file paths to analysis results.
+        The sink, with the counts of the results.
     """
+    if sink is None:
+        sink = ResultSink()
     api_key = get_api_key(config)
     if not api_key:
-        return {}
-    
+        return sink
+
     # Get the LLM model type from config
     llm_type = config.get("llm_type", "gemini")
-    
+
     try:
         # Initialize clients
-        llm_client = LLMClientFactory.create(llm_type, api_key=api_key)
+        llm_client = LLMClientFactory.create(llm_type, **get_client_kwargs(config, llm_type, api_key))
         formatter = OutputFormatter(verbose=config.get("verbose", False))
+        model_router = ModelRouter(config)
+    except Exception as e:
+        logger.error(f"Error initializing LLM client: {e}")
+        return sink
+
+    review_run = ReviewRun(config, llm_client, formatter, model_router, revision_range, file_diffs)
+    try:
+        review_run.run(files, sink)
+        return sink
+    finally:
+        client_stats = llm_client.get_run_stats()
+        cost = compute_cost(client_stats.get("token_usage", {}), config.get("token_prices") or {})
+        if cost is not None:
+            client_stats["token_usage"]["cost"] = cost
+        if config.get("verbose", False) and "concurrency" in client_stats:
+            print(format_concurrency_timeline(client_stats["concurrency"]))
+        if run_stats is not None:
+            run_stats.update(client_stats)
+            run_stats.update(review_run.get_run_stats())
+        llm_client.close()
+
+
+def get_exit_code(summary: ResultSink, config: Dict[str, Any]) -> int:
+    """
+    Determine the exit code for a set of analysis results.
+    
+    Args:
+        summary: Sink that received the analysis results.
+        config: Configuration dictionary.
         
-        # Custom prompt template if provided
-        custom_prompt = config.get("custom_prompt_template")
-        
-        # Process each file
-        results = {}
-        for file_path in files:
-            if not should_analyze_file(file_path, config):
-                continue
-            
-            # Get file diff and content
-            diff = get_file_diff(file_path)
-            if not diff:
-                print(f"Skipping {file_path}: No changes detected")
-                continue
-            
-            # Get the full file content if available
-            file_content = get_file_content(file_path)
-            
-            # Analyze with LLM
-            try:
-                print(f"Analyzing {file_path}...")
-                start_time = time.time()
-                
-                result = llm_client.analyze_code_changes(
-                    diff=diff,
-                    file_path=file_path,
-                    file_content=file_content,
-                    prompt_template=custom_prompt,
-                )
-                
-                elapsed_time = time.time() - start_time
-                
-                # Add performance metrics
-                result["_meta"] = {
-                    "analysis_time_seconds": elapsed_time,
-                    "timestamp": time.time(),
-                    "model": llm_type
-                }
-                
-                # Display the formatted result
-                print(formatter.format_analysis_result(result, file_path))
-                
-                # Store the result
-                results[file_path] = result
-                
-            except Exception as e:
-                print(f"Error analyzing {file_path}: {e}")
-                results[file_path] = {
-                    "error": str(e),
-                    "parsing_error": "Failed to analyze file"
-                }
-        
-        return results
+    Returns:
+        1 if issues were found and the config asks to fail on issues, 0 otherwise.
+    """
+    has_issues = bool(summary.files_with_issues or summary.files_with_security_concerns)
     
-    except Exception as e:
-        print(f"Error initializing LLM client: {e}")
-        return {}
+    # If configured to fail on issues, return non-zero exit code
+    if config.get("fail_on_issues", False) and has_issues:
+        return 1
+    
+    return 0
+
+
+def update_precheck_state(config: Dict[str, Any], passed: bool) -> None:
+    """
+    Record the compiled file rules, and the staged changes if they passed the
+    review, for the fast precheck of the installed hook.
+    
+    Args:
+        config: Configuration dictionary.
+        passed: Whether the staged changes passed the review.
+    """
+    git_dir = get_git_common_dir()
+    if not git_dir:
+        return
+    rules = compile_precheck_rules(config)
+    fingerprint = None
+    if passed:
+        changes = precheck.get_staged_changes()
+        if changes is not None:
+            fingerprint = precheck.compute_fingerprint(precheck.select_changes(changes, rules), rules)
+    try:
+        precheck.save_state(precheck.get_state_path(git_dir), rules, fingerprint)
+    except OSError as e:
+        logger.warning(f"Warning: Could not save the precheck state: {e}")
 
 
 def main() -> int:
@@ -132,10 +945,19 @@ def main() -> int:
     Returns:
         Exit code (0 for success, non-zero for failure).
     """
+    start_time = time.monotonic()
     parser = argparse.ArgumentParser(description="LLM-powered code review pre-commit hook")
     parser.add_argument("--config", help="Path to config file")
     parser.add_argument("--all", action="store_true", help="Check all files in repo, not just staged files")
     parser.add_argument("--verbose", action="store_true", help="Enable verbose output")
+    parser.add_argument("--shard", help="Only review shard i of N (e.g. 1/4), balanced by diff size")
+    parser.add_argument("--output-json", help="Write the results to a JSON file")
+    parser.add_argument("--range", dest="revision_range",
+                        help="Review the net changes of a commit range (base..head or base...head)")
+    parser.add_argument("--metrics-file", help="Add the run's metrics to a Prometheus textfile collector file")
+    parser.add_argument("filenames", nargs="*",
+                        help="Staged files to review, e.g. as passed by the pre-commit framework "
+                             "(default: all staged files)")
     args = parser.parse_args()
     
     # Load configuration
@@ -146,36 +968,105 @@ def main() -> int:
         config["check_all_files"] = True
     if args.verbose:
         config["verbose"] = True
+    if args.metrics_file:
+        config["metrics_file"] = args.metrics_file
     
     # Setup logging
-    setup_logging(verbose=config.get("verbose", False))
+    setup_logging(
+        verbose=config.get("verbose", False),
+        log_file=config.get("log_file"),
+        log_format=config.get("log_format", DEFAULT_LOG_FORMAT),
+    )
+    
+    shard = None
+    if args.shard:
+        try:
+            shard = parse_shard_spec(args.shard)
+        except ValueError as e:
+            logger.error(f"Error: {e}")
+            return 1
     
     # Get files to analyze
-    files = get_staged_files()
-    if not files:
-        print("No staged files found.")
-        return 0
-    
-    # Analyze files
-    results = analyze_files(files, config)
-    
-    # Print summary
-    if results:
-        print_summary(results)
-    
-    # Determine exit code
-    has_issues = any(
-        ("issues" in result and result["issues"]) or 
-        ("security_concerns" in result and result["security_concerns"])
-        for result in results.values() if isinstance(result, dict)
-    )
+    check_all_files = config.get("check_all_files", False)
+    revision_range = None
+    file_diffs = None
+    if args.revision_range:
+        try:
+            revision_range = resolve_revision_range(args.revision_range)
+        except ValueError as e:
+            logger.error(f"Error: {e}")
+            return 1
+        # Net per-file diffs of the whole range, with a single git invocation
+        diff_options = {**DEFAULT_DIFF_OPTIONS, **(config.get("diff_options") or {})}
+        file_diffs = get_range_diffs(*revision_range, diff_options=diff_options)
+        files = list(file_diffs)
+    elif args.filenames:
+        # The pre-commit framework splits the staged files across parallel
+        # processes; they share the review cache, its locks and the usage ledger
+        files = [f for f in args.filenames if os.path.isfile(f)]
+        # Outside of a commit, e.g. with pre-commit run --all-files or on
+        # unstaged files, review their changes since HEAD instead
+        if files and not set(files) & set(get_staged_files()):
+            config["review_working_tree"] = True
+    elif check_all_files:
+        files = get_tracked_files()
+    else:
+        files = get_staged_files()
     
-    # If configured to fail on issues, return non-zero exit code
-    if config.get("fail_on_issues", False) and has_issues:
-        return 1
+    # Keep only this shard's part of the candidate files
+    if files and shard:
+        include_extensions = set(config.get("include_extensions", DEFAULT_INCLUDE_EXTENSIONS))
+        candidates = filter_files_by_extension(files, include_extensions)
+        if file_diffs is not None:
+            diff_stats = {path: count_changed_lines(diff) for path, diff in file_diffs.items()}
+        else:
+            if check_all_files:
+                diff_base = EMPTY_TREE_SHA
+            elif config.get("review_working_tree"):
+                diff_base = "HEAD"
+            else:
+                diff_base = None
+            diff_stats = get_diff_stats(diff_base)
+        files = shard_files(candidates, diff_stats, *shard)
+        logger.info(f"Shard {shard[0]}/{shard[1]}: {len(files)} of {len(candidates)} candidate files")
     
-    return 0
-
+    # Results are counted and written out as they arrive, not kept in memory
+    sink = ResultSink(args.output_json, shard=args.shard or "")
+    try:
+        run_stats: Dict[str, Any] = {}
+        if files:
+            # Analyze files
+            analyze_files(files, config, run_stats, revision_range, file_diffs, sink=sink)
+            
+            # Print summary
+            if sink.files:
+                print_summary(sink, run_stats)
+        elif shard:
+            logger.info("No files to review in this shard.")
+        elif revision_range:
+            logger.info(f"No changes found in {args.revision_range}.")
+        else:
+            logger.info("No staged files found.")
+        
+        exit_code = get_exit_code(sink, config)
+        
+        # Let the installed hook's precheck skip the reviewer next time when
+        # nothing matches or these staged changes passed
+        plain_run = not (args.config or args.all or args.shard or args.revision_range or args.filenames)
+        if plain_run:
+            reviewed = sink.files > 0 and not sink.incomplete_files
+            update_precheck_state(config, passed=exit_code == 0 and reviewed)
+        
+        # Write machine-readable results, e.g. for merging CI shards
+        sink.finish(run_stats, exit_code)
+    finally:
+        sink.close()
+    
+    # Fleet visibility: totals of all runs on the machine, for node_exporter
+    if config.get("metrics_file"):
+        write_run_metrics(config["metrics_file"], sink, run_stats, time.monotonic() - start_time, exit_code)
+    
+    return exit_code
 
 if __name__ == "__main__":
-    sys.exit(main()) 
\ No newline at end of file
+    sys.exit(main())
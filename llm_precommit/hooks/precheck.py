@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Fast precheck run by the installed pre-commit hook before the full reviewer.
+
+Starting the reviewer imports YAML, colorama and the provider SDK, which takes
+far longer than most commits need. This script only uses the standard library:
+it matches the staged paths against the include/exclude rules compiled by the
+last full run and exits 0 when nothing needs a review, either because no
+staged file matches the rules or because the same staged changes already
+passed a review. Otherwise, or whenever in doubt, it exits 1 and the hook
+runs the full reviewer.
+"""
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+# Must match CACHE_DIR_NAME and DEFAULT_CONFIG_PATHS in llm_precommit.constants,
+# which are not imported to keep the startup minimal
+CACHE_DIR_NAME = "llm-precommit"
+CONFIG_PATHS = [
+    ".llm-precommit.yml",
+    ".llm-precommit/config.yml",
+    os.path.join(os.path.expanduser("~"), ".llm-precommit.yml"),
+    os.path.join(os.path.expanduser("~"), ".llm-precommit/config.yml"),
+]
+STATE_FILE_NAME = "precheck.json"
+STATE_VERSION = 1
+
+# Reasons to skip the full reviewer
+NO_MATCHING_FILES = "no staged files to review"
+ALREADY_REVIEWED = "staged changes already reviewed"
+
+# One staged change: status, new blob SHA and path
+StagedChange = Tuple[str, str, str]
+
+
+def get_state_path(git_dir: str) -> str:
+    """
+    Get the path of the precheck state.
+
+    Args:
+        git_dir: The common git directory.
+
+    Returns:
+        Path of the JSON state file.
+    """
+    return os.path.join(git_dir, CACHE_DIR_NAME, STATE_FILE_NAME)
+
+
+def get_config_signatures() -> Dict[str, Optional[List[int]]]:
+    """
+    Identify the versions of all candidate configuration files.
+
+    Returns:
+        Dictionary mapping each candidate path to its modification time in
+        nanoseconds and size, or None if it does not exist.
+    """
+    signatures: Dict[str, Optional[List[int]]] = {}
+    for path in CONFIG_PATHS:
+        try:
+            stat = os.stat(path)
+            signatures[path] = [stat.st_mtime_ns, stat.st_size]
+        except OSError:
+            signatures[path] = None
+    return signatures
+
+
+def parse_staged_changes(raw_output: str) -> List[StagedChange]:
+    """
+    Parse the output of `git diff --cached --raw -z --no-renames --no-abbrev`.
+
+    Args:
+        raw_output: The NUL-separated raw diff.
+
+    Returns:
+        The staged changes.
+    """
+    fields = raw_output.split("\0")
+    changes = []
+    for i in range(0, len(fields) - 1, 2):
+        header, path = fields[i], fields[i + 1]
+        parts = header.split()
+        if len(parts) < 5:
+            continue
+        changes.append((parts[4], parts[3], path))
+    return changes
+
+
+def get_staged_changes() -> Optional[List[StagedChange]]:
+    """
+    Get the staged changes with their blob SHAs, in a single git invocation.
+
+    Returns:
+        The staged changes, or None if git failed.
+    """
+    cmd = ["git", "diff", "--cached", "--raw", "-z", "--no-renames", "--no-abbrev"]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    except (subprocess.CalledProcessError, OSError):
+        return None
+    return parse_staged_changes(result.stdout)
+
+
+def select_changes(changes: List[StagedChange], rules: Dict[str, Any]) -> List[StagedChange]:
+    """
+    Keep the changes of files the reviewer would consider.
+
+    Args:
+        changes: The staged changes.
+        rules: Compiled rules with "include_extensions" and "exclude_regex".
+
+    Returns:
+        Changes of files that are not deleted, have an included extension and
+        match no exclude pattern.
+    """
+    extensions = tuple(rules["include_extensions"])
+    exclude = re.compile(rules["exclude_regex"])
+    return [
+        change for change in changes
+        if change[0] != "D" and change[2].endswith(extensions) and not exclude.match(change[2])
+    ]
+
+
+def compute_fingerprint(changes: List[StagedChange], rules: Dict[str, Any]) -> str:
+    """
+    Identify the staged content of the selected files under the given rules.
+
+    Args:
+        changes: The selected staged changes.
+        rules: The compiled rules.
+
+    Returns:
+        Hex digest of the changes and rules.
+    """
+    digest = hashlib.sha256(json.dumps(rules, sort_keys=True).encode("utf-8"))
+    for status, sha, path in sorted(changes, key=lambda change: change[2]):
+        digest.update(f"{status} {sha} {path}\0".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_state(path: str) -> Optional[Dict[str, Any]]:
+    """
+    Read the precheck state.
+
+    Args:
+        path: Path of the state file.
+
+    Returns:
+        The state, or None if it is missing, unreadable or of another version.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(state, dict) or state.get("version") != STATE_VERSION:
+        return None
+    return state
+
+
+def save_state(path: str, rules: Dict[str, Any], passed_fingerprint: Optional[str]) -> None:
+    """
+    Write the precheck state atomically.
+
+    Args:
+        path: Path of the state file.
+        rules: Compiled rules of the current configuration.
+        passed_fingerprint: Fingerprint of staged changes that passed the
+            review, or None.
+    """
+    state = {
+        "version": STATE_VERSION,
+        "config_signatures": get_config_signatures(),
+        "rules": rules,
+        "passed_fingerprint": passed_fingerprint,
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(temp_path, path)
+
+
+def check(state: Optional[Dict[str, Any]], changes: Optional[List[StagedChange]]) -> Optional[str]:
+    """
+    Decide whether the full reviewer can be skipped.
+
+    Args:
+        state: The precheck state, or None.
+        changes: The staged changes, or None if unknown.
+
+    Returns:
+        The reason to skip the review, or None to run it.
+    """
+    if state is None or changes is None:
+        return None
+    rules = state.get("rules") or {}
+    # Rules compiled from another configuration no longer apply
+    if rules.get("check_all_files") or state.get("config_signatures") != get_config_signatures():
+        return None
+    selected = select_changes(changes, rules)
+    if not selected:
+        return NO_MATCHING_FILES
+    if state.get("passed_fingerprint") == compute_fingerprint(selected, rules):
+        return ALREADY_REVIEWED
+    return None
+
+
+def main() -> int:
+    """
+    Main entry point of the precheck.
+
+    Returns:
+        0 if the review can be skipped, 1 to run the full reviewer.
+    """
+    # Any option needs the full reviewer
+    if len(sys.argv) > 1:
+        return 1
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--git-common-dir"], capture_output=True, text=True, check=True
+        )
+        state = load_state(get_state_path(os.path.abspath(result.stdout.strip())))
+        reason = check(state, get_staged_changes() if state else None)
+    except Exception:
+        return 1
+    if reason is None:
+        return 1
+    if reason == ALREADY_REVIEWED:
+        print(f"LLM code review: {reason.capitalize()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+"""
+Chunked review of large diffs.
+"""
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, List
+
+from llm_precommit.utils.diff_utils import parse_hunks, build_diff
+from llm_precommit.utils.token_utils import estimate_tokens
+
+# Result keys holding lists of findings
+FINDING_KEYS = ("issues", "coding_convention_issues", "security_concerns")
+
+# Per-call token counts in result metadata, summed over chunks
+TOKEN_META_KEYS = ("prompt_tokens", "response_tokens")
+
+
+def split_diff_into_chunks(diff: str, token_budget: int) -> List[str]:
+    """
+    Split a single-file diff into groups of hunks that each fit a token budget.
+
+    Every chunk is a valid diff with the original file header and hunk headers,
+    so line numbers in the hunk headers still refer to the real file. Hunks
+    larger than the budget are split into smaller hunks.
+
+    Args:
+        diff: The git diff content for one file.
+        token_budget: Approximate maximum number of tokens per chunk.
+
+    Returns:
+        List of chunk diffs, in file order.
+    """
+    header, hunks = parse_hunks(diff)
+    header_tokens = estimate_tokens("\n".join(header))
+    hunk_budget = max(token_budget - header_tokens, 1)
+
+    chunks: List[str] = []
+    current: List[Dict[str, Any]] = []
+    current_tokens = header_tokens
+    for hunk in hunks:
+        for piece in _split_hunk(hunk, hunk_budget):
+            piece_tokens = _hunk_tokens(piece)
+            if current and current_tokens + piece_tokens > token_budget:
+                chunks.append(build_diff(header, current))
+                current = []
+                current_tokens = header_tokens
+            current.append(piece)
+            current_tokens += piece_tokens
+
+    if current:
+        chunks.append(build_diff(header, current))
+    return chunks
+
+
+def analyze_in_chunks(
+    analyze: Callable[[str], Dict[str, Any]],
+    diff: str,
+    token_budget: int,
+    max_workers: int,
+) -> Dict[str, Any]:
+    """
+    Analyze a large diff chunk by chunk in parallel and merge the results.
+
+    Args:
+        analyze: Function analyzing one chunk diff and returning its result.
+        diff: The git diff content for one file.
+        token_budget: Approximate maximum number of tokens per chunk.
+        max_workers: Maximum number of chunks analyzed concurrently.
+
+    Returns:
+        The merged analysis result for the whole file.
+    """
+    chunks = split_diff_into_chunks(diff, token_budget)
+    if not chunks:
+        return analyze(diff)
+
+    def analyze_chunk(chunk: str) -> Dict[str, Any]:
+        try:
+            return analyze(chunk)
+        except Exception as e:
+            return {"error": str(e), "parsing_error": "Failed to analyze chunk"}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as executor:
+        results = list(executor.map(analyze_chunk, chunks))
+
+    return merge_chunk_results(results, chunks)
+
+
+def merge_chunk_results(results: List[Dict[str, Any]], chunks: List[str]) -> Dict[str, Any]:
+    """
+    Merge per-chunk results into one per-file result.
+
+    Chunks keep the real hunk headers, so line numbers are kept as reported.
+    Findings with the same severity and description are collapsed into one,
+    listing all their lines. When some chunks failed, the merged result has
+    an "error" telling how much of the file was not reviewed.
+
+    Args:
+        results: Analysis results, one per chunk.
+        chunks: The chunk diffs, in the same order as the results.
+
+    Returns:
+        The merged analysis result.
+    """
+    succeeded = [(r, c) for r, c in zip(results, chunks) if "parsing_error" not in r]
+    meta: Dict[str, Any] = {"chunks": len(chunks), "failed_chunks": len(chunks) - len(succeeded)}
+    for result in results:
+        chunk_meta = result.get("_meta") or {}
+        for key in TOKEN_META_KEYS:
+            if key in chunk_meta:
+                meta[key] = meta.get(key, 0) + chunk_meta[key]
+        if chunk_meta.get("tokens_estimated"):
+            meta["tokens_estimated"] = True
+    if not succeeded:
+        merged = dict(results[0]) if results else {}
+        merged["_meta"] = meta
+        return merged
+
+    merged: Dict[str, Any] = {key: [] for key in FINDING_KEYS}
+    if meta["failed_chunks"]:
+        failure = next(r for r in results if "parsing_error" in r)
+        merged["error"] = (
+            f"{meta['failed_chunks']} of {len(chunks)} chunks could not be reviewed: "
+            f"{failure.get('error') or failure['parsing_error']}"
+        )
+    seen: Dict[tuple, Dict[str, Any]] = {}
+    feedback: List[str] = []
+    summaries: List[str] = []
+    positive_aspects: List[str] = []
+
+    for result, _ in succeeded:
+        for key in FINDING_KEYS:
+            for finding in result.get(key) or []:
+                if not isinstance(finding, dict):
+                    continue
+                finding = dict(finding)
+                dedup_key = (
+                    key,
+                    str(finding.get("severity", "")).lower(),
+                    _normalize_text(finding.get("description", "")),
+                )
+                existing = seen.get(dedup_key)
+                if existing is None:
+                    seen[dedup_key] = finding
+                    merged[key].append(finding)
+                elif finding.get("line_number"):
+                    existing_lines = str(existing.get("line_number") or "")
+                    new_lines = str(finding["line_number"])
+                    if new_lines not in existing_lines.split(", "):
+                        existing["line_number"] = f"{existing_lines}, {new_lines}" if existing_lines else new_lines
+
+        for text, collected in ((result.get("general_feedback"), feedback), (result.get("summary"), summaries)):
+            if text and text not in collected:
+                collected.append(text)
+        for aspect in result.get("positive_aspects") or []:
+            if aspect not in positive_aspects:
+                positive_aspects.append(aspect)
+        if result.get("file_type") and "file_type" not in merged:
+            merged["file_type"] = result["file_type"]
+
+    if feedback:
+        merged["general_feedback"] = "\n".join(feedback)
+    if summaries:
+        merged["summary"] = " ".join(summaries)
+    if positive_aspects:
+        merged["positive_aspects"] = positive_aspects
+    merged["_meta"] = meta
+    return merged
+
+
+def _split_hunk(hunk: Dict[str, Any], token_budget: int) -> List[Dict[str, Any]]:
+    """
+    Split a hunk that exceeds the token budget into consecutive smaller hunks.
+
+    Args:
+        hunk: The hunk, as returned by `parse_hunks`.
+        token_budget: Approximate maximum number of tokens per hunk.
+
+    Returns:
+        List of hunks with correct ranges in their headers.
+    """
+    if _hunk_tokens(hunk) <= token_budget:
+        return [hunk]
+
+    pieces: List[Dict[str, Any]] = []
+    old_line, new_line = hunk["old_start"], hunk["new_start"]
+    lines: List[str] = []
+    tokens = 0
+    piece_old, piece_new = old_line, new_line
+
+    def flush() -> None:
+        old_count = sum(1 for line in lines if not line.startswith(("+", "\\")))
+        new_count = sum(1 for line in lines if not line.startswith(("-", "\\")))
+        pieces.append({
+            "header": f"@@ -{piece_old},{old_count} +{piece_new},{new_count} @@",
+            "old_start": piece_old,
+            "old_count": old_count,
+            "new_start": piece_new,
+            "new_count": new_count,
+            "lines": list(lines),
+        })
+
+    for line in hunk["lines"]:
+        line_tokens = estimate_tokens(line) + 1
+        if lines and tokens + line_tokens > token_budget:
+            flush()
+            lines, tokens = [], 0
+            piece_old, piece_new = old_line, new_line
+        lines.append(line)
+        tokens += line_tokens
+        if not line.startswith(("+", "\\")):
+            old_line += 1
+        if not line.startswith(("-", "\\")):
+            new_line += 1
+
+    if lines:
+        flush()
+    return pieces
+
+
+def _hunk_tokens(hunk: Dict[str, Any]) -> int:
+    """
+    Estimate the number of tokens in a hunk.
+
+    Args:
+        hunk: The hunk, as returned by `parse_hunks`.
+
+    Returns:
+        Estimated token count.
+    """
+    return estimate_tokens(hunk["header"]) + sum(estimate_tokens(line) + 1 for line in hunk["lines"])
+
+
+def _normalize_text(text: Any) -> str:
+    """
+    Normalize a finding description for duplicate detection.
+
+    Args:
+        text: The description.
+
+    Returns:
+        Lowercase text with punctuation and repeated whitespace removed.
+    """
+    return re.sub(r"\W+", " ", str(text).lower()).strip()
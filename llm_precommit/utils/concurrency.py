@@ -0,0 +1,227 @@
+"""
+Adaptive concurrency control for LLM calls.
+"""
+import threading
+import time
+from typing import Dict, Any, Hashable, List, Optional
+
+from llm_precommit.constants import (
+    DEFAULT_ADAPTIVE_CONCURRENCY,
+    DEFAULT_INITIAL_CONCURRENCY,
+    DEFAULT_LATENCY_SPIKE_FACTOR,
+    DEFAULT_MAX_CONCURRENT_ANALYSES,
+    OVERLOAD_ERROR_MARKERS,
+)
+
+
+class AdaptiveConcurrencyController:
+    """
+    AIMD (additive increase, multiplicative decrease) limit on concurrent LLM calls.
+
+    Every successful call with a normal latency raises the limit by 1/limit,
+    i.e. by about one per round of calls. A rate limit or overload error, or a
+    latency spike, multiplies the limit by `decrease_factor`. Decreases are
+    applied at most once per smoothed latency, so a burst of failures from the
+    same round only backs off once. Spikes are judged against the baseline of
+    calls of the same latency class (e.g. model and prompt size), since a
+    full-file review is normally much slower than a screening call.
+
+    One controller is shared by all calls of a run.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = DEFAULT_INITIAL_CONCURRENCY,
+        min_limit: int = 1,
+        max_limit: int = DEFAULT_MAX_CONCURRENT_ANALYSES,
+        decrease_factor: float = 0.5,
+        latency_spike_factor: float = DEFAULT_LATENCY_SPIKE_FACTOR,
+        smoothing: float = 0.3,
+    ):
+        """
+        Initialize the controller.
+
+        Args:
+            initial_limit: Number of concurrent calls allowed at the start.
+            min_limit: Lowest limit backoff can reach.
+            max_limit: Highest limit additive increase can reach.
+            decrease_factor: Factor applied to the limit on overload.
+            latency_spike_factor: A call slower than this multiple of the
+                baseline latency counts as overload.
+            smoothing: Weight of the newest sample in the latency average.
+        """
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.decrease_factor = decrease_factor
+        self.latency_spike_factor = latency_spike_factor
+        self.smoothing = smoothing
+
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._start_time = time.monotonic()
+        self._last_decrease = float("-inf")
+        self._smoothed_latency: Optional[float] = None
+        # Smoothed and baseline latencies by latency class
+        self._class_latencies: Dict[Hashable, float] = {}
+        self._baseline_latencies: Dict[Hashable, float] = {}
+        self._overloads = 0
+        self._latency_spikes = 0
+        self._peak_limit = int(self.limit)
+        self.timeline: List[Dict[str, Any]] = [self._timeline_entry("start")]
+
+    def acquire(self) -> None:
+        """
+        Wait until a call may start.
+        """
+        with self._condition:
+            while self._in_flight >= int(self.limit):
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release(
+        self,
+        latency: Optional[float] = None,
+        overloaded: bool = False,
+        latency_class: Hashable = None,
+    ) -> None:
+        """
+        Finish a call and adjust the limit from its outcome.
+
+        Args:
+            latency: Duration of a successful call in seconds (optional).
+            overloaded: Whether the call failed with a rate limit or overload error.
+            latency_class: Kind of call whose latencies are comparable, e.g. a
+                tuple of the model, call type and prompt size (optional).
+        """
+        with self._condition:
+            self._in_flight -= 1
+            if overloaded:
+                self._overloads += 1
+                self._decrease("overload")
+            elif latency is not None:
+                self._record_latency(latency, latency_class)
+            self._condition.notify_all()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get statistics about the limit over the run.
+
+        Returns:
+            Dictionary with the final and peak limits, overload counts and the
+            timeline of limit changes.
+        """
+        with self._condition:
+            return {
+                "final_limit": int(self.limit),
+                "peak_limit": self._peak_limit,
+                "overloads": self._overloads,
+                "latency_spikes": self._latency_spikes,
+                "timeline": list(self.timeline),
+            }
+
+    def _record_latency(self, latency: float, latency_class: Hashable = None) -> None:
+        """
+        Update the latency averages and grow or shrink the limit. Called with
+        the condition held.
+
+        Args:
+            latency: Duration of a successful call in seconds.
+            latency_class: Kind of call the latency is compared with.
+        """
+        # Decreases are spaced by the latency of all calls
+        if self._smoothed_latency is None:
+            self._smoothed_latency = latency
+        else:
+            self._smoothed_latency += self.smoothing * (latency - self._smoothed_latency)
+
+        smoothed = self._class_latencies.get(latency_class)
+        if smoothed is None:
+            smoothed = baseline = latency
+        else:
+            smoothed += self.smoothing * (latency - smoothed)
+            # The baseline follows improvements immediately and degradations slowly
+            baseline = self._baseline_latencies[latency_class]
+            baseline = min(smoothed, baseline + self.smoothing / 10 * (smoothed - baseline))
+        self._class_latencies[latency_class] = smoothed
+        self._baseline_latencies[latency_class] = baseline
+
+        if latency > baseline * self.latency_spike_factor:
+            self._latency_spikes += 1
+            self._decrease("latency")
+            return
+
+        previous = int(self.limit)
+        self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        if int(self.limit) != previous:
+            self._peak_limit = max(self._peak_limit, int(self.limit))
+            self.timeline.append(self._timeline_entry("increase"))
+
+    def _decrease(self, reason: str) -> None:
+        """
+        Multiplicatively decrease the limit. Called with the condition held.
+
+        Args:
+            reason: Why the limit is decreased ("overload" or "latency").
+        """
+        now = time.monotonic()
+        if now - self._last_decrease < (self._smoothed_latency or 0):
+            return
+        self._last_decrease = now
+        previous = int(self.limit)
+        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+        if int(self.limit) != previous:
+            self.timeline.append(self._timeline_entry(reason))
+
+    def _timeline_entry(self, reason: str) -> Dict[str, Any]:
+        """
+        Build a timeline entry for the current limit.
+
+        Args:
+            reason: Why the limit changed.
+
+        Returns:
+            Dictionary with the elapsed time, limit and reason.
+        """
+        return {
+            "elapsed_seconds": round(time.monotonic() - self._start_time, 3),
+            "limit": int(self.limit),
+            "reason": reason,
+        }
+
+
+def create_concurrency_controller(config: Dict[str, Any]) -> AdaptiveConcurrencyController:
+    """
+    Create the concurrency controller configured for the run.
+
+    Args:
+        config: Configuration dictionary.
+
+    Returns:
+        An adaptive controller, or one with a fixed limit of
+        max_concurrent_analyses if adaptive concurrency is disabled.
+    """
+    max_limit = config.get("max_concurrent_analyses", DEFAULT_MAX_CONCURRENT_ANALYSES)
+    if not config.get("adaptive_concurrency", DEFAULT_ADAPTIVE_CONCURRENCY):
+        return AdaptiveConcurrencyController(initial_limit=max_limit, min_limit=max_limit, max_limit=max_limit)
+    return AdaptiveConcurrencyController(
+        initial_limit=config.get("initial_concurrency", DEFAULT_INITIAL_CONCURRENCY),
+        max_limit=max_limit,
+    )
+
+
+def is_overload_error(error: BaseException) -> bool:
+    """
+    Check if an error means the LLM service is rate limiting or overloaded.
+
+    Args:
+        error: The exception raised by the provider SDK.
+
+    Returns:
+        True for 429/503-style errors.
+    """
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    if code in (429, 503):
+        return True
+    text = f"{type(error).__name__} {error}".lower()
+    return any(marker in text for marker in OVERLOAD_ERROR_MARKERS)
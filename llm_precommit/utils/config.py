@@ -1,20 +1,59 @@
 """
 Configuration utilities for LLM pre-commit hooks.
 """
+import logging
 import os
+import re
+import fnmatch
+import functools
 import yaml
-from typing import Dict, Any, Optional, Set, List
+from typing import Dict, Any, Optional, Pattern, Set, List, Tuple
 
 from llm_precommit.constants import (
     DEFAULT_CONFIG_PATHS,
     DEFAULT_API_KEY_ENV_VAR,
     DEFAULT_LLM_TYPE,
     DEFAULT_MODEL_NAME,
+    DEFAULT_MODEL_ROUTING_RULES,
+    DEFAULT_PRIORITY_SCHEDULING,
+    DEFAULT_RISK_RULES,
     DEFAULT_INCLUDE_EXTENSIONS,
     DEFAULT_EXCLUDE_PATTERNS,
     DEFAULT_MAX_FILE_SIZE_KB,
+    DEFAULT_LARGE_FILE_MODE,
+    DEFAULT_CHUNK_TOKEN_BUDGET,
+    DEFAULT_MAX_CONCURRENT_ANALYSES,
+    DEFAULT_DIFF_OPTIONS,
+    DEFAULT_ADAPTIVE_CONCURRENCY,
+    DEFAULT_INITIAL_CONCURRENCY,
+    DEFAULT_MAX_RETRIES,
     DEFAULT_PROMPT_TEMPLATE,
+    DEFAULT_PROMPT_CACHING,
+    DEFAULT_PROMPT_CACHE_TTL_MINUTES,
+    DEFAULT_TRIAGE_TRIVIAL_CHANGES,
+    DEFAULT_TWO_PHASE_BATCH_TOKENS,
+    DEFAULT_TWO_PHASE_REVIEW,
+    DEFAULT_CONTENT_SNIFFING,
+    DEFAULT_SYMBOL_CONTEXT,
+    DEFAULT_SYMBOL_CONTEXT_TOKEN_BUDGET,
+    DEFAULT_CACHE_ENABLED,
+    DEFAULT_CACHE_TTL_DAYS,
+    DEFAULT_PATCH_ID_CACHE,
+    DEFAULT_METRICS_FILE,
+    DEFAULT_LOG_FORMAT,
+    DEFAULT_SINGLE_FLIGHT_TIMEOUT_SECONDS,
+    DEFAULT_MAX_TOKENS_PER_RUN,
+    DEFAULT_MAX_TOKENS_PER_DAY,
+    DEFAULT_CONNECT_TIMEOUT_SECONDS,
+    DEFAULT_READ_TIMEOUT_SECONDS,
+    DEFAULT_RESPONSE_PROFILE,
+    DEFAULT_STRUCTURED_OUTPUT,
+    SNIFF_REASONS,
 )
+from llm_precommit.utils.content_sniffer import sniff_file
+from llm_precommit.utils.git_utils import get_blob_size
+
+logger = logging.getLogger(__name__)
 
 
 def load_config(config_path: Optional[str] = None) -> Dict[str, Any]:
@@ -32,12 +71,48 @@ def load_config(config_path: Optional[str] = None) -> Dict[str, Any]:
         "api_key_env_var": DEFAULT_API_KEY_ENV_VAR,
         "llm_type": DEFAULT_LLM_TYPE,
         "model_name": DEFAULT_MODEL_NAME,
+        "model_routing_rules": DEFAULT_MODEL_ROUTING_RULES,  # Per-file model selection rules
+        "priority_scheduling": DEFAULT_PRIORITY_SCHEDULING,  # Review the riskiest, then the smallest, changes first
+        "risk_rules": DEFAULT_RISK_RULES,  # Weighted path, extension and diff size rules scoring the risk of a file
         "include_extensions": DEFAULT_INCLUDE_EXTENSIONS,
         "exclude_patterns": DEFAULT_EXCLUDE_PATTERNS,
         "max_file_size_kb": DEFAULT_MAX_FILE_SIZE_KB,
+        "large_file_mode": DEFAULT_LARGE_FILE_MODE,  # "skip" or "chunk" for files over max_file_size_kb
+        "chunk_token_budget": DEFAULT_CHUNK_TOKEN_BUDGET,  # Approximate tokens per chunk in chunk mode
+        "diff_options": DEFAULT_DIFF_OPTIONS,  # Context lines, algorithm, whitespace and moved code handling
+        "max_concurrent_analyses": DEFAULT_MAX_CONCURRENT_ANALYSES,  # Upper bound on concurrent LLM calls
+        "adaptive_concurrency": DEFAULT_ADAPTIVE_CONCURRENCY,  # Adjust concurrency to latency and 429/503 errors
+        "initial_concurrency": DEFAULT_INITIAL_CONCURRENCY,
+        "max_retries": DEFAULT_MAX_RETRIES,  # Retries of rate-limited or overloaded calls
+        "content_sniffing": DEFAULT_CONTENT_SNIFFING,  # Skip binary, minified and generated files
+        "triage_trivial_changes": DEFAULT_TRIAGE_TRIVIAL_CHANGES,  # Skip whitespace/comment-only edits, renames, etc.
+        "two_phase_review": DEFAULT_TWO_PHASE_REVIEW,  # Screen hunks cheaply, review only the flagged ones in full
+        "two_phase_screening_model": None,  # Model of the screening pass, defaults to model_name
+        "two_phase_batch_tokens": DEFAULT_TWO_PHASE_BATCH_TOKENS,
         "verbose": False,
         "check_all_files": False,  # If True, check all files in the repo, not just staged files
         "custom_prompt_template": None,
+        "language_profiles": {},  # Per-extension overrides of the language prompt profiles
+        "symbol_context": DEFAULT_SYMBOL_CONTEXT,  # Add signatures of related definitions from other files
+        "symbol_context_token_budget": DEFAULT_SYMBOL_CONTEXT_TOKEN_BUDGET,
+        "cache_enabled": DEFAULT_CACHE_ENABLED,  # Reuse results of identical reviews across runs
+        "cache_dir": None,  # Defaults to llm-precommit/cache inside the git directory
+        "cache_ttl_days": DEFAULT_CACHE_TTL_DAYS,
+        "patch_id_cache": DEFAULT_PATCH_ID_CACHE,  # Reuse results of the same patch at other line numbers
+        "single_flight_timeout_seconds": DEFAULT_SINGLE_FLIGHT_TIMEOUT_SECONDS,  # Wait for identical in-flight reviews
+        "max_tokens_per_run": DEFAULT_MAX_TOKENS_PER_RUN,  # Token budget of a run (None for unlimited)
+        "max_tokens_per_day": DEFAULT_MAX_TOKENS_PER_DAY,  # Token budget of all runs in a day on this machine
+        "token_prices": {},  # Per-model prices per million tokens, e.g. {model: {input: 0.1, output: 0.4}}
+        "prompt_caching": DEFAULT_PROMPT_CACHING,  # Reuse the static prompt prefix via provider-side caching
+        "prompt_cache_ttl_minutes": DEFAULT_PROMPT_CACHE_TTL_MINUTES,
+        "response_profile": DEFAULT_RESPONSE_PROFILE,  # "full": all fields, "lean": the displayed fields only
+        "structured_output": DEFAULT_STRUCTURED_OUTPUT,  # Constrain responses to a JSON schema where supported
+        "base_url": None,  # API URL for llm_type openai, e.g. http://localhost:11434/v1 for Ollama
+        "connect_timeout_seconds": DEFAULT_CONNECT_TIMEOUT_SECONDS,
+        "read_timeout_seconds": DEFAULT_READ_TIMEOUT_SECONDS,
+        "log_file": None,  # Also write all log messages, including debug ones, to this file
+        "log_format": DEFAULT_LOG_FORMAT,  # "text" or "json" (structured records for log collectors)
+        "metrics_file": DEFAULT_METRICS_FILE,  # Prometheus textfile collector output, e.g. .../textfile/llm_precommit.prom
         "fail_on_issues": False,  # If True, the hook will fail if issues are found
     }
     
@@ -57,19 +132,20 @@ def load_config(config_path: Optional[str] = None) -> Dict[str, Any]:
                     # Merge user config with default config
                     default_config.update(user_config)
         except Exception as e:
-            print(f"Error loading config from {config_path}: {e}")
-            print("Using default configuration.")
+            logger.error(f"Error loading config from {config_path}: {e}")
+            logger.error("Using default configuration.")
     
     return default_config
 
 
-def should_analyze_file(file_path: str, config: Dict[str, Any]) -> bool:
+def should_analyze_file(file_path: str, config: Dict[str, Any], revision: Optional[str] = None) -> bool:
     """
     Determine if a file should be analyzed based on configuration.
     
     Args:
         file_path: Path to the file.
         config: Configuration dictionary.
+        revision: Revision to check the file at instead of the working tree (optional).
         
     Returns:
         True if the file should be analyzed, False otherwise.
@@ -81,28 +157,109 @@ def should_analyze_file(file_path: str, config: Dict[str, Any]) -> bool:
     
     # Check exclude patterns
     exclude_patterns = config.get("exclude_patterns", DEFAULT_EXCLUDE_PATTERNS)
-    if any(pattern in file_path for pattern in exclude_patterns):
+    if compile_exclude_patterns(tuple(exclude_patterns)).match(file_path):
         return False
     
     # Check file exists
-    if not os.path.isfile(file_path):
-        print(f"Skipping {file_path}: File does not exist")
+    if revision is not None:
+        blob_size = get_blob_size(file_path, revision)
+        if blob_size is None:
+            logger.info(f"Skipping {file_path}: File does not exist at {revision or 'the index'}",
+                        extra={"file_path": file_path, "stage": "filter"})
+            return False
+    elif not os.path.isfile(file_path):
+        logger.info(f"Skipping {file_path}: File does not exist", extra={"file_path": file_path, "stage": "filter"})
         return False
     
     # Check file size
     max_file_size_kb = config.get("max_file_size_kb", DEFAULT_MAX_FILE_SIZE_KB)
     try:
-        file_size_kb = os.path.getsize(file_path) / 1024
+        file_size_kb = (blob_size if revision is not None else os.path.getsize(file_path)) / 1024
         if file_size_kb > max_file_size_kb:
-            print(f"Skipping {file_path}: File size ({file_size_kb:.2f} KB) exceeds limit ({max_file_size_kb} KB)")
-            return False
+            if config.get("large_file_mode", DEFAULT_LARGE_FILE_MODE) != "chunk":
+                logger.info(f"Skipping {file_path}: File size ({file_size_kb:.2f} KB) exceeds limit ({max_file_size_kb} KB). "
+                            f"Set large_file_mode: chunk to review it in chunks.",
+                            extra={"file_path": file_path, "stage": "filter"})
+                return False
     except Exception as e:
-        print(f"Error checking file size for {file_path}: {e}")
+        logger.error(f"Error checking file size for {file_path}: {e}", extra={"file_path": file_path, "stage": "filter"})
         return False
     
+    # Check the first few KB for binary, minified and generated content
+    if config.get("content_sniffing", DEFAULT_CONTENT_SNIFFING):
+        reason = sniff_file(file_path, config, revision)
+        if reason:
+            logger.info(f"Skipping {file_path}: {SNIFF_REASONS[reason].capitalize()}",
+                        extra={"file_path": file_path, "stage": "filter"})
+            return False
+    
     return True
 
 
+@functools.lru_cache(maxsize=16)
+def compile_exclude_patterns(patterns: Tuple[str, ...]) -> Pattern[str]:
+    """
+    Compile exclude patterns into a single regular expression.
+    
+    Patterns with glob characters (*, ?, [) match the whole path or any part
+    of it after a slash, e.g. "test_*" matches "src/test_utils.py". Other
+    patterns match anywhere in the path, e.g. "node_modules/".
+    
+    Args:
+        patterns: The exclude patterns.
+        
+    Returns:
+        Compiled expression to match against file paths with `match`.
+    """
+    alternatives = []
+    for pattern in patterns:
+        if any(char in pattern for char in "*?["):
+            alternatives.append(f"(?:.*/)?{fnmatch.translate(pattern)}")
+        else:
+            alternatives.append(f"(?s:.*){re.escape(pattern)}")
+    return re.compile("|".join(alternatives) or "(?!)")
+
+
+def compile_precheck_rules(config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Compile the file selection rules for the hook's fast precheck, which
+    cannot load the configuration itself.
+    
+    Args:
+        config: Configuration dictionary.
+        
+    Returns:
+        Rules with the included extensions and the exclude expression.
+    """
+    exclude_patterns = config.get("exclude_patterns", DEFAULT_EXCLUDE_PATTERNS)
+    return {
+        "include_extensions": sorted(set(config.get("include_extensions", DEFAULT_INCLUDE_EXTENSIONS))),
+        "exclude_regex": compile_exclude_patterns(tuple(exclude_patterns)).pattern,
+        "check_all_files": bool(config.get("check_all_files", False)),
+    }
+
+
+def is_large_file(file_path: str, config: Dict[str, Any], revision: Optional[str] = None) -> bool:
+    """
+    Check if a file exceeds the configured size limit.
+    
+    Args:
+        file_path: Path to the file.
+        config: Configuration dictionary.
+        revision: Revision to check the file at instead of the working tree (optional).
+        
+    Returns:
+        True if the file is larger than max_file_size_kb, False otherwise.
+    """
+    max_file_size_kb = config.get("max_file_size_kb", DEFAULT_MAX_FILE_SIZE_KB)
+    if revision is not None:
+        return (get_blob_size(file_path, revision) or 0) / 1024 > max_file_size_kb
+    try:
+        return os.path.getsize(file_path) / 1024 > max_file_size_kb
+    except OSError:
+        return False
+
+
 def create_default_config_file(config_path: str = ".llm-precommit.yml") -> bool:
     """
     Create a default configuration file.
@@ -117,6 +274,7 @@ def create_default_config_file(config_path: str = ".llm-precommit.yml") -> bool:
         "api_key_env_var": DEFAULT_API_KEY_ENV_VAR,
         "llm_type": DEFAULT_LLM_TYPE,
         "model_name": DEFAULT_MODEL_NAME,
+        "model_routing_rules": DEFAULT_MODEL_ROUTING_RULES,
         "include_extensions": DEFAULT_INCLUDE_EXTENSIONS,
         "exclude_patterns": DEFAULT_EXCLUDE_PATTERNS,
         "max_file_size_kb": DEFAULT_MAX_FILE_SIZE_KB,
@@ -129,8 +287,8 @@ def create_default_config_file(config_path: str = ".llm-precommit.yml") -> bool:
     try:
         with open(config_path, 'w', encoding='utf-8') as f:
             yaml.dump(default_config, f, default_flow_style=False, sort_keys=False)
-        print(f"Created default configuration file at {config_path}")
+        logger.info(f"Created default configuration file at {config_path}")
         return True
     except Exception as e:
-        print(f"Error creating default configuration file: {e}")
+        logger.error(f"Error creating default configuration file: {e}")
         return False 
\ No newline at end of file
@@ -0,0 +1,201 @@
+"""
+Content sniffing to exclude binary, minified and generated files before review.
+"""
+import logging
+import os
+import re
+import math
+import fnmatch
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+
+from llm_precommit.utils.git_utils import read_blob_prefix
+from llm_precommit.constants import (
+    DEFAULT_SNIFF_SAMPLE_KB,
+    DEFAULT_SNIFF_MAX_LINE_LENGTH,
+    DEFAULT_SNIFF_MAX_ENTROPY,
+    GENERATED_FILE_PATTERNS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Number of leading lines searched for generated-file headers
+GENERATED_MARKER_LINES = 10
+GENERATED_FILE_RES = [re.compile(pattern) for pattern in GENERATED_FILE_PATTERNS]
+
+# Minimum sample size for the entropy check to be meaningful
+MIN_ENTROPY_SAMPLE_BYTES = 1024
+
+
+def sniff_file(file_path: str, config: Dict[str, Any], revision: Optional[str] = None) -> Optional[str]:
+    """
+    Check whether a file should be excluded based on its first few KB.
+
+    Args:
+        file_path: Path to the file, relative to the repository root.
+        config: Configuration dictionary.
+        revision: Revision to read the file from instead of the working tree (optional).
+
+    Returns:
+        A key of SNIFF_REASONS, or None if the file looks like reviewable source.
+    """
+    attribute = get_linguist_attribute(file_path)
+    if attribute:
+        return attribute
+
+    sample_kb = config.get("sniff_sample_kb", DEFAULT_SNIFF_SAMPLE_KB)
+    if revision is not None:
+        sample = read_blob_prefix(file_path, revision, int(sample_kb * 1024))
+        return sniff_content(sample, config) if sample is not None else None
+
+    try:
+        with open(file_path, "rb") as f:
+            sample = f.read(int(sample_kb * 1024))
+    except OSError as e:
+        logger.error(f"Error reading file {file_path}: {e}")
+        return None
+
+    return sniff_content(sample, config)
+
+
+def sniff_content(sample: bytes, config: Dict[str, Any]) -> Optional[str]:
+    """
+    Classify a sample of file content.
+
+    Args:
+        sample: The first bytes of the file.
+        config: Configuration dictionary.
+
+    Returns:
+        A key of SNIFF_REASONS, or None if the sample looks like reviewable source.
+    """
+    if b"\0" in sample:
+        return "binary"
+
+    text = sample.decode("utf-8", errors="replace")
+    lines = text.splitlines()
+
+    for line in lines[:GENERATED_MARKER_LINES]:
+        line = line.strip()
+        if any(pattern.search(line) for pattern in GENERATED_FILE_RES):
+            return "generated"
+
+    max_line_length = config.get("sniff_max_line_length", DEFAULT_SNIFF_MAX_LINE_LENGTH)
+    if lines and max(len(line) for line in lines) > max_line_length:
+        return "minified"
+
+    max_entropy = config.get("sniff_max_entropy", DEFAULT_SNIFF_MAX_ENTROPY)
+    if len(sample) >= MIN_ENTROPY_SAMPLE_BYTES and shannon_entropy(sample) > max_entropy:
+        return "high-entropy"
+
+    return None
+
+
+def shannon_entropy(data: bytes) -> float:
+    """
+    Compute the Shannon entropy of a byte string.
+
+    Args:
+        data: The bytes to measure.
+
+    Returns:
+        Entropy in bits per byte (0 to 8).
+    """
+    if not data:
+        return 0.0
+    counts = [0] * 256
+    for byte in data:
+        counts[byte] += 1
+    total = len(data)
+    return -sum(c / total * math.log2(c / total) for c in counts if c)
+
+
+def get_linguist_attribute(file_path: str, gitattributes_path: str = ".gitattributes") -> Optional[str]:
+    """
+    Check whether .gitattributes marks a file as generated or vendored.
+
+    Args:
+        file_path: Path to the file, relative to the repository root.
+        gitattributes_path: Path to the .gitattributes file.
+
+    Returns:
+        "linguist-generated", "linguist-vendored" or None.
+    """
+    try:
+        mtime = os.path.getmtime(gitattributes_path)
+    except OSError:
+        return None
+
+    attributes: Dict[str, bool] = {}
+    for pattern, attrs in _load_gitattributes(gitattributes_path, mtime):
+        if _gitattributes_pattern_matches(pattern, file_path):
+            attributes.update(attrs)
+
+    for name in ("linguist-generated", "linguist-vendored"):
+        if attributes.get(name):
+            return name
+    return None
+
+
+@lru_cache(maxsize=8)
+def _load_gitattributes(path: str, mtime: float) -> List[Tuple[str, Dict[str, bool]]]:
+    """
+    Parse the linguist attributes of a .gitattributes file.
+
+    Args:
+        path: Path to the .gitattributes file.
+        mtime: Modification time of the file, used to invalidate the cache.
+
+    Returns:
+        List of (pattern, attributes) tuples in file order.
+    """
+    rules = []
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                parts = line.split()
+                if not parts or parts[0].startswith("#"):
+                    continue
+                attrs = {}
+                for attr in parts[1:]:
+                    if attr.startswith(("-", "!")):
+                        name, value = attr[1:], False
+                    elif "=" in attr:
+                        name, raw = attr.split("=", 1)
+                        value = raw.lower() not in ("false", "0")
+                    else:
+                        name, value = attr, True
+                    if name in ("linguist-generated", "linguist-vendored"):
+                        attrs[name] = value
+                if attrs:
+                    rules.append((parts[0], attrs))
+    except OSError:
+        return []
+    return rules
+
+
+def _gitattributes_pattern_matches(pattern: str, file_path: str) -> bool:
+    """
+    Check whether a .gitattributes pattern matches a path.
+
+    Patterns without a slash match the file name at any depth; other patterns
+    match the path from the repository root.
+
+    Args:
+        pattern: The .gitattributes pattern.
+        file_path: Path to the file, relative to the repository root.
+
+    Returns:
+        True if the pattern matches.
+    """
+    file_path = file_path.replace(os.sep, "/")
+    if "/" not in pattern:
+        return fnmatch.fnmatch(os.path.basename(file_path), pattern)
+    pattern = pattern.lstrip("/")
+    if pattern.endswith("/**"):
+        return file_path.startswith(pattern[:-2])
+    if pattern.startswith("**/"):
+        rest = pattern[3:]
+        return fnmatch.fnmatch(file_path, rest) or fnmatch.fnmatch(file_path, f"*/{rest}")
+    # fnmatch's "*" already matches across directories
+    return fnmatch.fnmatch(file_path, pattern.replace("**", "*"))
@@ -0,0 +1,307 @@
+"""
+Utilities for parsing unified diffs.
+"""
+import re
+from typing import Dict, Any, List, Optional, Tuple
+
+from llm_precommit.constants import INDENTATION_SENSITIVE_EXTENSIONS
+
+HUNK_HEADER_RE = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+def get_changed_lines(diff: str) -> Tuple[List[str], List[str]]:
+    """
+    Get the removed and added lines of a unified diff.
+
+    Args:
+        diff: The git diff content.
+
+    Returns:
+        Tuple of the removed lines and the added lines, without the leading
+        "-" or "+" marker.
+    """
+    removed: List[str] = []
+    added: List[str] = []
+    in_hunk = False
+    for line in diff.splitlines():
+        if line.startswith("diff --git"):
+            in_hunk = False
+        elif line.startswith("@@"):
+            in_hunk = True
+        elif in_hunk and line.startswith("-"):
+            removed.append(line[1:])
+        elif in_hunk and line.startswith("+"):
+            added.append(line[1:])
+    return removed, added
+
+
+def parse_hunks(diff: str) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """
+    Split a single-file unified diff into its header and hunks.
+
+    Args:
+        diff: The git diff content for one file.
+
+    Returns:
+        Tuple of the header lines (everything before the first hunk) and a list
+        of hunks. Each hunk is a dictionary with the "header" line, the
+        "old_start", "old_count", "new_start" and "new_count" of its range, and
+        its body "lines".
+    """
+    header: List[str] = []
+    hunks: List[Dict[str, Any]] = []
+    for line in diff.splitlines():
+        match = HUNK_HEADER_RE.match(line)
+        if match:
+            hunks.append({
+                "header": line,
+                "old_start": int(match.group(1)),
+                "old_count": int(match.group(2) or 1),
+                "new_start": int(match.group(3)),
+                "new_count": int(match.group(4) or 1),
+                "lines": [],
+            })
+        elif hunks:
+            hunks[-1]["lines"].append(line)
+        else:
+            header.append(line)
+    return header, hunks
+
+
+def build_diff(header: List[str], hunks: List[Dict[str, Any]]) -> str:
+    """
+    Reassemble a unified diff from a header and hunks.
+
+    Args:
+        header: The header lines.
+        hunks: The hunks, as returned by `parse_hunks`.
+
+    Returns:
+        The diff text.
+    """
+    lines = list(header)
+    for hunk in hunks:
+        lines.append(hunk["header"])
+        lines.extend(hunk["lines"])
+    return "\n".join(lines) + "\n"
+
+
+def get_new_line_numbers(diff: str) -> List[Optional[int]]:
+    """
+    Map each line of a diff to its line number in the new version of the file.
+
+    Args:
+        diff: The git diff content for one file.
+
+    Returns:
+        List with one entry per diff line: the new-file line number for added
+        and context lines, None for headers and removed lines.
+    """
+    numbers: List[Optional[int]] = []
+    current: Optional[int] = None
+    for line in diff.splitlines():
+        match = HUNK_HEADER_RE.match(line)
+        if match:
+            current = int(match.group(3))
+            numbers.append(None)
+        elif current is None or line.startswith(("-", "\\")):
+            numbers.append(None)
+        else:
+            numbers.append(current)
+            current += 1
+    return numbers
+
+
+def get_hunk_starts(diff: str) -> List[int]:
+    """
+    Get the first new-file line of each hunk of a diff.
+
+    Args:
+        diff: The git diff content for one file.
+
+    Returns:
+        The "new_start" of each hunk, in diff order.
+    """
+    return [int(match.group(3)) for match in map(HUNK_HEADER_RE.match, diff.splitlines()) if match]
+
+
+def shift_line_number(value: Any, old_starts: List[int], new_starts: List[int]) -> Any:
+    """
+    Move a line number reported against one placement of a patch to another
+    placement of the same patch, e.g. after a rebase.
+
+    Each number is shifted by the offset of the last hunk starting at or before
+    it (the first hunk for numbers above all hunks).
+
+    Args:
+        value: The reported line number or range (e.g. 12, "12", "12-15").
+        old_starts: Hunk starts the number was reported against.
+        new_starts: Hunk starts of the same hunks in the new placement.
+
+    Returns:
+        The shifted line number or range.
+    """
+    if not old_starts or len(old_starts) != len(new_starts):
+        return value
+
+    def shift(match) -> str:
+        number = int(match.group(0))
+        index = 0
+        for i, start in enumerate(old_starts):
+            if start <= number:
+                index = i
+        return str(max(1, number + new_starts[index] - old_starts[index]))
+
+    if isinstance(value, int):
+        return int(shift(re.match(r"\d+", str(value))))
+    return re.sub(r"\d+", shift, str(value))
+
+
+def collapse_moved_blocks(diff: str, min_lines: int = 3, extension: str = "") -> str:
+    """
+    Replace blocks of code that were moved unchanged within a file by short markers.
+
+    A run of removed lines and a run of added lines elsewhere in the diff with
+    the same content are both replaced by a "\\" marker line, which diff
+    consumers ignore when counting lines. Indentation is ignored, except in
+    languages where it is part of the structure. Hunks are split around the
+    collapsed runs, so the line numbers of the remaining lines are unchanged.
+
+    Args:
+        diff: The git diff content for one file.
+        min_lines: Minimum number of non-blank lines for a block to be collapsed.
+        extension: Extension of the file, e.g. ".py" (optional).
+
+    Returns:
+        The diff with moved blocks collapsed, or the original diff if nothing moved.
+    """
+    header, hunks = parse_hunks(diff)
+    runs = _find_change_runs(hunks, keep_indentation=extension in INDENTATION_SENSITIVE_EXTENSIONS)
+
+    removed_runs: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+    for run in runs:
+        if run["kind"] == "-" and run["key"] and len(run["key"]) >= min_lines:
+            removed_runs.setdefault(run["key"], []).append(run)
+
+    # Pair added runs with removed runs of the same content, except in-place edits
+    collapsed: Dict[Tuple[int, int], str] = {}
+    for run in runs:
+        if run["kind"] != "+" or run["key"] not in removed_runs:
+            continue
+        for removed in removed_runs[run["key"]]:
+            if removed.get("paired") or (removed["hunk"], removed["end"]) == (run["hunk"], run["start"]):
+                continue
+            removed["paired"] = True
+            count = run["end"] - run["start"]
+            collapsed[(removed["hunk"], removed["start"])] = (
+                f"\\ [moved] {count} lines moved to line {run['new_line']}"
+            )
+            collapsed[(run["hunk"], run["start"])] = (
+                f"\\ [moved] {count} lines moved here from old line {removed['old_line']}"
+            )
+            break
+
+    if not collapsed:
+        return diff
+
+    run_ends = {(run["hunk"], run["start"]): run["end"] for run in runs}
+    new_hunks: List[Dict[str, Any]] = []
+    for hunk_index, hunk in enumerate(hunks):
+        suffix = HUNK_HEADER_RE.sub("", hunk["header"])
+        old_line, new_line = hunk["old_start"], hunk["new_start"]
+        current = {"old_start": old_line, "new_start": new_line, "lines": []}
+        index = 0
+        lines = hunk["lines"]
+        while index < len(lines):
+            marker = collapsed.get((hunk_index, index))
+            if marker is None:
+                line = lines[index]
+                current["lines"].append(line)
+                if not line.startswith(("+", "\\")):
+                    old_line += 1
+                if not line.startswith(("-", "\\")):
+                    new_line += 1
+                index += 1
+                continue
+
+            # Close the hunk with the marker and restart after the moved block;
+            # a marker without lines before it opens the next hunk instead
+            current["lines"].append(marker)
+            pending_markers = []
+            if any(not line.startswith("\\") for line in current["lines"]):
+                new_hunks.append(_make_hunk(current, suffix))
+            else:
+                pending_markers = current["lines"]
+            end = run_ends[(hunk_index, index)]
+            skipped = end - index
+            if lines[index].startswith("-"):
+                old_line += skipped
+            else:
+                new_line += skipped
+            index = end
+            current = {"old_start": old_line, "new_start": new_line, "lines": pending_markers}
+
+        if any(not line.startswith("\\") for line in current["lines"]):
+            new_hunks.append(_make_hunk(current, suffix))
+        elif current["lines"] and new_hunks:
+            new_hunks[-1]["lines"].extend(current["lines"])
+
+    return build_diff(header, new_hunks)
+
+
+def _find_change_runs(hunks: List[Dict[str, Any]], keep_indentation: bool = False) -> List[Dict[str, Any]]:
+    """
+    Find the maximal runs of consecutive removed or added lines in a diff.
+
+    Args:
+        hunks: The hunks, as returned by `parse_hunks`.
+        keep_indentation: Whether the keys keep the leading whitespace of the lines.
+
+    Returns:
+        List of runs, each with the "hunk" index, the "start" and "end" line
+        indexes in the hunk, the "kind" ("-" or "+"), the "old_line" or
+        "new_line" where it starts, and its "key": the stripped non-blank lines.
+    """
+    runs: List[Dict[str, Any]] = []
+    for hunk_index, hunk in enumerate(hunks):
+        old_line, new_line = hunk["old_start"], hunk["new_start"]
+        run: Optional[Dict[str, Any]] = None
+        for index, line in enumerate(hunk["lines"] + [" "]):
+            kind = line[:1] if line[:1] in ("-", "+") else None
+            if run and kind != run["kind"]:
+                run["end"] = index
+                key_lines = (l[1:].rstrip() if keep_indentation else l[1:].strip()
+                             for l in hunk["lines"][run["start"]:index])
+                run["key"] = tuple(l for l in key_lines if l)
+                runs.append(run)
+                run = None
+            if kind and run is None:
+                run = {"hunk": hunk_index, "start": index, "kind": kind, "old_line": old_line, "new_line": new_line}
+            if not line.startswith(("+", "\\")):
+                old_line += 1
+            if not line.startswith(("-", "\\")):
+                new_line += 1
+    return runs
+
+
+def _make_hunk(hunk: Dict[str, Any], suffix: str = "") -> Dict[str, Any]:
+    """
+    Complete a hunk with its counts and header.
+
+    Args:
+        hunk: Dictionary with "old_start", "new_start" and "lines".
+        suffix: Text after the range in the header, e.g. the function context.
+
+    Returns:
+        The hunk, in the format of `parse_hunks`.
+    """
+    old_count = sum(1 for line in hunk["lines"] if not line.startswith(("+", "\\")))
+    new_count = sum(1 for line in hunk["lines"] if not line.startswith(("-", "\\")))
+    return {
+        "header": f"@@ -{hunk['old_start']},{old_count} +{hunk['new_start']},{new_count} @@{suffix}",
+        "old_start": hunk["old_start"],
+        "old_count": old_count,
+        "new_start": hunk["new_start"],
+        "new_count": new_count,
+        "lines": hunk["lines"],
+    }
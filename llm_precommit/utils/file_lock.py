@@ -0,0 +1,115 @@
+"""
+Inter-process file locks.
+"""
+import os
+import time
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Interval between attempts to take a busy lock
+POLL_INTERVAL_SECONDS = 0.05
+
+
+class FileLock:
+    """
+    Exclusive lock shared by all processes on the machine, held on a lock file.
+
+    Uses flock(2) where available, so a lock held by a crashed process is
+    released by the kernel. Elsewhere the lock file is created exclusively and
+    considered stale after `stale_seconds`.
+
+    Usage:
+        with FileLock(path, timeout=60) as acquired:
+            ...
+    """
+
+    def __init__(self, path: str, timeout: Optional[float] = None, stale_seconds: float = 600):
+        """
+        Initialize the lock.
+
+        Args:
+            path: Path of the lock file. Its directory is created if needed.
+            timeout: Maximum seconds to wait for the lock, or None to wait forever.
+            stale_seconds: Age after which an exclusive lock file left behind by
+                a crashed process is broken (only without flock).
+        """
+        self.path = path
+        self.timeout = timeout
+        self.stale_seconds = stale_seconds
+        self._fd: Optional[int] = None
+
+    def acquire(self) -> bool:
+        """
+        Take the lock, waiting for other holders.
+
+        Returns:
+            True if the lock was taken, False if the timeout expired.
+        """
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while True:
+            if self._try_acquire():
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(POLL_INTERVAL_SECONDS)
+
+    def release(self, remove: bool = False) -> None:
+        """
+        Release the lock.
+
+        Args:
+            remove: Also delete the lock file. Only safe when a process that
+                races on the deleted file can tolerate doing duplicate work.
+        """
+        if self._fd is None:
+            return
+        try:
+            if remove or fcntl is None:
+                try:
+                    os.remove(self.path)
+                except OSError:
+                    pass
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    def _try_acquire(self) -> bool:
+        """
+        Make one attempt to take the lock.
+
+        Returns:
+            True if the lock was taken.
+        """
+        if fcntl is not None:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+            self._fd = fd
+            return True
+
+        try:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o644)
+            return True
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(self.path) > self.stale_seconds:
+                    os.remove(self.path)
+            except OSError:
+                pass
+            return False
+
+    def __enter__(self) -> bool:
+        return self.acquire()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.release()
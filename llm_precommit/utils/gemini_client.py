@@ -2,35 +2,75 @@
 Module for interacting with the Gemini API.
 """
 import os
-import json
-import re
-from typing import Dict, Any, List, Optional, Union
+import logging
+import datetime
+from typing import Dict, Any, List, Optional, Tuple, Union
 
 try:
     import google.generativeai as genai
 except ImportError:
     genai = None
 
-from llm_precommit.utils.llm_client import BaseLLMClient, LLMClientFactory
+from llm_precommit.constants import (
+    AVAILABLE_MODELS,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_PROMPT_CACHING,
+    DEFAULT_PROMPT_CACHE_TTL_MINUTES,
+    DEFAULT_RESPONSE_PROFILE,
+    DEFAULT_STRUCTURED_OUTPUT,
+)
+from llm_precommit.utils.concurrency import AdaptiveConcurrencyController, is_overload_error
+from llm_precommit.utils.llm_client import BaseLLMClient, LLMClientFactory, LLMOverloadError
+from llm_precommit.utils.token_utils import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
 
 class GeminiClient(BaseLLMClient):
     """
     Client for interacting with Google's Gemini API.
     """
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model_name: Optional[str] = None,
+        prompt_caching: bool = DEFAULT_PROMPT_CACHING,
+        prompt_cache_ttl_minutes: int = DEFAULT_PROMPT_CACHE_TTL_MINUTES,
+        concurrency_controller: Optional[AdaptiveConcurrencyController] = None,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        response_profile: str = DEFAULT_RESPONSE_PROFILE,
+        structured_output: bool = DEFAULT_STRUCTURED_OUTPUT,
+    ):
         """
         Initialize the Gemini client.
         
         Args:
             api_key: The API key for Gemini. If not provided, will attempt to read from
                 environment variable GEMINI_API_KEY.
+            model_name: Default Gemini model. Falls back to the provider default.
+            prompt_caching: Whether to store the static system instruction as Gemini
+                cached content and reuse it across all files in the run.
+            prompt_cache_ttl_minutes: Lifetime of the cached content.
+            concurrency_controller: Limit on concurrent calls shared by the run (optional).
+            max_retries: Retries of calls rejected with rate limit or overload errors.
+            response_profile: Fields requested in responses, "lean" or "full".
+            structured_output: Whether to request JSON responses constrained to the
+                profile's schema (response_mime_type and response_schema).
                 
         Raises:
             ImportError: If google.generativeai package is not installed.
             ValueError: If API key is not provided.
         """
-        super().__init__(api_key=api_key, api_key_env_var="GEMINI_API_KEY")
+        super().__init__(
+            api_key=api_key,
+            api_key_env_var="GEMINI_API_KEY",
+            model_name=model_name or AVAILABLE_MODELS["gemini"]["default_model"],
+            concurrency_controller=concurrency_controller,
+            max_retries=max_retries,
+            response_profile=response_profile,
+            structured_output=structured_output,
+        )
         
         if genai is None:
             raise ImportError(
@@ -41,68 +81,163 @@ class GeminiClient(BaseLLMClient):
         # Configure the Gemini API
         genai.configure(api_key=self.api_key)
         
-        # Set the model
-        self.model_name = "gemini-2.0-flash-exp"
-        self.model = genai.GenerativeModel(self.model_name)
+        self.prompt_caching = prompt_caching
+        self.prompt_cache_ttl_minutes = prompt_cache_ttl_minutes
+        
+        # One GenerativeModel instance per (model name, system instruction), shared
+        # for the whole run, along with how the system instruction is delivered.
+        # Models are created on first use, so a run served entirely from the
+        # review cache creates no cached content
+        self._models: Dict[Tuple[str, Optional[str]], Tuple[Any, str]] = {}
+        self._cached_contents: List[Any] = []
+    
+    def _get_model(
+        self,
+        model_name: Optional[str] = None,
+        system_instruction: Optional[str] = None,
+    ) -> Tuple[Any, str]:
+        """
+        Get the cached GenerativeModel for a model name, creating it on first use.
+        
+        Args:
+            model_name: Name of the Gemini model. Defaults to the client's model.
+            system_instruction: Static system instruction for the model (optional).
+            
+        Returns:
+            Tuple of the GenerativeModel instance and the system instruction mode:
+            "cached" (served from Gemini cached content), "system" (sent as a system
+            instruction with every call) or "inline" (must be prepended to the prompt).
+        """
+        key = (model_name or self.model_name, system_instruction)
+        with self._lock:
+            if key not in self._models:
+                self._models[key] = self._create_model(*key)
+            return self._models[key]
+    
+    def _create_model(self, model_name: str, system_instruction: Optional[str]) -> Tuple[Any, str]:
+        """
+        Create a GenerativeModel, preferring cached content for the system instruction.
+        
+        Args:
+            model_name: Name of the Gemini model.
+            system_instruction: Static system instruction for the model (optional).
+            
+        Returns:
+            Tuple of the GenerativeModel instance and the system instruction mode.
+        """
+        if not system_instruction:
+            return genai.GenerativeModel(model_name), "inline"
+        
+        caching = getattr(genai, "caching", None)
+        if self.prompt_caching and caching is not None:
+            try:
+                cached_content = caching.CachedContent.create(
+                    model=model_name if model_name.startswith("models/") else f"models/{model_name}",
+                    system_instruction=system_instruction,
+                    ttl=datetime.timedelta(minutes=self.prompt_cache_ttl_minutes),
+                )
+                self._cached_contents.append(cached_content)
+                return genai.GenerativeModel.from_cached_content(cached_content=cached_content), "cached"
+            except Exception as e:
+                # Models without caching support, or prefixes below the minimum
+                # cacheable size, fall back to a plain system instruction
+                logger.debug(f"Gemini context caching unavailable for {model_name}: {e}")
+        
+        try:
+            return genai.GenerativeModel(model_name, system_instruction=system_instruction), "system"
+        except TypeError:
+            # Older SDK versions do not accept a system instruction
+            return genai.GenerativeModel(model_name), "inline"
     
-    def _call_llm(self, prompt: str) -> Dict[str, Any]:
+    def _call_llm(
+        self,
+        prompt: str,
+        model_name: Optional[str] = None,
+        system_instruction: Optional[str] = None,
+        response_schema: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
         """
         Call the Gemini API with the given prompt.
         
         Args:
             prompt: The formatted prompt to send to Gemini.
+            model_name: Gemini model to use. Defaults to the client's model.
+            system_instruction: Static system instruction shared by all calls.
+            response_schema: JSON schema to constrain the response to (optional).
             
         Returns:
             Dictionary containing the analysis results.
+            
+        Raises:
+            LLMOverloadError: If Gemini rejected the call with a 429 or 503 error.
         """
         # Generate response from Gemini
         try:
-            response = self.model.generate_content(prompt)
-            return self._extract_json_from_response(response.text)
+            model, mode = self._get_model(model_name, system_instruction)
+            if mode == "inline":
+                prompt = self._combine_prompt(prompt, system_instruction)
+            
+            generation_config = None
+            if response_schema and self.structured_output:
+                generation_config = {"response_mime_type": "application/json", "response_schema": response_schema}
+            try:
+                response = model.generate_content(prompt, generation_config=generation_config)
+            except Exception as e:
+                if not generation_config or is_overload_error(e):
+                    raise
+                # Models or SDK versions without structured output: fall back to
+                # plain JSON instructions for the rest of the run
+                logger.debug(f"Gemini structured output unavailable: {e}")
+                self.structured_output = False
+                response = model.generate_content(prompt)
+            self._record_prompt_usage(self._cached_token_count(response, mode, system_instruction))
+            usage = getattr(response, "usage_metadata", None)
+            return self._record_token_usage(
+                self._extract_json_from_response(response.text),
+                model_name or self.model_name,
+                prompt_tokens=getattr(usage, "prompt_token_count", None),
+                response_tokens=getattr(usage, "candidates_token_count", None),
+                prompt=self._combine_prompt(prompt, system_instruction) if mode != "inline" else prompt,
+                response_text=response.text,
+            )
         except Exception as e:
+            if is_overload_error(e):
+                raise LLMOverloadError(str(e)) from e
             return {
                 "error": str(e),
                 "parsing_error": "Failed to call Gemini API"
             }
     
-    def _extract_json_from_response(self, response_text: str) -> Dict[str, Any]:
+    def _cached_token_count(self, response: Any, mode: str, system_instruction: Optional[str]) -> int:
         """
-        Extract JSON data from the response text.
+        Get the number of prompt tokens served from cached content for a response.
         
         Args:
-            response_text: The text response from Gemini
+            response: The Gemini response.
+            mode: The system instruction mode used for the call.
+            system_instruction: The static system instruction.
             
         Returns:
-            Dictionary of parsed JSON data
+            Number of cached prompt tokens, estimated if usage metadata is missing.
         """
-        try:
-            # Try to extract JSON using a more robust approach
-            # Look for content within ```json and ``` markers first
-            json_pattern = r"```(?:json)?\s*([\s\S]*?)\s*```"
-            json_matches = re.findall(json_pattern, response_text)
-            
-            if json_matches:
-                # Use the last match if there are multiple code blocks
-                return json.loads(json_matches[-1])
-            
-            # If no JSON in code blocks, try to find JSON directly
-            json_start = response_text.find('{')
-            json_end = response_text.rfind('}') + 1
-            
-            if json_start >= 0 and json_end > json_start:
-                json_content = response_text[json_start:json_end]
-                return json.loads(json_content)
-            
-            # If no JSON format is found, wrap the entire response
-            return {
-                "raw_response": response_text,
-                "parsing_error": "Could not extract JSON from response"
-            }
-        except json.JSONDecodeError as e:
-            return {
-                "raw_response": response_text,
-                "parsing_error": f"Invalid JSON format in response: {str(e)}"
-            }
+        if mode != "cached":
+            return 0
+        usage = getattr(response, "usage_metadata", None)
+        cached_tokens = getattr(usage, "cached_content_token_count", 0) or 0
+        if not cached_tokens and system_instruction:
+            cached_tokens = estimate_tokens(system_instruction)
+        return cached_tokens
+    
+    def close(self) -> None:
+        """
+        Delete the cached contents created during the run.
+        """
+        for cached_content in self._cached_contents:
+            try:
+                cached_content.delete()
+            except Exception as e:
+                logger.debug(f"Failed to delete Gemini cached content: {e}")
+        self._cached_contents = []
 
 
 # Register the GeminiClient with the factory
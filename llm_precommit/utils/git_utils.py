@@ -1,9 +1,17 @@
 """
 Utilities for working with Git repositories and diffs.
 """
+import logging
 import os
 import subprocess
-from typing import List, Dict, Any, Tuple, Set
+from typing import List, Dict, Any, Optional, Tuple, Set
+
+from llm_precommit.constants import DEFAULT_DIFF_OPTIONS, DIFF_ALGORITHMS
+
+logger = logging.getLogger(__name__)
+
+# Hash of the empty tree, used to diff whole files as additions
+EMPTY_TREE_SHA = "4b825dc642cb6eb9a060e54bf8d69288fbee4904"
 
 
 def get_staged_files() -> List[str]:
@@ -18,31 +26,123 @@ def get_staged_files() -> List[str]:
         result = subprocess.run(cmd, capture_output=True, text=True, check=True)
         return [f for f in result.stdout.splitlines() if os.path.isfile(f)]
     except subprocess.CalledProcessError as e:
-        print(f"Error getting staged files: {e}")
-        print(f"Command output: {e.stderr}")
+        logger.error(f"Error getting staged files: {e}")
+        logger.error(f"Command output: {e.stderr}")
         return []
 
 
-def get_file_diff(file_path: str) -> str:
+def get_tracked_files() -> List[str]:
+    """
+    Get a list of all files tracked in the current git repository.
+    
+    Returns:
+        List of tracked file paths.
+    """
+    cmd = ["git", "ls-files"]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        return [f for f in result.stdout.splitlines() if os.path.isfile(f)]
+    except subprocess.CalledProcessError as e:
+        logger.error(f"Error getting tracked files: {e}")
+        logger.error(f"Command output: {e.stderr}")
+        return []
+
+
+def get_diff_args(diff_options: Optional[Dict[str, Any]] = None) -> List[str]:
+    """
+    Build the git diff arguments for the configured diff options.
+    
+    Args:
+        diff_options: Diff options, see DEFAULT_DIFF_OPTIONS (optional).
+    
+    Returns:
+        List of git diff arguments.
+    """
+    options = {**DEFAULT_DIFF_OPTIONS, **(diff_options or {})}
+    args = []
+    if options.get("context_lines") is not None:
+        args.append(f"--unified={int(options['context_lines'])}")
+    algorithm = options.get("algorithm") or "default"
+    if algorithm in DIFF_ALGORITHMS:
+        args.append(f"--diff-algorithm={algorithm}")
+    else:
+        logger.warning(f"Ignoring unknown diff algorithm '{algorithm}'. Available: {', '.join(DIFF_ALGORITHMS)}")
+    if options.get("ignore_whitespace_changes"):
+        args.append("--ignore-space-change")
+    if options.get("find_renames") is not None:
+        args.append(f"--find-renames={int(options['find_renames'])}%")
+    return args
+
+
+def get_file_diff(
+    file_path: str,
+    base: Optional[str] = None,
+    diff_options: Optional[Dict[str, Any]] = None,
+    head: Optional[str] = None,
+    old_path: Optional[str] = None,
+) -> str:
     """
     Get the git diff for a staged file.
     
     Args:
         file_path: Path to the file.
+        base: Revision to diff the working tree against instead of diffing the
+            staged changes (optional). Use EMPTY_TREE_SHA to get the whole file.
+        diff_options: Diff options, see DEFAULT_DIFF_OPTIONS (optional). Without
+            them, git's own defaults are used.
+        head: Revision to diff base against instead of the working tree (optional).
+        old_path: Path the file was renamed from (optional). The diff then only
+            shows the edits made to the renamed file, not its whole content.
     
     Returns:
         String containing the git diff.
     """
-    cmd = ["git", "diff", "--cached", file_path]
+    diff_args = get_diff_args(diff_options) if diff_options is not None else []
+    paths = [old_path, file_path] if old_path else [file_path]
+    if old_path and not any(arg.startswith("--find-renames") for arg in diff_args):
+        diff_args.append("--find-renames")
+    if base:
+        cmd = ["git", "diff", *diff_args, base, *([head] if head else []), "--", *paths]
+    else:
+        cmd = ["git", "diff", "--cached", *diff_args, "--", *paths]
     try:
         result = subprocess.run(cmd, capture_output=True, text=True, check=True)
         return result.stdout
     except subprocess.CalledProcessError as e:
-        print(f"Error getting diff for {file_path}: {e}")
-        print(f"Command output: {e.stderr}")
+        logger.error(f"Error getting diff for {file_path}: {e}")
+        logger.error(f"Command output: {e.stderr}")
         return ""
 
 
+def get_diff_stats(base: Optional[str] = None) -> Dict[str, int]:
+    """
+    Get the number of changed lines per file with a single git invocation.
+    
+    Args:
+        base: Revision to diff the working tree against instead of diffing the
+            staged changes (optional).
+    
+    Returns:
+        Dictionary mapping file paths to added plus deleted lines. Binary files
+        count as zero.
+    """
+    cmd = ["git", "diff", "--numstat", "--no-renames", base or "--cached"]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    except subprocess.CalledProcessError as e:
+        logger.error(f"Error getting diff stats: {e}")
+        logger.error(f"Command output: {e.stderr}")
+        return {}
+    
+    stats = {}
+    for line in result.stdout.splitlines():
+        parts = line.split("\t")
+        if len(parts) == 3:
+            added, deleted, path = parts
+            stats[path] = (int(added) if added.isdigit() else 0) + (int(deleted) if deleted.isdigit() else 0)
+    return stats
+
+
 def get_file_content(file_path: str) -> str:
     """
     Get the content of a file.
@@ -54,13 +154,244 @@ def get_file_content(file_path: str) -> str:
         String containing the file content.
     """
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
+        # Undecodable bytes are replaced rather than failing the whole read
+        with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
             return f.read()
     except Exception as e:
-        print(f"Error reading file {file_path}: {e}")
+        logger.error(f"Error reading file {file_path}: {e}")
         return ""
 
 
+def get_file_content_at_revision(file_path: str, revision: str = "HEAD") -> Optional[str]:
+    """
+    Get the content of a file from the git object database.
+    
+    Args:
+        file_path: Path to the file, relative to the repository root.
+        revision: Revision to read from, or an empty string for the staged version.
+    
+    Returns:
+        String containing the file content, or None if the file does not exist
+        at that revision.
+    """
+    cmd = ["git", "show", f"{revision}:{file_path}"]
+    try:
+        result = subprocess.run(cmd, capture_output=True, check=True)
+        return result.stdout.decode("utf-8", errors="replace")
+    except subprocess.CalledProcessError:
+        return None
+
+
+def get_blob_size(file_path: str, revision: str = "HEAD") -> Optional[int]:
+    """
+    Get the size of a file in the git object database without reading it.
+    
+    Args:
+        file_path: Path to the file, relative to the repository root.
+        revision: Revision to read from, or an empty string for the staged version.
+    
+    Returns:
+        Size in bytes, or None if the file does not exist at that revision.
+    """
+    cmd = ["git", "cat-file", "-s", f"{revision}:{file_path}"]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        return int(result.stdout.strip())
+    except (subprocess.CalledProcessError, ValueError):
+        return None
+
+
+def read_blob_prefix(file_path: str, revision: str = "HEAD", size: int = 8192) -> Optional[bytes]:
+    """
+    Read only the first bytes of a file from the git object database.
+    
+    Args:
+        file_path: Path to the file, relative to the repository root.
+        revision: Revision to read from, or an empty string for the staged version.
+        size: Maximum number of bytes to read.
+    
+    Returns:
+        The first bytes of the file, or None if it does not exist at that revision.
+    """
+    cmd = ["git", "cat-file", "blob", f"{revision}:{file_path}"]
+    try:
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    except OSError:
+        return None
+    try:
+        data = process.stdout.read(size)
+    finally:
+        process.stdout.close()
+        process.kill()
+        returncode = process.wait()
+    # The process may be killed before exiting on its own, so only a failure
+    # without any output means the blob does not exist
+    if not data and returncode != 0:
+        return None
+    return data
+
+
+def resolve_revision_range(revision_range: str) -> Tuple[str, str]:
+    """
+    Resolve a revision range into base and head revisions.
+    
+    Args:
+        revision_range: "base..head", "base...head" (diff against the merge
+            base, as for pull requests) or a single base revision (head is HEAD).
+    
+    Returns:
+        Tuple of the base and head revisions.
+    
+    Raises:
+        ValueError: If a revision is unknown or the merge base cannot be determined.
+    """
+    if "..." in revision_range:
+        base, head = revision_range.split("...", 1)
+    elif ".." in revision_range:
+        base, head = revision_range.split("..", 1)
+    else:
+        base, head = revision_range, "HEAD"
+    base, head = base or "HEAD", head or "HEAD"
+    
+    for revision in (base, head):
+        cmd = ["git", "rev-parse", "--verify", "--quiet", f"{revision}^{{commit}}"]
+        if subprocess.run(cmd, capture_output=True).returncode != 0:
+            raise ValueError(f"Unknown revision '{revision}' in {revision_range}")
+    
+    if "..." in revision_range:
+        cmd = ["git", "merge-base", base, head]
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        except subprocess.CalledProcessError as e:
+            raise ValueError(f"Cannot find merge base of {revision_range}: {e.stderr.strip()}")
+        return result.stdout.strip(), head
+    return base, head
+
+
+def get_range_diffs(base: str, head: str, diff_options: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
+    """
+    Get the net diff of every file changed between two revisions with a single
+    git invocation.
+    
+    Args:
+        base: The base revision.
+        head: The head revision.
+        diff_options: Diff options, see DEFAULT_DIFF_OPTIONS (optional).
+    
+    Returns:
+        Dictionary mapping file paths (in head) to their diffs. Deleted files
+        are omitted. With find_renames set, renamed files are diffed against
+        their old path.
+    """
+    diff_args = get_diff_args(diff_options) if diff_options is not None else []
+    # Renames are detected only as configured by find_renames
+    if not any(arg.startswith("--find-renames") for arg in diff_args):
+        diff_args.append("--no-renames")
+    cmd = ["git", "diff", "--no-color", "--no-ext-diff", *diff_args, base, head]
+    try:
+        result = subprocess.run(cmd, capture_output=True, check=True)
+    except subprocess.CalledProcessError as e:
+        logger.error(f"Error getting diff for {base}..{head}: {e}")
+        logger.error(f"Command output: {e.stderr.decode('utf-8', errors='replace')}")
+        return {}
+    return split_diff_by_file(result.stdout.decode("utf-8", errors="replace"))
+
+
+def split_diff_by_file(diff: str) -> Dict[str, str]:
+    """
+    Split a multi-file unified diff into per-file diffs.
+    
+    Args:
+        diff: The git diff content for several files.
+    
+    Returns:
+        Dictionary mapping new file paths to their diffs. Deleted files are omitted.
+    """
+    diffs: Dict[str, str] = {}
+    current: List[str] = []
+    
+    def flush() -> None:
+        path = None
+        for line in current:
+            if line.startswith("+++ "):
+                target = line[4:].rstrip("\t")
+                path = target[2:] if target.startswith("b/") else None
+                break
+            if line.startswith("@@"):
+                break
+        if path is None and current and current[0].startswith("diff --git ") and " b/" in current[0]:
+            # Diffs without content (mode changes, empty files) have no +++ line
+            if not any(line.startswith("deleted file") for line in current):
+                path = current[0].rsplit(" b/", 1)[1]
+        if path:
+            diffs[path] = "\n".join(current) + "\n"
+    
+    for line in diff.splitlines():
+        if line.startswith("diff --git ") and current:
+            flush()
+            current = []
+        current.append(line)
+    if current:
+        flush()
+    return diffs
+
+
+def get_patch_id(diff: str) -> Optional[str]:
+    """
+    Get the stable patch ID of a diff, which stays the same when the patch is
+    applied at other line numbers, e.g. after a rebase or cherry-pick.
+    
+    Args:
+        diff: The git diff content.
+    
+    Returns:
+        The patch ID, or None if git could not compute it.
+    """
+    cmd = ["git", "patch-id", "--stable"]
+    try:
+        result = subprocess.run(cmd, input=diff, capture_output=True, text=True, check=True)
+    except (subprocess.CalledProcessError, OSError):
+        return None
+    fields = result.stdout.split()
+    return fields[0] if fields else None
+
+
+def get_renamed_files(
+    base: Optional[str] = None,
+    head: Optional[str] = None,
+    min_similarity: Optional[int] = None,
+) -> Dict[str, Tuple[str, int]]:
+    """
+    Get the renames detected by git, for the staged changes or a revision range.
+    
+    Args:
+        base: Base revision of the range (optional, defaults to the staged changes).
+        head: Head revision of the range (optional).
+        min_similarity: Minimum similarity (%) of a rename (optional, git's
+            default of 50% if not provided).
+    
+    Returns:
+        Dictionary mapping new paths to a tuple of the old path and the
+        similarity score (0-100).
+    """
+    revisions = [base, head] if base and head else ["--cached"]
+    rename_arg = f"--find-renames={int(min_similarity)}%" if min_similarity is not None else "--find-renames"
+    cmd = ["git", "diff", rename_arg, "--name-status"] + revisions
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    except subprocess.CalledProcessError as e:
+        logger.error(f"Error getting renamed files: {e}")
+        logger.error(f"Command output: {e.stderr}")
+        return {}
+    
+    renames = {}
+    for line in result.stdout.splitlines():
+        parts = line.split("\t")
+        if len(parts) == 3 and parts[0].startswith("R"):
+            renames[parts[2]] = (parts[1], int(parts[0][1:] or 0))
+    return renames
+
+
 def is_python_file(file_path: str) -> bool:
     """
     Check if a file is a Python file.
@@ -113,6 +444,38 @@ def get_git_repo_root() -> str:
         result = subprocess.run(cmd, capture_output=True, text=True, check=True)
         return result.stdout.strip()
     except subprocess.CalledProcessError as e:
-        print(f"Error getting git repo root: {e}")
-        print(f"Command output: {e.stderr}")
-        return os.getcwd()  # Fallback to current directory 
\ No newline at end of file
+        logger.error(f"Error getting git repo root: {e}")
+        logger.error(f"Command output: {e.stderr}")
+        return os.getcwd()  # Fallback to current directory 
+
+def get_git_common_dir() -> Optional[str]:
+    """
+    Get the git directory shared by all worktrees of the repository.
+    
+    Returns:
+        Absolute path to the common git directory, or None outside a git repository.
+    """
+    cmd = ["git", "rev-parse", "--git-common-dir"]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        return os.path.abspath(result.stdout.strip())
+    except (subprocess.CalledProcessError, OSError):
+        return None
+
+
+def get_git_path(name: str) -> Optional[str]:
+    """
+    Get the path of a file inside the git directory, e.g. the index.
+    
+    Args:
+        name: Path relative to the git directory.
+    
+    Returns:
+        Absolute path of the file, or None outside a git repository.
+    """
+    cmd = ["git", "rev-parse", "--git-path", name]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        return os.path.abspath(result.stdout.strip())
+    except (subprocess.CalledProcessError, OSError):
+        return None
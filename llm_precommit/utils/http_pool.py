@@ -0,0 +1,157 @@
+"""
+Pool of keep-alive HTTP connections to a single server.
+"""
+import http.client
+import threading
+import urllib.parse
+from typing import Dict, List, Optional, Tuple
+
+# Errors of a kept-alive connection that the server closed while it was idle
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError)
+
+
+class HTTPConnectionPool:
+    """
+    Keep-alive HTTP(S) connections to one server, shared by concurrent requests.
+
+    Connections are reused across requests instead of paying a TCP (and TLS)
+    handshake per call. At most `max_idle` idle connections are kept; requests
+    beyond that open extra connections, closed after use.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        max_idle: int = 4,
+        connect_timeout: float = 10.0,
+        read_timeout: float = 120.0,
+    ):
+        """
+        Initialize the pool.
+
+        Args:
+            base_url: Server URL, e.g. "http://localhost:11434/v1". Request
+                paths are appended to its path.
+            max_idle: Maximum number of idle connections kept open.
+            connect_timeout: Timeout in seconds to establish a connection.
+            read_timeout: Timeout in seconds to wait for response data.
+
+        Raises:
+            ValueError: If the URL is not an http or https URL.
+        """
+        parsed = urllib.parse.urlsplit(base_url)
+        if parsed.scheme not in ("http", "https") or not parsed.hostname:
+            raise ValueError(f"Invalid base URL '{base_url}': expected http(s)://host[:port][/path]")
+        self.scheme = parsed.scheme
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.base_path = parsed.path.rstrip("/")
+        self.max_idle = max(1, max_idle)
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.stats = {"requests": 0, "connections": 0}
+        self._idle: List[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Tuple[int, bytes]:
+        """
+        Send a request on a pooled connection and read the whole response.
+
+        A request failing because the server closed an idle connection is
+        retried once on a new connection.
+
+        Args:
+            method: HTTP method.
+            path: Path relative to the base URL.
+            body: Request body (optional).
+            headers: Request headers (optional).
+
+        Returns:
+            The status code and the response body.
+
+        Raises:
+            OSError: If the server cannot be reached or does not answer in time.
+            http.client.HTTPException: If the response is malformed.
+        """
+        with self._lock:
+            self.stats["requests"] += 1
+        conn, reused = self._acquire()
+        try:
+            try:
+                response = self._send(conn, method, path, body, headers)
+            except STALE_CONNECTION_ERRORS:
+                if not reused:
+                    raise
+                conn.close()
+                conn, reused = self._open(), False
+                response = self._send(conn, method, path, body, headers)
+            data = response.read()
+        except BaseException:
+            conn.close()
+            raise
+        if response.will_close:
+            conn.close()
+        else:
+            self._release(conn)
+        return response.status, data
+
+    def close(self) -> None:
+        """Close the idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def _send(
+        self,
+        conn: http.client.HTTPConnection,
+        method: str,
+        path: str,
+        body: Optional[bytes],
+        headers: Optional[Dict[str, str]],
+    ) -> http.client.HTTPResponse:
+        """Send a request and get the response headers."""
+        conn.request(method, self.base_path + path, body=body, headers=headers or {})
+        return conn.getresponse()
+
+    def _acquire(self) -> Tuple[http.client.HTTPConnection, bool]:
+        """
+        Take an idle connection, or open a new one.
+
+        Returns:
+            The connection and whether it was reused.
+        """
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        return self._open(), False
+
+    def _release(self, conn: http.client.HTTPConnection) -> None:
+        """Return a connection to the pool, or close it if the pool is full."""
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def _open(self) -> http.client.HTTPConnection:
+        """
+        Open a new connection with the connect timeout, then switch to the
+        read timeout.
+
+        Returns:
+            The connected connection.
+        """
+        connection_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        conn = connection_class(self.host, self.port, timeout=self.connect_timeout)
+        conn.connect()
+        conn.sock.settimeout(self.read_timeout)
+        with self._lock:
+            self.stats["connections"] += 1
+        return conn
@@ -0,0 +1,73 @@
+"""
+Per-language prompt profiles.
+"""
+import os
+from typing import Dict, Any, Optional
+
+from llm_precommit.constants import DEFAULT_LANGUAGE_PROFILES
+
+
+def get_language_profiles(config: Dict[str, Any]) -> Dict[str, Dict[str, str]]:
+    """
+    Get the language profiles, with user overrides from the config applied.
+
+    User profiles under ``language_profiles`` are merged field by field over the
+    defaults for the same extension, so overriding only ``conventions`` keeps the
+    default ``language`` and ``focus``.
+
+    Args:
+        config: Configuration dictionary.
+
+    Returns:
+        Dictionary mapping file extensions to language profiles.
+    """
+    profiles = {ext: dict(profile) for ext, profile in DEFAULT_LANGUAGE_PROFILES.items()}
+    for ext, overrides in (config.get("language_profiles") or {}).items():
+        if not ext.startswith("."):
+            ext = f".{ext}"
+        profiles.setdefault(ext, {}).update(overrides or {})
+    return profiles
+
+
+def get_language_profile(
+    file_path: str,
+    config: Dict[str, Any],
+    profiles: Optional[Dict[str, Dict[str, str]]] = None,
+) -> Optional[Dict[str, str]]:
+    """
+    Get the language profile for a file.
+
+    Args:
+        file_path: Path to the file.
+        config: Configuration dictionary.
+        profiles: Pre-computed profiles from `get_language_profiles` (optional).
+
+    Returns:
+        The language profile, or None if there is no profile for the file's extension.
+    """
+    if profiles is None:
+        profiles = get_language_profiles(config)
+    return profiles.get(os.path.splitext(file_path)[1].lower())
+
+
+def format_language_section(profile: Optional[Dict[str, str]]) -> str:
+    """
+    Format a language profile as a prompt section.
+
+    Args:
+        profile: The language profile, or None.
+
+    Returns:
+        The prompt section, or an empty string if there is no profile.
+    """
+    if not profile:
+        return ""
+
+    lines = ["## Language Guidelines"]
+    if profile.get("language"):
+        lines.append(f"- Language: {profile['language']}")
+    if profile.get("conventions"):
+        lines.append(f"- Conventions: Follow {profile['conventions']}")
+    if profile.get("focus"):
+        lines.append(f"- Pay special attention to: {profile['focus']}")
+    return "\n".join(lines)
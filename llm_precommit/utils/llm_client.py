@@ -2,15 +2,37 @@
 Abstract base classes for LLM clients.
 """
 import os
+import re
 import abc
 import json
+import time
+import random
 import logging
+import threading
 from typing import Dict, Any, Optional, List, Type, Protocol, runtime_checkable
 
-from llm_precommit.constants import DEFAULT_PROMPT_TEMPLATE
+from llm_precommit.constants import (
+    DEFAULT_FILE_PROMPT_TEMPLATE,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_RESPONSE_PROFILE,
+    DEFAULT_RETRY_BACKOFF_SECONDS,
+    DEFAULT_STRUCTURED_OUTPUT,
+    HUNK_SCREENING_INSTRUCTION,
+    HUNK_SCREENING_SCHEMA,
+    RESPONSE_PROFILES,
+    RESPONSE_SCHEMAS,
+    SYSTEM_INSTRUCTIONS,
+)
+from llm_precommit.utils.concurrency import AdaptiveConcurrencyController
+from llm_precommit.utils.token_utils import estimate_tokens
 
 logger = logging.getLogger(__name__)
 
+
+class LLMOverloadError(Exception):
+    """Raised by `_call_llm` when the service rejects a call with a rate limit or overload error."""
+
+
 @runtime_checkable
 class LLMClient(Protocol):
     """Protocol defining the interface for LLM clients."""
@@ -21,6 +43,9 @@ class LLMClient(Protocol):
         file_path: str,
         file_content: Optional[str] = None,
         prompt_template: Optional[str] = None,
+        model_name: Optional[str] = None,
+        language_section: str = "",
+        related_section: str = "",
     ) -> Dict[str, Any]:
         """
         Analyze code changes using the LLM.
@@ -30,6 +55,9 @@ class LLMClient(Protocol):
             file_path: Path to the file being analyzed
             file_content: Full content of the file (optional)
             prompt_template: Custom prompt template to use (optional)
+            model_name: Model to use for this call (optional, defaults to the client's model)
+            language_section: Guidelines for the file's language (optional)
+            related_section: Signatures of related definitions in other files (optional)
             
         Returns:
             Dict containing the analysis results
@@ -40,7 +68,16 @@ class LLMClient(Protocol):
 class BaseLLMClient(abc.ABC):
     """Abstract base class for LLM clients."""
     
-    def __init__(self, api_key: Optional[str] = None, api_key_env_var: str = "API_KEY"):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        api_key_env_var: str = "API_KEY",
+        model_name: Optional[str] = None,
+        concurrency_controller: Optional[AdaptiveConcurrencyController] = None,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        response_profile: str = DEFAULT_RESPONSE_PROFILE,
+        structured_output: bool = DEFAULT_STRUCTURED_OUTPUT,
+    ):
         """
         Initialize the LLM client.
         
@@ -48,15 +85,45 @@ class BaseLLMClient(abc.ABC):
             api_key: The API key for the LLM service. If not provided, will be read 
                 from environment variable.
             api_key_env_var: Name of the environment variable containing the API key.
+            model_name: Default model to use when a call does not specify one.
+            concurrency_controller: Limit on concurrent calls, shared by all files
+                in the run (optional, unlimited if not provided).
+            max_retries: Retries of calls rejected with rate limit or overload errors.
+            response_profile: Fields requested in responses, "full" or "lean"
+                (only the fields displayed by OutputFormatter).
+            structured_output: Whether to constrain responses to the JSON schema of
+                the profile, for providers that support it.
         
         Raises:
-            ValueError: If API key is not provided and not found in environment.
+            ValueError: If API key is not provided and not found in environment,
+                or the response profile is unknown.
         """
         self.api_key = api_key or os.environ.get(api_key_env_var)
         if not self.api_key:
             raise ValueError(
                 f"API key not provided. Set the {api_key_env_var} environment variable or pass it directly."
             )
+        if response_profile not in RESPONSE_PROFILES:
+            raise ValueError(
+                f"Unknown response profile '{response_profile}'. Available profiles: {', '.join(RESPONSE_PROFILES)}"
+            )
+        self.model_name = model_name
+        self.concurrency_controller = concurrency_controller
+        self.max_retries = max_retries
+        self.response_profile = response_profile
+        self.structured_output = structured_output
+        
+        # Per-run statistics about reuse of the static prompt prefix
+        self.prompt_cache_stats = {"calls": 0, "cached_calls": 0, "cached_tokens": 0}
+        
+        # Per-run token usage, by model
+        self.token_usage: Dict[str, Dict[str, int]] = {}
+        
+        # Per-run durations of successful calls, retries and failed calls
+        self.call_stats: Dict[str, Any] = {"latencies": [], "retries": 0, "errors": 0}
+        
+        # Clients are shared by concurrent analyses within a run
+        self._lock = threading.Lock()
     
     def analyze_code_changes(
         self, 
@@ -64,6 +131,9 @@ class BaseLLMClient(abc.ABC):
         file_path: str,
         file_content: Optional[str] = None,
         prompt_template: Optional[str] = None,
+        model_name: Optional[str] = None,
+        language_section: str = "",
+        related_section: str = "",
     ) -> Dict[str, Any]:
         """
         Analyze code changes using the LLM.
@@ -73,13 +143,13 @@ class BaseLLMClient(abc.ABC):
             file_path: Path to the file being analyzed
             file_content: Full content of the file (optional)
             prompt_template: Custom prompt template to use (optional)
+            model_name: Model to use for this call (optional, defaults to the client's model)
+            language_section: Guidelines for the file's language (optional)
+            related_section: Signatures of related definitions in other files (optional)
             
         Returns:
             Dict containing the analysis results
         """
-        # Create the prompt with the template
-        template = prompt_template or DEFAULT_PROMPT_TEMPLATE
-        
         # Add full content if provided
         full_content_section = ""
         if file_content:
@@ -90,26 +160,303 @@ class BaseLLMClient(abc.ABC):
             ```
             """
         
-        # Format the prompt
-        formatted_prompt = template.format(
+        # A custom template is a single self-contained prompt
+        if prompt_template:
+            formatted_prompt = prompt_template.format(
+                file_path=file_path,
+                diff=diff,
+                full_content_section=full_content_section,
+                language_section=language_section,
+                related_section=related_section,
+            )
+            # It defines its own response format, so responses are not constrained
+            return self._call_with_retries(formatted_prompt, model_name=model_name)
+        
+        # The default template is split into a static system instruction, identical
+        # for every file in the run, and the per-file variable part
+        formatted_prompt = DEFAULT_FILE_PROMPT_TEMPLATE.format(
             file_path=file_path,
             diff=diff,
-            full_content_section=full_content_section
+            full_content_section=full_content_section,
+            language_section=language_section,
+            related_section=related_section,
         )
         
         # Call the LLM-specific implementation
-        return self._call_llm(formatted_prompt)
+        return self._call_with_retries(
+            formatted_prompt,
+            model_name=model_name,
+            system_instruction=SYSTEM_INSTRUCTIONS[self.response_profile],
+            response_schema=RESPONSE_SCHEMAS[self.response_profile] if self.structured_output else None,
+        )
+    
+    def screen_hunks(self, hunks_section: str, model_name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Ask the LLM which hunks deserve a full review, with a short response.
+        
+        Args:
+            hunks_section: The labeled hunks to screen.
+            model_name: Model to use for this call (optional, defaults to the client's model)
+            
+        Returns:
+            Dict with the "suspicious" hunk ids, or an error result
+        """
+        return self._call_with_retries(
+            hunks_section,
+            model_name=model_name,
+            system_instruction=HUNK_SCREENING_INSTRUCTION,
+            response_schema=HUNK_SCREENING_SCHEMA if self.structured_output else None,
+            call_type="screening",
+        )
+    
+    def get_run_stats(self) -> Dict[str, Any]:
+        """
+        Get statistics collected by the client during the run.
+        
+        Returns:
+            Dictionary of run statistics.
+        """
+        with self._lock:
+            stats = {
+                "prompt_cache": dict(self.prompt_cache_stats),
+                "token_usage": {
+                    "prompt_tokens": sum(u["prompt_tokens"] for u in self.token_usage.values()),
+                    "response_tokens": sum(u["response_tokens"] for u in self.token_usage.values()),
+                    "calls": sum(u["calls"] for u in self.token_usage.values()),
+                    "estimated_calls": sum(u["estimated_calls"] for u in self.token_usage.values()),
+                    "by_model": {model: dict(usage) for model, usage in self.token_usage.items()},
+                },
+                "llm_calls": {
+                    "latencies": list(self.call_stats["latencies"]),
+                    "retries": self.call_stats["retries"],
+                    "errors": self.call_stats["errors"],
+                },
+            }
+        if self.concurrency_controller:
+            stats["concurrency"] = self.concurrency_controller.get_stats()
+        return stats
+    
+    def close(self) -> None:
+        """
+        Release any resources held by the client for the run.
+        """
+        pass
+    
+    def _record_prompt_usage(self, cached_tokens: int = 0) -> None:
+        """
+        Record one LLM call and how many prompt tokens were served from a cache.
+        
+        Args:
+            cached_tokens: Number of prompt tokens reused from a provider-side cache.
+        """
+        with self._lock:
+            self.prompt_cache_stats["calls"] += 1
+            if cached_tokens:
+                self.prompt_cache_stats["cached_calls"] += 1
+                self.prompt_cache_stats["cached_tokens"] += cached_tokens
+    
+    def _record_token_usage(
+        self,
+        result: Dict[str, Any],
+        model_name: str,
+        prompt_tokens: Optional[int],
+        response_tokens: Optional[int],
+        prompt: str,
+        response_text: str,
+    ) -> Dict[str, Any]:
+        """
+        Record the tokens used by one call in the run totals and in the result.
+        
+        Counts missing from the provider's usage metadata are estimated from
+        the prompt and response text.
+        
+        Args:
+            result: The parsed analysis result of the call.
+            model_name: The model used for the call.
+            prompt_tokens: Prompt tokens reported by the provider, if any.
+            response_tokens: Response tokens reported by the provider, if any.
+            prompt: The full prompt sent, including any system instruction.
+            response_text: The raw response text.
+            
+        Returns:
+            The result, with the token counts in its `_meta`.
+        """
+        estimated = not prompt_tokens or response_tokens is None
+        if not prompt_tokens:
+            prompt_tokens = estimate_tokens(prompt)
+        if response_tokens is None:
+            response_tokens = estimate_tokens(response_text)
+        
+        with self._lock:
+            usage = self.token_usage.setdefault(
+                model_name, {"prompt_tokens": 0, "response_tokens": 0, "calls": 0, "estimated_calls": 0}
+            )
+            usage["prompt_tokens"] += prompt_tokens
+            usage["response_tokens"] += response_tokens
+            usage["calls"] += 1
+            usage["estimated_calls"] += int(estimated)
+        
+        meta = result.setdefault("_meta", {})
+        meta["prompt_tokens"] = meta.get("prompt_tokens", 0) + prompt_tokens
+        meta["response_tokens"] = meta.get("response_tokens", 0) + response_tokens
+        if estimated:
+            meta["tokens_estimated"] = True
+        return result
+    
+    def _call_with_retries(
+        self,
+        prompt: str,
+        model_name: Optional[str] = None,
+        system_instruction: Optional[str] = None,
+        response_schema: Optional[Dict[str, Any]] = None,
+        call_type: str = "review",
+    ) -> Dict[str, Any]:
+        """
+        Call the LLM within the concurrency limit, retrying with exponential
+        backoff while the service is overloaded.
+        
+        Args:
+            prompt: The formatted prompt to send to the LLM.
+            model_name: Model to use for this call. Defaults to the client's model.
+            system_instruction: Static instruction shared by all calls in the run.
+            response_schema: JSON schema to constrain the response to (optional).
+            call_type: Kind of call, "review" or "screening".
+            
+        Returns:
+            Dictionary containing the analysis results.
+        """
+        controller = self.concurrency_controller
+        # Latencies are only compared between calls of the same model and type
+        # whose prompts are within a factor of two in size
+        latency_class = (model_name or self.model_name, call_type, estimate_tokens(prompt).bit_length())
+        error: Optional[Exception] = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                delay = DEFAULT_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1)
+                time.sleep(delay * random.uniform(0.5, 1.5))
+                with self._lock:
+                    self.call_stats["retries"] += 1
+            
+            if controller:
+                controller.acquire()
+            start_time = time.monotonic()
+            try:
+                result = self._call_llm(
+                    prompt,
+                    model_name=model_name,
+                    system_instruction=system_instruction,
+                    response_schema=response_schema,
+                )
+            except LLMOverloadError as e:
+                error = e
+                logger.debug(f"LLM call overloaded (attempt {attempt + 1}): {e}")
+                if controller:
+                    controller.release(overloaded=True)
+                continue
+            except BaseException:
+                if controller:
+                    controller.release()
+                with self._lock:
+                    self.call_stats["errors"] += 1
+                raise
+            
+            latency = time.monotonic() - start_time
+            if controller:
+                controller.release(latency=latency, latency_class=latency_class)
+            with self._lock:
+                self.call_stats["latencies"].append(latency)
+            return result
+        
+        with self._lock:
+            self.call_stats["errors"] += 1
+        return {
+            "error": str(error),
+            "parsing_error": f"LLM service overloaded after {self.max_retries + 1} attempts"
+        }
+    
+    def _extract_json_from_response(self, response_text: str) -> Dict[str, Any]:
+        """
+        Extract JSON data from the response text.
+        
+        Args:
+            response_text: The text response from the LLM
+            
+        Returns:
+            Dictionary of parsed JSON data
+        """
+        try:
+            # Try to extract JSON using a more robust approach
+            # Look for content within ```json and ``` markers first
+            json_pattern = r"```(?:json)?\s*([\s\S]*?)\s*```"
+            json_matches = re.findall(json_pattern, response_text)
+            
+            if json_matches:
+                # Use the last match if there are multiple code blocks
+                return json.loads(json_matches[-1])
+            
+            # If no JSON in code blocks, try to find JSON directly
+            json_start = response_text.find('{')
+            json_end = response_text.rfind('}') + 1
+            
+            if json_start >= 0 and json_end > json_start:
+                json_content = response_text[json_start:json_end]
+                return json.loads(json_content)
+            
+            # If no JSON format is found, wrap the entire response
+            return {
+                "raw_response": response_text,
+                "parsing_error": "Could not extract JSON from response"
+            }
+        except json.JSONDecodeError as e:
+            return {
+                "raw_response": response_text,
+                "parsing_error": f"Invalid JSON format in response: {str(e)}"
+            }
+    
+    @staticmethod
+    def _combine_prompt(prompt: str, system_instruction: Optional[str]) -> str:
+        """
+        Inline the system instruction into the prompt for providers without
+        system instruction support.
+        
+        Args:
+            prompt: The per-file prompt.
+            system_instruction: The static system instruction, if any.
+            
+        Returns:
+            A single prompt string.
+        """
+        if not system_instruction:
+            return prompt
+        return f"{system_instruction}\n{prompt}"
     
     @abc.abstractmethod
-    def _call_llm(self, prompt: str) -> Dict[str, Any]:
+    def _call_llm(
+        self,
+        prompt: str,
+        model_name: Optional[str] = None,
+        system_instruction: Optional[str] = None,
+        response_schema: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
         """
         Call the LLM with the given prompt.
         
         Args:
             prompt: The formatted prompt to send to the LLM.
+            model_name: Model to use for this call. Defaults to the client's model.
+            system_instruction: Static instruction shared by all calls in the run.
+                Providers without system instruction support should inline it with
+                `_combine_prompt`.
+            response_schema: JSON schema of the expected response (optional).
+                Providers with structured output should constrain the response to
+                it; others can ignore it, the instruction describes the format too.
             
         Returns:
             Dictionary containing the analysis results.
+            
+        Raises:
+            LLMOverloadError: If the service rejected the call with a rate limit
+                or overload error, so it can be retried.
         """
         pass
 
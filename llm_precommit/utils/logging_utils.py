@@ -3,39 +3,142 @@ Logging utilities for LLM pre-commit hooks.
 """
 import os
 import sys
+import json
+import queue
+import atexit
 import logging
-from typing import Optional
+import datetime
+import logging.handlers
+from typing import List, Optional
 
-def setup_logging(verbose: bool = False, log_file: Optional[str] = None) -> None:
+from llm_precommit.constants import DEFAULT_LOG_FORMAT
+
+LOGGER_NAME = "llm_precommit"
+
+# Optional record attributes, passed with `extra=`, written as fields of JSON records
+STRUCTURED_FIELDS = ("file_path", "stage", "duration_seconds")
+
+# Handlers added by setup_logging and the listener writing the log file
+_handlers: List[logging.Handler] = []
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class StdoutHandler(logging.StreamHandler):
+    """
+    Handler writing to the current sys.stdout, so that redirections such as
+    contextlib.redirect_stdout apply to log messages like to prints.
+    """
+
+    def __init__(self):
+        super().__init__(sys.stdout)
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as single-line JSON objects, with the structured fields
+    (file path, stage, duration) given to the logging call.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def setup_logging(
+    verbose: bool = False,
+    log_file: Optional[str] = None,
+    log_format: str = DEFAULT_LOG_FORMAT,
+) -> None:
     """
     Setup logging configuration.
-    
+
+    Messages are written to stdout like the rest of the output, debug messages
+    only when verbose. The log file, if any, receives all messages and is
+    written by a background thread, so logging never waits for file I/O.
+    Calling this again replaces the previous configuration.
+
     Args:
         verbose: Whether to enable debug level logging.
         log_file: Path to file where logs should be written. If None, logs are only
-            sent to stdout/stderr.
-    """
-    # Create logger
-    logger = logging.getLogger("llm_precommit")
-    logger.setLevel(logging.DEBUG if verbose else logging.INFO)
-    
-    # Create formatter
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    
-    # Create console handler
-    console_handler = logging.StreamHandler(sys.stdout)
+            sent to stdout.
+        log_format: Format of the log file: "text", or "json" for one JSON
+            object per line.
+    """
+    global _listener
+    shutdown_logging()
+
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(logging.DEBUG if verbose or log_file else logging.INFO)
+
+    # Console messages are the hook's user-facing diagnostics: plain text,
+    # written synchronously so they stay in order with the review output
+    console_handler = StdoutHandler()
     console_handler.setLevel(logging.DEBUG if verbose else logging.INFO)
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
-    
+    console_handler.setFormatter(logging.Formatter("%(message)s"))
+    _add_handler(logger, console_handler)
+
     # Create file handler if log_file is specified
     if log_file:
         # Create directory for log file if it doesn't exist
         log_dir = os.path.dirname(log_file)
-        if log_dir and not os.path.exists(log_dir):
-            os.makedirs(log_dir)
-            
-        file_handler = logging.FileHandler(log_file)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+
+        file_handler = logging.FileHandler(log_file, encoding="utf-8")
         file_handler.setLevel(logging.DEBUG)
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler) 
\ No newline at end of file
+        if log_format == "json":
+            file_handler.setFormatter(JsonFormatter())
+        else:
+            file_handler.setFormatter(
+                logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+            )
+
+        log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+        _listener.start()
+        _add_handler(logger, logging.handlers.QueueHandler(log_queue))
+
+
+def shutdown_logging() -> None:
+    """
+    Remove the handlers added by setup_logging, after writing the queued
+    messages to the log file.
+    """
+    global _listener
+    logger = logging.getLogger(LOGGER_NAME)
+    for handler in _handlers:
+        logger.removeHandler(handler)
+    _handlers.clear()
+    if _listener:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def _add_handler(logger: logging.Logger, handler: logging.Handler) -> None:
+    """Add a handler to the logger, to be removed by shutdown_logging."""
+    logger.addHandler(handler)
+    _handlers.append(handler)
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,285 @@
+"""
+Run metrics in the Prometheus text format, for node_exporter's textfile
+collector.
+"""
+import logging
+import os
+import re
+import time
+import tempfile
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from llm_precommit.constants import HOOK_DURATION_BUCKETS, LLM_LATENCY_BUCKETS
+from llm_precommit.utils.file_lock import FileLock
+from llm_precommit.utils.result_sink import ResultSink
+
+logger = logging.getLogger(__name__)
+
+METRICS_PREFIX = "llm_precommit"
+
+# Metric families written to the file: name -> (type, help). Counters and
+# histograms accumulate over all runs on the machine; gauges hold the value of
+# the last run
+METRIC_FAMILIES = {
+    "runs_total": ("counter", "Runs of the hook, by exit code."),
+    "hook_duration_seconds": ("histogram", "Duration of hook runs."),
+    "stage_seconds_total": ("counter", "Time spent in each stage of the review pipeline."),
+    "llm_call_duration_seconds": ("histogram", "Duration of successful LLM calls."),
+    "llm_retries_total": ("counter", "LLM calls retried after rate limit or overload errors."),
+    "llm_errors_total": ("counter", "LLM calls that failed, including after all retries."),
+    "review_cache_hits_total": ("counter", "Files served from the review cache."),
+    "review_cache_misses_total": ("counter", "Files not found in the review cache."),
+    "files_total": ("counter", "Files processed, by outcome."),
+    "skipped_files_total": ("counter", "Files not sent to the LLM, by reason."),
+    "tokens_total": ("counter", "Tokens used, by type."),
+    "last_run_timestamp_seconds": ("gauge", "Time of the last run."),
+}
+
+HISTOGRAM_SUFFIXES = ("_bucket", "_sum", "_count")
+
+SAMPLE_RE = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*(?:\{.*\})?)\s+(\S+)(?:\s+\S+)?$")
+
+
+def format_sample_key(name: str, labels: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Build the name and labels part of a sample line.
+
+    Args:
+        name: Metric name without the prefix.
+        labels: Label values (optional).
+
+    Returns:
+        The sample key, e.g. 'llm_precommit_files_total{outcome="cached"}'.
+    """
+    key = f"{METRICS_PREFIX}_{name}"
+    if labels:
+        escaped = (
+            '{}="{}"'.format(label, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+            for label, value in sorted(labels.items())
+        )
+        key += "{" + ",".join(escaped) + "}"
+    return key
+
+
+def declare_histogram(samples: Dict[str, float], name: str, buckets: Iterable[float]) -> None:
+    """
+    Add the samples of a histogram with no observations, so every bucket is
+    present even before it is used.
+
+    Args:
+        samples: Samples to update, by sample key.
+        name: Histogram name without the prefix.
+        buckets: Upper bounds of the histogram buckets.
+    """
+    for bound in [*buckets, float("inf")]:
+        samples.setdefault(_bucket_key(name, bound), 0)
+    samples.setdefault(format_sample_key(f"{name}_sum"), 0)
+    samples.setdefault(format_sample_key(f"{name}_count"), 0)
+
+
+def observe(
+    samples: Dict[str, float],
+    name: str,
+    value: float,
+    buckets: Iterable[float],
+) -> None:
+    """
+    Add an observation to a histogram.
+
+    Args:
+        samples: Samples to update, by sample key.
+        name: Histogram name without the prefix.
+        value: The observed value.
+        buckets: Upper bounds of the histogram buckets.
+    """
+    buckets = list(buckets)
+    declare_histogram(samples, name, buckets)
+    # Buckets are cumulative: the value counts in every bucket it fits in
+    for bound in [*buckets, float("inf")]:
+        if value <= bound:
+            samples[_bucket_key(name, bound)] += 1
+    samples[format_sample_key(f"{name}_sum")] += value
+    samples[format_sample_key(f"{name}_count")] += 1
+
+
+def _bucket_key(name: str, bound: float) -> str:
+    """Build the sample key of a histogram bucket."""
+    return format_sample_key(f"{name}_bucket", {"le": "+Inf" if bound == float("inf") else repr(float(bound))})
+
+
+def collect_run_metrics(
+    summary: ResultSink,
+    run_stats: Dict[str, Any],
+    duration: float,
+    exit_code: int,
+) -> Dict[str, float]:
+    """
+    Build the metric increments of one run.
+
+    Args:
+        summary: Sink that received the analysis results.
+        run_stats: Statistics collected during the run.
+        duration: Duration of the run in seconds.
+        exit_code: Exit code of the hook.
+
+    Returns:
+        Sample values to add to the totals, by sample key.
+    """
+    samples: Dict[str, float] = {format_sample_key("runs_total", {"exit_code": exit_code}): 1}
+    observe(samples, "hook_duration_seconds", duration, HOOK_DURATION_BUCKETS)
+
+    for stage, seconds in (run_stats.get("stage_seconds") or {}).items():
+        samples[format_sample_key("stage_seconds_total", {"stage": stage})] = seconds
+
+    llm_calls = run_stats.get("llm_calls") or {}
+    declare_histogram(samples, "llm_call_duration_seconds", LLM_LATENCY_BUCKETS)
+    for latency in llm_calls.get("latencies") or []:
+        observe(samples, "llm_call_duration_seconds", latency, LLM_LATENCY_BUCKETS)
+    samples[format_sample_key("llm_retries_total")] = llm_calls.get("retries", 0)
+    samples[format_sample_key("llm_errors_total")] = llm_calls.get("errors", 0)
+
+    review_cache = run_stats.get("review_cache") or {}
+    samples[format_sample_key("review_cache_hits_total")] = review_cache.get("hits", 0)
+    samples[format_sample_key("review_cache_misses_total")] = review_cache.get("misses", 0)
+
+    for reason, count in summary.skip_reasons.items():
+        samples[format_sample_key("skipped_files_total", {"reason": reason})] = count
+    for outcome, count in summary.outcomes.items():
+        samples[format_sample_key("files_total", {"outcome": outcome})] = count
+
+    token_usage = run_stats.get("token_usage") or {}
+    for token_type in ("prompt", "response"):
+        samples[format_sample_key("tokens_total", {"type": token_type})] = token_usage.get(f"{token_type}_tokens", 0)
+    return samples
+
+
+def parse_metrics_text(text: str) -> Dict[str, float]:
+    """
+    Read the samples of a text exposition file.
+
+    Args:
+        text: Content of the file.
+
+    Returns:
+        Sample values by sample key. Comments and malformed lines are ignored.
+    """
+    samples: Dict[str, float] = {}
+    for line in text.splitlines():
+        if line.startswith("#"):
+            continue
+        match = SAMPLE_RE.match(line.strip())
+        if not match:
+            continue
+        try:
+            samples[match.group(1)] = float(match.group(2))
+        except ValueError:
+            continue
+    return samples
+
+
+def get_family(sample_key: str) -> str:
+    """
+    Get the metric family of a sample.
+
+    Args:
+        sample_key: The sample key.
+
+    Returns:
+        The family name without the prefix.
+    """
+    name = sample_key.split("{", 1)[0][len(METRICS_PREFIX) + 1:]
+    if name not in METRIC_FAMILIES:
+        for suffix in HISTOGRAM_SUFFIXES:
+            if name.endswith(suffix) and name[:-len(suffix)] in METRIC_FAMILIES:
+                return name[:-len(suffix)]
+    return name
+
+
+def format_metrics_text(samples: Dict[str, float]) -> str:
+    """
+    Write samples in the text exposition format, grouped by family.
+
+    Args:
+        samples: Sample values by sample key.
+
+    Returns:
+        The file content.
+    """
+    families: Dict[str, List[Tuple[str, float]]] = {}
+    for key, value in samples.items():
+        families.setdefault(get_family(key), []).append((key, value))
+
+    def bucket_order(item: Tuple[str, float]) -> Tuple[int, float, str]:
+        # Histogram buckets in increasing order of their bound, then sum and count
+        match = re.search(r'le="([^"]+)"', item[0])
+        if match:
+            return 0, float(match.group(1)), item[0]
+        return 1, 0.0, item[0]
+
+    lines = []
+    for family in [*METRIC_FAMILIES, *sorted(set(families) - set(METRIC_FAMILIES))]:
+        if family not in families:
+            continue
+        if family in METRIC_FAMILIES:
+            metric_type, help_text = METRIC_FAMILIES[family]
+            lines.append(f"# HELP {METRICS_PREFIX}_{family} {help_text}")
+            lines.append(f"# TYPE {METRICS_PREFIX}_{family} {metric_type}")
+        for key, value in sorted(families[family], key=bucket_order):
+            lines.append(f"{key} {int(value) if value == int(value) else repr(float(value))}")
+    return "\n".join(lines) + "\n"
+
+
+def update_metrics_file(path: str, increments: Dict[str, float]) -> None:
+    """
+    Add a run's metrics to the totals in a metrics file.
+
+    Concurrent runs on the machine merge their metrics under a file lock, and
+    the file is replaced atomically so the collector never reads a partial
+    file.
+
+    Args:
+        path: Path of the metrics file, e.g. in node_exporter's textfile
+            collector directory.
+        increments: Sample values of the run, by sample key.
+    """
+    with FileLock(path + ".lock", timeout=10) as locked:
+        if not locked:
+            logger.warning("Warning: Could not lock the metrics file; metrics not recorded")
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                samples = parse_metrics_text(f.read())
+        except OSError:
+            samples = {}
+        for key, value in increments.items():
+            samples[key] = samples.get(key, 0) + value
+        samples[format_sample_key("last_run_timestamp_seconds")] = round(time.time(), 3)
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(format_metrics_text(samples))
+            # Readable by the collector, which usually runs as another user
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.error(f"Error writing metrics file: {e}")
+
+
+def write_run_metrics(
+    path: str,
+    summary: ResultSink,
+    run_stats: Dict[str, Any],
+    duration: float,
+    exit_code: int,
+) -> None:
+    """
+    Record the metrics of a run in a metrics file.
+
+    Args:
+        path: Path of the metrics file.
+        summary: Sink that received the analysis results.
+        run_stats: Statistics collected during the run.
+        duration: Duration of the run in seconds.
+        exit_code: Exit code of the hook.
+    """
+    update_metrics_file(path, collect_run_metrics(summary, run_stats, duration, exit_code))
@@ -0,0 +1,127 @@
+"""
+Per-file model selection based on diff size, language and path rules.
+"""
+import logging
+import os
+from typing import Dict, Any, List, Optional
+
+from llm_precommit.constants import (
+    AVAILABLE_MODELS,
+    DEFAULT_LLM_TYPE,
+    DEFAULT_MODEL_NAME,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def count_changed_lines(diff: str) -> int:
+    """
+    Count the added and removed lines in a unified diff.
+
+    Args:
+        diff: The git diff content.
+
+    Returns:
+        Number of added plus removed lines, excluding file headers.
+    """
+    count = 0
+    for line in diff.splitlines():
+        if line.startswith(("+++", "---")):
+            continue
+        if line.startswith(("+", "-")):
+            count += 1
+    return count
+
+
+def rule_matches(rule: Dict[str, Any], file_path: str, changed_lines: int) -> bool:
+    """
+    Check whether the conditions of a rule hold for a file.
+
+    Rules are mappings with any of the conditions ``paths`` (path fragments, at
+    least one must appear in the file path), ``extensions`` (with dot),
+    ``min_diff_lines`` and ``max_diff_lines``.
+
+    Args:
+        rule: The rule.
+        file_path: Path to the file being analyzed.
+        changed_lines: Number of changed lines in the file's diff.
+
+    Returns:
+        True if every condition of the rule holds, False otherwise.
+    """
+    paths = rule.get("paths")
+    if paths and not any(fragment in file_path for fragment in paths):
+        return False
+
+    extensions = rule.get("extensions")
+    if extensions and os.path.splitext(file_path)[1] not in extensions:
+        return False
+
+    min_lines: Optional[int] = rule.get("min_diff_lines")
+    if min_lines is not None and changed_lines < min_lines:
+        return False
+
+    max_lines: Optional[int] = rule.get("max_diff_lines")
+    if max_lines is not None and changed_lines > max_lines:
+        return False
+
+    return True
+
+
+class ModelRouter:
+    """
+    Pick the model to use for each file from the configured routing rules.
+
+    Each rule is a mapping with a ``model`` key and any of the following
+    conditions, which must all hold for the rule to match:
+
+    - ``paths``: list of path fragments, at least one must appear in the file path
+    - ``extensions``: list of file extensions (with dot)
+    - ``min_diff_lines``: minimum number of changed lines
+    - ``max_diff_lines``: maximum number of changed lines
+
+    Rules are evaluated in order and the first match wins. Files matching no
+    rule use the configured ``model_name``.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        """
+        Initialize the router.
+
+        Args:
+            config: Configuration dictionary.
+        """
+        llm_type = config.get("llm_type", DEFAULT_LLM_TYPE)
+        provider = AVAILABLE_MODELS.get(llm_type, {})
+        self.default_model = (
+            config.get("model_name") or provider.get("default_model") or DEFAULT_MODEL_NAME
+        )
+        self.rules: List[Dict[str, Any]] = config.get("model_routing_rules") or []
+
+        known_models = provider.get("models")
+        if known_models:
+            for rule in self.rules:
+                model = rule.get("model")
+                if model and model not in known_models:
+                    logger.warning(f"Warning: routing rule model '{model}' is not a known {llm_type} model")
+
+    def select_model(self, file_path: str, diff: str) -> str:
+        """
+        Select the model for a file.
+
+        Args:
+            file_path: Path to the file being analyzed.
+            diff: The git diff content for the file.
+
+        Returns:
+            Name of the model to use.
+        """
+        if not self.rules:
+            return self.default_model
+
+        changed_lines = count_changed_lines(diff)
+        for rule in self.rules:
+            if rule_matches(rule, file_path, changed_lines):
+                return rule.get("model") or self.default_model
+
+        return self.default_model
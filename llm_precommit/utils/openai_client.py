@@ -0,0 +1,193 @@
+"""
+Module for interacting with OpenAI-compatible chat completions APIs.
+"""
+import json
+import socket
+import logging
+import http.client
+from typing import Dict, Any, Optional, Tuple
+
+from llm_precommit.constants import (
+    AVAILABLE_MODELS,
+    DEFAULT_CONNECT_TIMEOUT_SECONDS,
+    DEFAULT_MAX_CONCURRENT_ANALYSES,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_OPENAI_BASE_URL,
+    DEFAULT_READ_TIMEOUT_SECONDS,
+    DEFAULT_RESPONSE_PROFILE,
+    DEFAULT_STRUCTURED_OUTPUT,
+)
+from llm_precommit.utils.concurrency import AdaptiveConcurrencyController
+from llm_precommit.utils.http_pool import HTTPConnectionPool
+from llm_precommit.utils.llm_client import BaseLLMClient, LLMClientFactory, LLMOverloadError
+
+logger = logging.getLogger(__name__)
+
+
+class OpenAICompatibleClient(BaseLLMClient):
+    """
+    Client for servers implementing the OpenAI chat completions API, such as
+    OpenAI itself or self-hosted vLLM and Ollama servers.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model_name: Optional[str] = None,
+        base_url: str = DEFAULT_OPENAI_BASE_URL,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT_SECONDS,
+        read_timeout: float = DEFAULT_READ_TIMEOUT_SECONDS,
+        max_connections: int = DEFAULT_MAX_CONCURRENT_ANALYSES,
+        concurrency_controller: Optional[AdaptiveConcurrencyController] = None,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        response_profile: str = DEFAULT_RESPONSE_PROFILE,
+        structured_output: bool = DEFAULT_STRUCTURED_OUTPUT,
+    ):
+        """
+        Initialize the client.
+
+        Args:
+            api_key: The API key. If not provided, will attempt to read from
+                environment variable OPENAI_API_KEY. Servers without
+                authentication accept any value.
+            model_name: Default model. Falls back to the provider default.
+            base_url: URL of the API, up to and including the version prefix,
+                e.g. "http://gpu-box:8000/v1".
+            connect_timeout: Timeout in seconds to connect to the server.
+            read_timeout: Timeout in seconds to wait for a response.
+            max_connections: Number of keep-alive connections kept for the run,
+                typically the maximum number of concurrent calls.
+            concurrency_controller: Limit on concurrent calls shared by the run (optional).
+            max_retries: Retries of calls rejected with rate limit or overload errors.
+            response_profile: Fields requested in responses, "lean" or "full".
+            structured_output: Whether to request responses constrained to the
+                profile's JSON schema (response_format json_schema).
+
+        Raises:
+            ValueError: If API key is not provided or the base URL is invalid.
+        """
+        super().__init__(
+            api_key=api_key,
+            api_key_env_var="OPENAI_API_KEY",
+            model_name=model_name or AVAILABLE_MODELS["openai"]["default_model"],
+            concurrency_controller=concurrency_controller,
+            max_retries=max_retries,
+            response_profile=response_profile,
+            structured_output=structured_output,
+        )
+
+        # One pool of keep-alive connections for the whole run, so concurrent
+        # calls do not each pay a new TCP and TLS handshake
+        self.pool = HTTPConnectionPool(
+            base_url,
+            max_idle=max_connections,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+        )
+
+    def _call_llm(
+        self,
+        prompt: str,
+        model_name: Optional[str] = None,
+        system_instruction: Optional[str] = None,
+        response_schema: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Call the chat completions endpoint with the given prompt.
+
+        Args:
+            prompt: The formatted prompt to send.
+            model_name: Model to use. Defaults to the client's model.
+            system_instruction: Static instruction shared by all calls, sent as
+                the system message so servers can reuse its prefix.
+            response_schema: JSON schema to constrain the response to (optional).
+
+        Returns:
+            Dictionary containing the analysis results.
+
+        Raises:
+            LLMOverloadError: If the server rejected the call with a 429 or 503 error.
+        """
+        model_name = model_name or self.model_name
+        messages = []
+        if system_instruction:
+            messages.append({"role": "system", "content": system_instruction})
+        messages.append({"role": "user", "content": prompt})
+        request = {"model": model_name, "messages": messages}
+        structured = bool(response_schema and self.structured_output)
+        if structured:
+            request["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": "code_review", "schema": response_schema},
+            }
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}",
+        }
+
+        def post() -> Tuple[int, bytes]:
+            body = json.dumps(request).encode("utf-8")
+            return self.pool.request("POST", "/chat/completions", body=body, headers=headers)
+
+        try:
+            status, data = post()
+            if structured and status in (400, 422):
+                # Servers without json_schema support: fall back to plain JSON
+                # instructions for the rest of the run
+                logger.debug(f"Structured output unavailable: HTTP {status}: {data[:200]!r}")
+                self.structured_output = False
+                del request["response_format"]
+                status, data = post()
+        except (OSError, http.client.HTTPException) as e:
+            if isinstance(e, socket.timeout):
+                e = TimeoutError(f"No response within {self.pool.read_timeout} seconds")
+            return {
+                "error": str(e),
+                "parsing_error": "Failed to call OpenAI-compatible API"
+            }
+
+        if status in (429, 503):
+            raise LLMOverloadError(f"HTTP {status}: {data[:200].decode('utf-8', 'replace')}")
+        try:
+            payload = json.loads(data)
+            if status != 200:
+                raise ValueError(f"HTTP {status}: {payload.get('error', payload)}")
+            response_text = payload["choices"][0]["message"]["content"] or ""
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+            return {
+                "error": str(e) if status != 200 else f"Unexpected response: {e}",
+                "parsing_error": "Failed to call OpenAI-compatible API"
+            }
+
+        usage = payload.get("usage") or {}
+        self._record_prompt_usage((usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0) or 0)
+        return self._record_token_usage(
+            self._extract_json_from_response(response_text),
+            model_name,
+            prompt_tokens=usage.get("prompt_tokens"),
+            response_tokens=usage.get("completion_tokens"),
+            prompt=self._combine_prompt(prompt, system_instruction),
+            response_text=response_text,
+        )
+
+    def get_run_stats(self) -> Dict[str, Any]:
+        """
+        Get statistics collected by the client during the run, including
+        connection reuse.
+
+        Returns:
+            Dictionary of run statistics.
+        """
+        stats = super().get_run_stats()
+        stats["http"] = dict(self.pool.stats)
+        return stats
+
+    def close(self) -> None:
+        """
+        Close the pooled connections.
+        """
+        self.pool.close()
+
+
+# Register the OpenAICompatibleClient with the factory
+LLMClientFactory.register("openai", OpenAICompatibleClient)
@@ -2,10 +2,13 @@
 Utilities for formatting and displaying output from the LLM to the user.
 """
 import json
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import os
 from colorama import Fore, Style, init
 
+from llm_precommit.constants import BUDGET_SKIP_REASON
+from llm_precommit.utils.result_sink import ResultSink
+
 # Initialize colorama
 init()
 
@@ -45,6 +48,10 @@ class OutputFormatter:
         output.append(f"{Fore.CYAN}File: {file_path}{Style.RESET_ALL}")
         output.append(f"{Fore.CYAN}{'=' * 80}{Style.RESET_ALL}\n")
         
+        # Partial review, e.g. of a large file with failed chunks
+        if result.get("error"):
+            output.append(f"{Fore.RED}Error: {result['error']}{Style.RESET_ALL}\n")
+        
         # Issues
         if "issues" in result and result["issues"]:
             output.append(f"{Fore.YELLOW}Issues:{Style.RESET_ALL}")
@@ -163,28 +170,94 @@ class OutputFormatter:
             return Fore.WHITE
 
 
-def print_summary(results: Dict[str, Dict[str, Any]]) -> None:
+def format_concurrency_timeline(stats: Dict[str, Any]) -> str:
+    """
+    Format how the concurrency limit changed during a run.
+    
+    Args:
+        stats: Statistics of the concurrency controller.
+        
+    Returns:
+        Formatted timeline.
+    """
+    lines = [
+        f"{Fore.CYAN}Concurrency: final limit {stats.get('final_limit')}, peak {stats.get('peak_limit')}, "
+        f"{stats.get('overloads', 0)} overload errors, {stats.get('latency_spikes', 0)} latency spikes{Style.RESET_ALL}"
+    ]
+    for entry in stats.get("timeline", []):
+        lines.append(f"  {entry['elapsed_seconds']:8.2f}s  limit {entry['limit']:<3} ({entry['reason']})")
+    return "\n".join(lines)
+
+
+def print_summary(summary: ResultSink, run_stats: Optional[Dict[str, Any]] = None) -> None:
     """
     Print a summary of all file analyses.
     
     Args:
-        results: Dictionary mapping file paths to analysis results.
+        summary: Sink that received the analysis results.
+        run_stats: Statistics collected during the run (optional).
     """
-    total_files = len(results)
-    files_with_issues = sum(1 for r in results.values() 
-                          if "issues" in r and r["issues"])
-    files_with_convention_issues = sum(1 for r in results.values() 
-                                     if "coding_convention_issues" in r and r["coding_convention_issues"])
-    files_with_security_concerns = sum(1 for r in results.values() 
-                                     if "security_concerns" in r and r["security_concerns"])
+    run_stats = run_stats or {}
+    skip_reasons = dict(summary.skip_reasons)
+    budget_skipped = skip_reasons.pop(BUDGET_SKIP_REASON, 0)
+    files_skipped = sum(skip_reasons.values())
+    
+    total_files = summary.files - files_skipped - budget_skipped
+    files_with_issues = summary.files_with_issues
+    files_with_convention_issues = summary.files_with_convention_issues
+    files_with_security_concerns = summary.files_with_security_concerns
     
     print(f"\n{Fore.CYAN}{'=' * 40}{Style.RESET_ALL}")
     print(f"{Fore.CYAN}SUMMARY{Style.RESET_ALL}")
     print(f"{Fore.CYAN}{'=' * 40}{Style.RESET_ALL}")
     print(f"Total files analyzed: {total_files}")
+    if files_skipped:
+        breakdown = ", ".join(f"{reason}: {count}" for reason, count in sorted(skip_reasons.items()))
+        print(f"Files skipped (no review needed): {files_skipped} ({breakdown})")
+    if budget_skipped:
+        print(f"{Fore.YELLOW}Files skipped (token budget exhausted): {budget_skipped}{Style.RESET_ALL}")
     print(f"Files with issues: {files_with_issues}")
     print(f"Files with convention issues: {files_with_convention_issues}")
     print(f"Files with security concerns: {files_with_security_concerns}")
+    
+    token_usage = run_stats.get("token_usage", {})
+    if token_usage.get("calls"):
+        estimated = f", {token_usage['estimated_calls']} estimated" if token_usage.get("estimated_calls") else ""
+        print(f"Tokens: {token_usage['prompt_tokens']} prompt + {token_usage['response_tokens']} response "
+              f"in {token_usage['calls']} calls{estimated}")
+        if token_usage.get("cost") is not None:
+            print(f"Estimated cost: {token_usage['cost']:.4f}")
+    
+    diff_payload = run_stats.get("diff_payload", {})
+    if diff_payload.get("raw_bytes"):
+        saved = 1 - diff_payload["sent_bytes"] / diff_payload["raw_bytes"]
+        print(f"Diff payload: {diff_payload['raw_bytes'] / 1024:.1f} KB -> "
+              f"{diff_payload['sent_bytes'] / 1024:.1f} KB ({saved:.0%} smaller)")
+    
+    review_cache = run_stats.get("review_cache", {})
+    if review_cache.get("hits"):
+        shared = f" ({review_cache['shared']} shared with concurrent runs)" if review_cache.get("shared") else ""
+        patch = f", {review_cache['patch_id_hits']} by patch ID" if review_cache.get("patch_id_hits") else ""
+        print(f"Review cache: {review_cache['hits']} hits{shared}{patch}, {review_cache.get('misses', 0)} misses")
+    
+    prompt_cache = run_stats.get("prompt_cache", {})
+    if prompt_cache.get("cached_calls"):
+        print(f"Prompt cache: static prefix reused in {prompt_cache['cached_calls']}/{prompt_cache['calls']} calls "
+              f"(~{prompt_cache['cached_tokens']} input tokens saved)")
+    
+    two_phase = run_stats.get("two_phase", {})
+    if two_phase.get("screening_calls"):
+        print(f"Two-phase review: {two_phase['flagged_hunks']}/{two_phase['hunks']} hunks flagged in "
+              f"{two_phase['screening_calls']} screening calls ({two_phase['screening_seconds']:.1f}s), "
+              f"{two_phase['files_cleared']} files cleared without full review")
+    
+    dedup = run_stats.get("dedup", {})
+    if dedup.get("duplicates"):
+        print(f"Identical changes: {dedup['duplicates']} files shared the review of another file")
+    
+    http_stats = run_stats.get("http", {})
+    if http_stats.get("requests"):
+        print(f"HTTP connections: {http_stats['connections']} opened for {http_stats['requests']} requests")
     print(f"{Fore.CYAN}{'=' * 40}{Style.RESET_ALL}\n")
     
     if files_with_issues > 0 or files_with_convention_issues > 0 or files_with_security_concerns > 0:
@@ -0,0 +1,108 @@
+"""
+Streaming pipeline helpers with bounded memory.
+"""
+import time
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional
+
+
+def bounded_map(
+    func: Callable[[Any], Any],
+    items: Iterable[Any],
+    max_workers: int,
+    max_pending: int,
+) -> Iterator[Any]:
+    """
+    Apply a function to a stream of items on a thread pool, yielding results
+    in input order.
+
+    Items are pulled from the iterable lazily and at most `max_pending` of
+    them are submitted but not yet consumed, so when the items come from a
+    generator, memory stays proportional to `max_pending` rather than to the
+    length of the stream.
+
+    Args:
+        func: Function applied to each item.
+        items: The input items, typically a generator of upstream stages.
+        max_workers: Number of worker threads.
+        max_pending: Maximum number of items in flight (at least max_workers
+            keeps every worker busy).
+
+    Yields:
+        The results of `func`, in the order of the items.
+    """
+    max_pending = max(1, max_pending)
+    window: Deque[Future] = deque()
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    try:
+        for item in items:
+            window.append(executor.submit(func, item))
+            if len(window) >= max_pending:
+                yield window.popleft().result()
+        while window:
+            yield window.popleft().result()
+    finally:
+        # The consumer stopped early or a stage failed: drop the queued work
+        for future in window:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+class StageTimer:
+    """
+    Time spent in each stage of a chain of lazy generators.
+
+    Each stage's iterator is wrapped with `wrap`. Pulling an item from a stage
+    also runs the upstream stages it pulls from, so the time of nested pulls
+    is subtracted: each stage is charged only for its own work.
+    """
+
+    def __init__(self):
+        """Initialize the timer."""
+        self.seconds: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def wrap(self, name: Optional[str], items: Iterable[Any]) -> Iterator[Any]:
+        """
+        Time the production of each item of a stage.
+
+        Args:
+            name: Name of the stage, or None to exclude the stage's own time
+                from its consumer without recording it (e.g. waiting for
+                workers timed separately).
+            items: The stage's iterable.
+
+        Yields:
+            The items of the stage.
+        """
+        iterator = iter(items)
+        while True:
+            stack: List[float] = self._local.__dict__.setdefault("stack", [])
+            stack.append(0.0)
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                elapsed = time.perf_counter() - start
+                nested = stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                if name:
+                    self.add(name, elapsed - nested)
+            yield item
+
+    def add(self, name: str, seconds: float) -> None:
+        """
+        Add time to a stage, e.g. from worker threads.
+
+        Args:
+            name: Name of the stage.
+            seconds: Time spent.
+        """
+        with self._lock:
+            self.seconds[name] = self.seconds.get(name, 0.0) + seconds
@@ -0,0 +1,131 @@
+"""
+Sink of the analysis results of a run: counts for the summary, the exit
+code and the metrics, and the JSON output, updated as each result arrives.
+"""
+import json
+import os
+import tempfile
+from typing import Dict, Any, Optional
+
+from llm_precommit.constants import BUDGET_SKIP_REASON
+from llm_precommit.utils.sharding import OUTPUT_FORMAT_VERSION
+
+
+def get_result_outcome(result: Dict[str, Any]) -> str:
+    """
+    Classify how a file's result was obtained.
+
+    Args:
+        result: The analysis result.
+
+    Returns:
+        "skipped", "failed", "cached", "deduplicated" or "reviewed".
+    """
+    meta = result.get("_meta") or {}
+    if meta.get("skipped"):
+        return "skipped"
+    if "parsing_error" in result:
+        return "failed"
+    if meta.get("cache_hit"):
+        return "cached"
+    if meta.get("duplicate_of"):
+        return "deduplicated"
+    return "reviewed"
+
+
+class ResultSink:
+    """
+    Consumer of the results of a run, one file at a time.
+
+    Only counts are kept, so memory does not grow with the number of files.
+    With an output path, each result is also written to the JSON output as
+    it arrives, in the format of write_results_json; the file is only put in
+    place by finish, so a failed run leaves no partial output.
+    """
+
+    def __init__(self, output_path: Optional[str] = None, shard: str = ""):
+        """
+        Initialize the sink.
+
+        Args:
+            output_path: Path of the JSON output file (optional).
+            shard: Shard specification of the run, if sharded.
+        """
+        self.files = 0
+        self.files_with_issues = 0
+        self.files_with_convention_issues = 0
+        self.files_with_security_concerns = 0
+        # Files with an error or skipped for the token budget
+        self.incomplete_files = 0
+        self.outcomes: Dict[str, int] = {}
+        self.skip_reasons: Dict[str, int] = {}
+
+        self.output_path = output_path
+        self._file = None
+        self._temp_path = None
+        if output_path:
+            fd, self._temp_path = tempfile.mkstemp(
+                dir=os.path.dirname(os.path.abspath(output_path)), prefix=".results-", suffix=".tmp"
+            )
+            self._file = os.fdopen(fd, "w", encoding="utf-8")
+            self._file.write(
+                f'{{\n  "version": {OUTPUT_FORMAT_VERSION},\n  "shard": {json.dumps(shard)},\n  "results": {{'
+            )
+
+    def add(self, file_path: str, result: Dict[str, Any]) -> None:
+        """
+        Account for the result of a file.
+
+        Args:
+            file_path: The path to the analyzed file.
+            result: The analysis result.
+        """
+        meta = result.get("_meta") or {}
+        outcome = get_result_outcome(result)
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        if outcome == "skipped":
+            reason = meta.get("skip_reason", "unknown")
+            self.skip_reasons[reason] = self.skip_reasons.get(reason, 0) + 1
+        if "error" in result or meta.get("skip_reason") == BUDGET_SKIP_REASON:
+            self.incomplete_files += 1
+        if result.get("issues"):
+            self.files_with_issues += 1
+        if result.get("coding_convention_issues"):
+            self.files_with_convention_issues += 1
+        if result.get("security_concerns"):
+            self.files_with_security_concerns += 1
+
+        if self._file:
+            separator = "," if self.files else ""
+            self._file.write(f"{separator}\n    {json.dumps(file_path)}: {json.dumps(result, default=str)}")
+        self.files += 1
+
+    def finish(self, run_stats: Dict[str, Any], exit_code: int) -> None:
+        """
+        Complete the JSON output with the statistics and exit code of the run.
+
+        Args:
+            run_stats: Statistics collected during the run.
+            exit_code: Exit code of the run.
+        """
+        if not self._file:
+            return
+        self._file.write(
+            f'\n  }},\n  "run_stats": {json.dumps(run_stats, default=str)},\n  "exit_code": {exit_code}\n}}\n'
+        )
+        self._file.close()
+        self._file = None
+        os.replace(self._temp_path, self.output_path)
+        self._temp_path = None
+
+    def close(self) -> None:
+        """Discard the JSON output of a run that did not finish."""
+        if self._file:
+            self._file.close()
+            self._file = None
+        if self._temp_path:
+            try:
+                os.remove(self._temp_path)
+            except OSError:
+                pass
+            self._temp_path = None
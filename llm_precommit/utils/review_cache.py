@@ -0,0 +1,361 @@
+"""
+On-disk cache of review results.
+"""
+import logging
+import os
+import json
+import time
+import hashlib
+import tempfile
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from llm_precommit.constants import (
+    CACHE_DIR_NAME,
+    DEFAULT_CACHE_ENABLED,
+    DEFAULT_CACHE_TTL_DAYS,
+    DEFAULT_SINGLE_FLIGHT_TIMEOUT_SECONDS,
+)
+from llm_precommit.utils.chunking import FINDING_KEYS
+from llm_precommit.utils.diff_utils import shift_line_number
+from llm_precommit.utils.file_lock import FileLock
+from llm_precommit.utils.git_utils import get_git_common_dir
+
+logger = logging.getLogger(__name__)
+
+# Bump when the cached result format or key composition changes
+CACHE_VERSION = 1
+
+# Expired entries are removed by the first write after this interval, noted
+# by the modification time of a marker file in the cache directory
+PRUNE_INTERVAL_SECONDS = 24 * 3600
+PRUNE_MARKER_NAME = ".last-prune"
+
+
+class ReviewCache:
+    """
+    Cache of analysis results, keyed by everything that determines the LLM
+    response (model, prompt, file path, diff and content).
+
+    Entries are JSON files in a two-level directory layout. Writes are atomic,
+    so concurrent hook runs never see partial entries, and `get_or_compute`
+    makes concurrent processes computing the same entry share one LLM call.
+    Expired entries are pruned about once a day, so the cache only holds
+    the reviews of the last TTL days.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        ttl_days: float = DEFAULT_CACHE_TTL_DAYS,
+        single_flight_timeout: float = DEFAULT_SINGLE_FLIGHT_TIMEOUT_SECONDS,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Directory holding the cache entries.
+            ttl_days: Age after which entries are ignored and removed.
+            single_flight_timeout: Maximum seconds to wait for another process
+                computing the same entry before computing it anyway.
+        """
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_days * 24 * 3600
+        self.single_flight_timeout = single_flight_timeout
+
+    @staticmethod
+    def make_key(**parts: Any) -> str:
+        """
+        Build a cache key from the inputs of an LLM call.
+
+        Args:
+            **parts: JSON-serializable values determining the response.
+
+        Returns:
+            Hex digest identifying the call.
+        """
+        payload = json.dumps({"version": CACHE_VERSION, **parts}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a cached result.
+
+        Args:
+            key: The cache key.
+
+        Returns:
+            The cached analysis result, or None on a miss.
+        """
+        entry = self._read(key)
+        return entry.get("result") if entry else None
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        """
+        Store a result. Failed or partial analyses are not cached.
+
+        Args:
+            key: The cache key.
+            result: The analysis result.
+        """
+        self._write(key, result)
+
+    def get_patch_result(self, key: str, hunk_starts: List[int]) -> Optional[Dict[str, Any]]:
+        """
+        Get a result stored by patch ID, with its line numbers moved to where
+        the patch's hunks are now.
+
+        Args:
+            key: The patch cache key.
+            hunk_starts: New-file start lines of the hunks of the current diff.
+
+        Returns:
+            The shifted analysis result, or None on a miss.
+        """
+        entry = self._read(key)
+        if not entry or len(entry.get("hunk_starts") or []) != len(hunk_starts):
+            return None
+        return shift_result_lines(entry["result"], entry["hunk_starts"], hunk_starts)
+
+    def put_patch_result(self, key: str, result: Dict[str, Any], hunk_starts: List[int]) -> None:
+        """
+        Store a result by patch ID, with the hunk positions its line numbers
+        refer to. Failed or partial analyses are not cached.
+
+        Args:
+            key: The patch cache key.
+            result: The analysis result.
+            hunk_starts: New-file start lines of the hunks of the reviewed diff.
+        """
+        self._write(key, result, hunk_starts=hunk_starts)
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Dict[str, Any]],
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Get a cached result, or compute and store it, with at most one process
+        on the machine computing a given key at a time.
+
+        A process finding the key locked by another one waits for its result
+        instead of issuing the same LLM call. If the other process fails, or
+        takes longer than the single-flight timeout, the result is computed
+        here.
+
+        Args:
+            key: The cache key.
+            compute: Function producing the result on a miss.
+
+        Returns:
+            Tuple of the result and whether it came from the cache.
+        """
+        result = self.get(key)
+        if result is not None:
+            return result, True
+
+        lock = FileLock(self._path(key) + ".lock", timeout=self.single_flight_timeout)
+        locked = lock.acquire()
+        try:
+            # Another process may have stored the result while we waited
+            if locked:
+                result = self.get(key)
+                if result is not None:
+                    return result, True
+
+            result = compute()
+            self.put(key, result)
+            return result, False
+        finally:
+            if locked:
+                # Waiters re-check the cache after the lock, so removing the
+                # lock file at most costs a racing process a duplicate call
+                lock.release(remove=True)
+
+    def _read(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Read a cache entry, removing it if it expired.
+
+        Args:
+            key: The cache key.
+
+        Returns:
+            The entry, or None on a miss.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - entry.get("created", 0) > self.ttl_seconds:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return entry
+
+    def _write(self, key: str, result: Dict[str, Any], **fields: Any) -> None:
+        """
+        Atomically write a cache entry, unless the analysis failed.
+
+        Args:
+            key: The cache key.
+            result: The analysis result, stored without its metadata.
+            **fields: Additional JSON-serializable fields of the entry.
+        """
+        if "parsing_error" in result or "error" in result:
+            return
+
+        result = {k: v for k, v in result.items() if k != "_meta"}
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"created": time.time(), "result": result, **fields}, f)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.error(f"Error writing review cache entry: {e}")
+            return
+        self._maybe_prune()
+
+    def prune(self) -> int:
+        """
+        Remove entries older than the TTL, with the lock and temporary files
+        left behind by interrupted runs.
+
+        Returns:
+            Number of files removed.
+        """
+        cutoff = time.time() - self.ttl_seconds
+        removed = 0
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return 0
+        for name in names:
+            subdir = os.path.join(self.cache_dir, name)
+            # Only the entry directories; cache_dir may be shared with other files
+            if len(name) != 2 or not os.path.isdir(subdir):
+                continue
+            try:
+                with os.scandir(subdir) as entries:
+                    for entry in entries:
+                        if entry.name.endswith((".json", ".lock", ".tmp")) and entry.stat().st_mtime < cutoff:
+                            os.remove(entry.path)
+                            removed += 1
+            except OSError as e:
+                logger.debug(f"Error pruning review cache directory {subdir}: {e}")
+        return removed
+
+    def _maybe_prune(self) -> None:
+        """Prune the cache, unless it was pruned within the prune interval."""
+        marker = os.path.join(self.cache_dir, PRUNE_MARKER_NAME)
+        try:
+            if time.time() - os.path.getmtime(marker) < PRUNE_INTERVAL_SECONDS:
+                return
+        except OSError:
+            pass
+        try:
+            # Mark first, so concurrent runs do not all prune
+            with open(marker, "a", encoding="utf-8"):
+                pass
+            os.utime(marker, None)
+        except OSError:
+            return
+        removed = self.prune()
+        if removed:
+            logger.debug(f"Removed {removed} expired review cache files")
+
+    def _path(self, key: str) -> str:
+        """
+        Get the path of a cache entry.
+
+        Args:
+            key: The cache key.
+
+        Returns:
+            Path of the entry's JSON file.
+        """
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+
+def get_default_cache_dir() -> Optional[str]:
+    """
+    Get the default cache directory, shared by all worktrees of the repository.
+
+    Returns:
+        Path inside the common git directory, or None outside a git repository.
+    """
+    git_dir = get_git_common_dir()
+    if not git_dir:
+        return None
+    return os.path.join(git_dir, CACHE_DIR_NAME, "cache")
+
+
+def create_review_cache(config: Dict[str, Any]) -> Optional[ReviewCache]:
+    """
+    Create the review cache configured for the run.
+
+    Args:
+        config: Configuration dictionary.
+
+    Returns:
+        The review cache, or None if caching is disabled or unavailable.
+    """
+    if not config.get("cache_enabled", DEFAULT_CACHE_ENABLED):
+        return None
+    cache_dir = config.get("cache_dir") or get_default_cache_dir()
+    if not cache_dir:
+        return None
+    return ReviewCache(
+        cache_dir,
+        ttl_days=config.get("cache_ttl_days", DEFAULT_CACHE_TTL_DAYS),
+        single_flight_timeout=config.get("single_flight_timeout_seconds", DEFAULT_SINGLE_FLIGHT_TIMEOUT_SECONDS),
+    )
+
+
+def shift_result_lines(
+    result: Dict[str, Any],
+    old_starts: List[int],
+    new_starts: List[int],
+) -> Dict[str, Any]:
+    """
+    Move the line numbers of a result's findings from one placement of a patch
+    to another.
+
+    Args:
+        result: The analysis result.
+        old_starts: Hunk starts the findings were reported against.
+        new_starts: Hunk starts of the same hunks in the new placement.
+
+    Returns:
+        A copy of the result with shifted line numbers.
+    """
+    shifted = dict(result)
+    for key in FINDING_KEYS:
+        findings = result.get(key)
+        if not isinstance(findings, list):
+            continue
+        shifted[key] = []
+        for finding in findings:
+            if isinstance(finding, dict) and finding.get("line_number") not in (None, ""):
+                finding = {**finding, "line_number": shift_line_number(finding["line_number"], old_starts, new_starts)}
+            shifted[key].append(finding)
+    return shifted
+
+
+def normalize_diff_for_cache(diff: str) -> str:
+    """
+    Remove diff lines that do not affect the review, so the same change gets
+    the same key whether it is staged or part of a commit range.
+
+    Args:
+        diff: The git diff content for one file.
+
+    Returns:
+        The diff without "index" lines.
+    """
+    return "\n".join(line for line in diff.splitlines() if not line.startswith("index "))
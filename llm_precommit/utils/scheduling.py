@@ -0,0 +1,40 @@
+"""
+Order of the review work: riskiest files first, shortest diffs first.
+"""
+from typing import Dict, Any, List
+
+from llm_precommit.utils.model_router import rule_matches
+
+
+def get_risk_score(file_path: str, changed_lines: int, rules: List[Dict[str, Any]]) -> float:
+    """
+    Score the risk of a file's change.
+
+    Args:
+        file_path: Path to the file.
+        changed_lines: Number of changed lines in the file's diff.
+        rules: Risk rules: routing conditions with a ``weight`` (default 1).
+
+    Returns:
+        The sum of the weights of the matching rules.
+    """
+    return sum(rule.get("weight", 1) for rule in rules if rule_matches(rule, file_path, changed_lines))
+
+
+def prioritize_files(files: List[str], weights: Dict[str, int], rules: List[Dict[str, Any]]) -> List[str]:
+    """
+    Order files for review: by decreasing risk score, then by increasing diff
+    size (shortest job first), then in their original order.
+
+    Args:
+        files: File paths to review.
+        weights: Changed lines per file; missing files count as 0.
+        rules: Risk rules, see get_risk_score.
+
+    Returns:
+        The files in review order.
+    """
+    return sorted(
+        files,
+        key=lambda f: (-get_risk_score(f, weights.get(f, 0), rules), weights.get(f, 0)),
+    )
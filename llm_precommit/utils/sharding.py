@@ -0,0 +1,147 @@
+"""
+Sharding of review work across CI runners and merging of per-shard outputs.
+"""
+import json
+from typing import Dict, Any, List, Tuple
+
+# Version of the JSON output format written with --output-json
+OUTPUT_FORMAT_VERSION = 1
+
+
+def parse_shard_spec(spec: str) -> Tuple[int, int]:
+    """
+    Parse a shard specification of the form "i/N".
+
+    Args:
+        spec: The shard specification, with 1 <= i <= N.
+
+    Returns:
+        Tuple of the 1-based shard index and the number of shards.
+
+    Raises:
+        ValueError: If the specification is malformed or out of range.
+    """
+    try:
+        index_str, total_str = spec.split("/")
+        index, total = int(index_str), int(total_str)
+    except ValueError:
+        raise ValueError(f"Invalid shard '{spec}': expected the form i/N, e.g. 1/4")
+    if total < 1 or not 1 <= index <= total:
+        raise ValueError(f"Invalid shard '{spec}': index must be between 1 and {max(total, 1)}")
+    return index, total
+
+
+def shard_files(files: List[str], weights: Dict[str, int], index: int, total: int) -> List[str]:
+    """
+    Deterministically select the files of one shard, balanced by diff size.
+
+    Files are assigned greedily, largest first, to the shard with the smallest
+    total weight so far (ties go to the lowest shard). Every runner computes
+    the same assignment from the same inputs.
+
+    Args:
+        files: Candidate file paths.
+        weights: Changed lines per file; missing files weigh 1.
+        index: 1-based index of the shard to select.
+        total: Number of shards.
+
+    Returns:
+        The files assigned to the shard, in their original order.
+    """
+    if total <= 1:
+        return list(files)
+
+    loads = [0] * total
+    assignment: Dict[str, int] = {}
+    for path in sorted(set(files), key=lambda f: (-max(weights.get(f, 1), 1), f)):
+        shard = min(range(total), key=lambda i: (loads[i], i))
+        assignment[path] = shard
+        loads[shard] += max(weights.get(path, 1), 1)
+
+    return [f for f in files if assignment.get(f) == index - 1]
+
+
+def write_results_json(
+    output_path: str,
+    results: Dict[str, Dict[str, Any]],
+    run_stats: Dict[str, Any],
+    exit_code: int,
+    shard: str = "",
+) -> None:
+    """
+    Write the results of a run to a JSON file.
+
+    Args:
+        output_path: Path of the JSON file.
+        results: Dictionary mapping file paths to analysis results.
+        run_stats: Statistics collected during the run.
+        exit_code: Exit code of the run.
+        shard: Shard specification of the run, if sharded.
+    """
+    data = {
+        "version": OUTPUT_FORMAT_VERSION,
+        "shard": shard,
+        "exit_code": exit_code,
+        "run_stats": run_stats,
+        "results": results,
+    }
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, default=str)
+
+
+def merge_results_json(input_paths: List[str]) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Any], int]:
+    """
+    Merge the JSON outputs of several shards.
+
+    Args:
+        input_paths: Paths of the per-shard JSON files.
+
+    Returns:
+        Tuple of the merged results, the summed run statistics and the highest
+        exit code of all shards.
+
+    Raises:
+        ValueError: If a file is not a supported output file.
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+    run_stats: Dict[str, Any] = {}
+    exit_code = 0
+    for path in input_paths:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict) or data.get("version") != OUTPUT_FORMAT_VERSION:
+            raise ValueError(f"{path} is not an llm-precommit output file (version {OUTPUT_FORMAT_VERSION})")
+        results.update(data.get("results", {}))
+        run_stats = sum_stats(run_stats, data.get("run_stats", {}))
+        exit_code = max(exit_code, int(data.get("exit_code", 0)))
+    return results, run_stats, exit_code
+
+
+def sum_stats(left: Dict[str, Any], right: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Recursively sum two run statistics dictionaries.
+
+    Numbers are added, nested dictionaries are merged, lists are concatenated
+    and other values from the right side win.
+
+    Args:
+        left: The first statistics dictionary.
+        right: The second statistics dictionary.
+
+    Returns:
+        The summed statistics.
+    """
+    merged = dict(left)
+    for key, value in right.items():
+        current = merged.get(key)
+        if isinstance(value, bool) or current is None:
+            merged[key] = value
+        elif isinstance(value, (int, float)) and isinstance(current, (int, float)):
+            merged[key] = current + value
+        elif isinstance(value, dict) and isinstance(current, dict):
+            merged[key] = sum_stats(current, value)
+        elif isinstance(value, list) and isinstance(current, list):
+            merged[key] = current + value
+        else:
+            merged[key] = value
+    return merged
@@ -0,0 +1,393 @@
+"""
+Local index of symbol definitions, used to add the signatures of functions
+and classes a diff refers to in other files.
+"""
+import logging
+import os
+import re
+import ast
+import json
+import time
+import subprocess
+import tempfile
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from llm_precommit.constants import (
+    CACHE_DIR_NAME,
+    DEFAULT_SYMBOL_CONTEXT,
+    DEFAULT_SYMBOL_CONTEXT_TOKEN_BUDGET,
+    SYMBOL_INDEX_RETENTION_DAYS,
+)
+from llm_precommit.utils.diff_utils import get_changed_lines
+from llm_precommit.utils.file_lock import FileLock
+from llm_precommit.utils.git_utils import get_git_common_dir
+from llm_precommit.utils.token_utils import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Bump when the extracted symbol format changes
+SYMBOL_INDEX_VERSION = 1
+
+# Definition patterns for languages without a parser, by file extension. The
+# "name" group is the symbol name; the signature is the matched line.
+_JS_PATTERNS = [
+    (r"^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*(?P<name>\w+)\s*\(", "function"),
+    (r"^\s*(?:export\s+)?(?:default\s+)?(?:abstract\s+)?class\s+(?P<name>\w+)", "class"),
+    (r"^\s*(?:export\s+)?(?:const|let|var)\s+(?P<name>\w+)\s*=\s*(?:async\s*)?(?:\([^)]*\)|\w+)\s*=>", "function"),
+    (r"^\s*(?:export\s+)?(?:interface|type)\s+(?P<name>\w+)", "type"),
+]
+SYMBOL_PATTERNS: Dict[str, List[Tuple[str, str]]] = {
+    ".js": _JS_PATTERNS,
+    ".jsx": _JS_PATTERNS,
+    ".ts": _JS_PATTERNS,
+    ".tsx": _JS_PATTERNS,
+    ".go": [
+        (r"^func\s+(?:\([^)]*\)\s*)?(?P<name>\w+)\s*\(", "function"),
+        (r"^type\s+(?P<name>\w+)\s+(?:struct|interface)", "type"),
+    ],
+    ".rs": [
+        (r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:async\s+)?(?:unsafe\s+)?fn\s+(?P<name>\w+)", "function"),
+        (r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:struct|enum|trait)\s+(?P<name>\w+)", "type"),
+    ],
+    ".java": [
+        (r"^\s*(?:(?:public|protected|private|abstract|final)\s+)*(?:class|interface|enum|record)\s+(?P<name>\w+)", "class"),
+        (r"^\s*(?:(?:public|protected|private|static|final|abstract|synchronized)\s+)+[\w<>\[\], ]+\s+(?P<name>\w+)\s*\(", "function"),
+    ],
+    ".c": [
+        (r"^(?!\s)(?:[\w\*]+\s+)+\**(?P<name>\w+)\s*\([^;]*$", "function"),
+        (r"^\s*(?:typedef\s+)?struct\s+(?P<name>\w+)", "type"),
+    ],
+    ".cpp": [
+        (r"^(?!\s)(?:[\w\*&:<>]+\s+)+[\*&]*(?P<name>[\w:]+)\s*\([^;]*$", "function"),
+        (r"^\s*(?:class|struct)\s+(?P<name>\w+)", "class"),
+    ],
+}
+SYMBOL_PATTERNS[".h"] = SYMBOL_PATTERNS[".c"]
+SYMBOL_PATTERNS[".hpp"] = SYMBOL_PATTERNS[".cpp"]
+
+# Larger blobs (bundles, generated code) are indexed without symbols
+MAX_INDEXED_BLOB_BYTES = 1024 * 1024
+
+# Last use of a blob is only refreshed this often, so runs over unchanged
+# files do not rewrite the index file
+SEEN_REFRESH_SECONDS = 24 * 3600
+
+_IDENTIFIER_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+# Identifiers too common to be worth looking up
+_COMMON_NAMES = frozenset({
+    "self", "cls", "this", "None", "True", "False", "null", "true", "false", "return", "def", "class",
+    "function", "const", "let", "var", "if", "else", "for", "while", "import", "from", "print", "len",
+    "str", "int", "dict", "list", "set", "new", "main", "init", "__init__", "get", "run",
+})
+
+
+class SymbolIndex:
+    """
+    Definitions and signatures of the symbols of a repository, keyed by blob SHA.
+
+    Only blobs that are not yet in the index are read and parsed on update,
+    so keeping the index current costs one `git ls-files -s` plus the
+    parsing of changed files. The index file is shared by all worktrees.
+    """
+
+    def __init__(self, index_path: str, extensions: Optional[Iterable[str]] = None):
+        """
+        Initialize the index.
+
+        Args:
+            index_path: Path of the JSON index file.
+            extensions: File extensions to index (optional, defaults to all
+                supported languages).
+        """
+        self.index_path = index_path
+        self.extensions = set(extensions) if extensions else set(SYMBOL_PATTERNS) | {".py"}
+        self.blobs: Dict[str, Dict[str, Any]] = {}
+        self.files: Dict[str, str] = {}
+        self._definitions: Optional[Dict[str, List[Tuple[str, Dict[str, Any]]]]] = None
+
+    def update(self, revision: Optional[str] = None) -> int:
+        """
+        Bring the index up to date with the staged files or a revision.
+
+        Args:
+            revision: Revision to index instead of the staged files (optional).
+
+        Returns:
+            Number of blobs parsed.
+        """
+        self.files = {
+            path: sha for path, sha in _list_blobs(revision).items()
+            if os.path.splitext(path)[1] in self.extensions
+        }
+        self._definitions = None
+
+        with FileLock(self.index_path + ".lock", timeout=30) as locked:
+            self.blobs = self._load()
+            missing = sorted({sha for sha in self.files.values() if sha not in self.blobs})
+            paths_by_sha = {sha: path for path, sha in self.files.items()}
+            now = time.time()
+            changed = False
+            for sha, content in _read_blobs(missing):
+                symbols = extract_symbols(paths_by_sha[sha], content) if len(content) <= MAX_INDEXED_BLOB_BYTES else []
+                self.blobs[sha] = {"symbols": symbols, "seen": now}
+                changed = True
+            for sha in set(self.files.values()):
+                if sha in self.blobs and self.blobs[sha].get("seen", 0) < now - SEEN_REFRESH_SECONDS:
+                    self.blobs[sha]["seen"] = now
+                    changed = True
+
+            # Forget blobs no worktree has used for a while
+            cutoff = now - SYMBOL_INDEX_RETENTION_DAYS * 24 * 3600
+            blob_count = len(self.blobs)
+            self.blobs = {sha: entry for sha, entry in self.blobs.items() if entry.get("seen", 0) >= cutoff}
+            changed = changed or len(self.blobs) != blob_count
+            if locked and changed:
+                self._save()
+        return len(missing)
+
+    def find_definitions(self, name: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Find the definitions of a symbol in the indexed files.
+
+        Args:
+            name: The symbol name.
+
+        Returns:
+            List of (file path, symbol) pairs.
+        """
+        if self._definitions is None:
+            self._definitions = {}
+            for path, sha in sorted(self.files.items()):
+                for symbol in self.blobs.get(sha, {}).get("symbols", []):
+                    self._definitions.setdefault(symbol["name"], []).append((path, symbol))
+        return self._definitions.get(name, [])
+
+    def build_related_section(self, file_path: str, diff: str, token_budget: int) -> str:
+        """
+        Build a prompt section with the signatures of symbols referenced in the
+        changed lines of a diff and defined in other files.
+
+        Args:
+            file_path: Path of the file under review.
+            diff: The git diff content for the file.
+            token_budget: Maximum number of tokens of the section.
+
+        Returns:
+            The prompt section, or an empty string if nothing relevant is found.
+        """
+        removed, added = get_changed_lines(diff)
+        counts: Dict[str, int] = {}
+        for line in removed + added:
+            for name in _IDENTIFIER_RE.findall(line):
+                if len(name) > 2 and name not in _COMMON_NAMES:
+                    counts[name] = counts.get(name, 0) + 1
+
+        header = "## Related Definitions (signatures from other files)"
+        lines: List[str] = []
+        used_tokens = estimate_tokens(header)
+        seen = set()
+        # Most referenced first, then alphabetically for stable prompts
+        for name in sorted(counts, key=lambda n: (-counts[n], n)):
+            for path, symbol in self.find_definitions(name):
+                if path == file_path or (path, symbol["line"]) in seen:
+                    continue
+                entry = f"- {path}:{symbol['line']}: {symbol['signature']}"
+                entry_tokens = estimate_tokens(entry) + 1
+                if used_tokens + entry_tokens > token_budget:
+                    break
+                seen.add((path, symbol["line"]))
+                lines.append(entry)
+                used_tokens += entry_tokens
+        if not lines:
+            return ""
+        return "\n".join([header] + lines)
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Read the index file.
+
+        Returns:
+            Dictionary mapping blob SHAs to their symbols.
+        """
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("version") != SYMBOL_INDEX_VERSION:
+            return {}
+        return data.get("blobs", {})
+
+    def _save(self) -> None:
+        """
+        Write the index file atomically.
+        """
+        try:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.index_path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"version": SYMBOL_INDEX_VERSION, "blobs": self.blobs}, f)
+            os.replace(temp_path, self.index_path)
+        except OSError as e:
+            logger.error(f"Error writing symbol index: {e}")
+
+
+def create_symbol_index(config: Dict[str, Any], revision: Optional[str] = None) -> Optional[SymbolIndex]:
+    """
+    Create and update the symbol index configured for the run.
+
+    Args:
+        config: Configuration dictionary.
+        revision: Revision to index instead of the staged files (optional).
+
+    Returns:
+        The updated index, or None if symbol context is disabled or unavailable.
+    """
+    if not config.get("symbol_context", DEFAULT_SYMBOL_CONTEXT):
+        return None
+    git_dir = get_git_common_dir()
+    if not git_dir:
+        return None
+    index = SymbolIndex(
+        os.path.join(git_dir, CACHE_DIR_NAME, "symbols.json"),
+        extensions=config.get("include_extensions"),
+    )
+    parsed = index.update(revision)
+    logger.debug(f"Symbol index: {len(index.files)} files, {parsed} parsed")
+    return index
+
+
+def extract_symbols(file_path: str, content: str) -> List[Dict[str, Any]]:
+    """
+    Extract the definitions of a file.
+
+    Args:
+        file_path: Path of the file, used to pick the language.
+        content: The file content.
+
+    Returns:
+        List of symbols with "name", "kind", "signature" and "line".
+    """
+    extension = os.path.splitext(file_path)[1]
+    if extension == ".py":
+        return extract_python_symbols(content)
+
+    symbols = []
+    patterns = [(re.compile(pattern), kind) for pattern, kind in SYMBOL_PATTERNS.get(extension, [])]
+    for line_number, line in enumerate(content.splitlines(), start=1):
+        for pattern, kind in patterns:
+            match = pattern.match(line)
+            if match:
+                name = match.group("name").split("::")[-1]
+                signature = line.split("{")[0].strip()
+                symbols.append({"name": name, "kind": kind, "signature": signature[:200], "line": line_number})
+                break
+    return symbols
+
+
+def extract_python_symbols(content: str) -> List[Dict[str, Any]]:
+    """
+    Extract the classes, functions and methods of Python source with `ast`.
+
+    Args:
+        content: Python source code.
+
+    Returns:
+        List of symbols with "name", "kind", "signature" and "line". Methods
+        are named after the method, with the class in the signature.
+    """
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError):
+        return []
+    lines = content.splitlines()
+
+    symbols: List[Dict[str, Any]] = []
+
+    def visit(nodes: List[ast.AST], owner: str = "") -> None:
+        for node in nodes:
+            if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                continue
+            # The header spans from the definition line to the line before the body
+            end = max(node.body[0].lineno - 1, node.lineno) if node.body else node.lineno
+            header = " ".join(line.strip() for line in lines[node.lineno - 1:end])
+            header = header.rstrip(":").strip() if header.endswith(":") else header.split(":")[0]
+            kind = "class" if isinstance(node, ast.ClassDef) else ("method" if owner else "function")
+            symbols.append({
+                "name": node.name,
+                "kind": kind,
+                "signature": (f"{owner}: " if owner else "") + header[:200],
+                "line": node.lineno,
+            })
+            if isinstance(node, ast.ClassDef):
+                visit(node.body, owner=node.name)
+
+    visit(tree.body)
+    return symbols
+
+
+def _list_blobs(revision: Optional[str] = None) -> Dict[str, str]:
+    """
+    List the blob SHA of every file in the index or a revision.
+
+    Args:
+        revision: Revision to list instead of the index (optional).
+
+    Returns:
+        Dictionary mapping file paths to blob SHAs.
+    """
+    if revision:
+        cmd = ["git", "ls-tree", "-r", "--full-tree", revision]
+    else:
+        cmd = ["git", "ls-files", "-s"]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    except subprocess.CalledProcessError as e:
+        logger.error(f"Error listing files for the symbol index: {e}")
+        return {}
+
+    blobs = {}
+    for line in result.stdout.splitlines():
+        info, _, path = line.partition("\t")
+        parts = info.split()
+        # ls-files -s: mode sha stage; ls-tree: mode type sha
+        sha = parts[2] if revision else parts[1]
+        if revision and parts[1] != "blob":
+            continue
+        blobs[path] = sha
+    return blobs
+
+
+def _read_blobs(shas: List[str]) -> Iterable[Tuple[str, str]]:
+    """
+    Read blobs from the object database with a single git process.
+
+    Args:
+        shas: The blob SHAs.
+
+    Yields:
+        Tuples of the SHA and the decoded content.
+    """
+    if not shas:
+        return
+    process = subprocess.Popen(
+        ["git", "cat-file", "--batch"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        for sha in shas:
+            process.stdin.write(f"{sha}\n".encode("ascii"))
+            process.stdin.flush()
+            header = process.stdout.readline().decode("ascii", errors="replace").split()
+            if len(header) < 3 or header[1] == "missing":
+                continue
+            content = process.stdout.read(int(header[2]))
+            process.stdout.read(1)  # Trailing newline
+            yield sha, content.decode("utf-8", errors="replace")
+    finally:
+        process.stdin.close()
+        process.stdout.close()
+        process.wait()
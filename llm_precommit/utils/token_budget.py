@@ -0,0 +1,219 @@
+"""
+Token budgets per run and per day.
+"""
+import logging
+import os
+import json
+import time
+import datetime
+import tempfile
+import threading
+from typing import Dict, Any, Optional
+
+from llm_precommit.constants import (
+    BUDGET_SKIP_REASON,
+    CACHE_DIR_NAME,
+    DEFAULT_RESPONSE_TOKEN_ESTIMATE,
+    USAGE_HISTORY_DAYS,
+)
+from llm_precommit.utils.file_lock import FileLock
+from llm_precommit.utils.git_utils import get_git_common_dir
+from llm_precommit.utils.token_utils import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBudget:
+    """
+    Token allowance of a run, shared by concurrent analyses.
+
+    Each analysis reserves its estimated cost before calling the LLM and
+    settles the reservation with the actual usage afterwards, so concurrent
+    analyses cannot overcommit the budget between them.
+    """
+
+    def __init__(self, limit: Optional[int] = None):
+        """
+        Initialize the budget.
+
+        Args:
+            limit: Maximum number of tokens for the run, or None for no limit.
+        """
+        self.limit = limit
+        self.used = 0
+        self.reserved = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: int) -> bool:
+        """
+        Reserve tokens for an analysis if they fit in the remaining budget.
+
+        Args:
+            tokens: Estimated tokens of the analysis.
+
+        Returns:
+            True if the tokens were reserved.
+        """
+        with self._lock:
+            if self.limit is not None and self.used + self.reserved + tokens > self.limit:
+                return False
+            self.reserved += tokens
+            return True
+
+    def settle(self, reserved: int, actual: int) -> None:
+        """
+        Replace a reservation with the tokens actually used.
+
+        Args:
+            reserved: Tokens reserved for the analysis.
+            actual: Tokens the analysis used.
+        """
+        with self._lock:
+            self.reserved -= reserved
+            self.used += actual
+
+
+class DailyUsageLedger:
+    """
+    Token totals per day, shared by all runs on the machine.
+
+    The ledger is a small JSON file updated under a file lock with atomic
+    writes. Only the last USAGE_HISTORY_DAYS days are kept.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the ledger.
+
+        Args:
+            path: Path of the JSON file.
+        """
+        self.path = path
+
+    def get_today(self) -> int:
+        """
+        Get the tokens used today.
+
+        Returns:
+            Total tokens recorded for the current local date.
+        """
+        return self._load().get(_today(), 0)
+
+    def add(self, tokens: int) -> None:
+        """
+        Add tokens to today's total.
+
+        Args:
+            tokens: Tokens used.
+        """
+        if tokens <= 0:
+            return
+        with FileLock(self.path + ".lock", timeout=10) as locked:
+            if not locked:
+                logger.warning("Warning: Could not lock the token usage ledger; usage not recorded")
+                return
+            days = self._load()
+            today = _today()
+            days[today] = days.get(today, 0) + tokens
+            cutoff = (datetime.date.today() - datetime.timedelta(days=USAGE_HISTORY_DAYS)).isoformat()
+            days = {day: total for day, total in days.items() if day > cutoff}
+            try:
+                fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump({"days": days, "updated": time.time()}, f, indent=2)
+                os.replace(temp_path, self.path)
+            except OSError as e:
+                logger.error(f"Error writing token usage ledger: {e}")
+
+    def _load(self) -> Dict[str, int]:
+        """
+        Read the daily totals.
+
+        Returns:
+            Dictionary mapping ISO dates to token totals.
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return dict(json.load(f).get("days", {}))
+        except (OSError, ValueError, AttributeError):
+            return {}
+
+
+def get_default_ledger_path() -> Optional[str]:
+    """
+    Get the default path of the daily usage ledger, shared by all worktrees.
+
+    Returns:
+        Path inside the common git directory, or None outside a git repository.
+    """
+    git_dir = get_git_common_dir()
+    if not git_dir:
+        return None
+    return os.path.join(git_dir, CACHE_DIR_NAME, "usage.json")
+
+
+def estimate_review_tokens(*prompt_parts: Optional[str]) -> int:
+    """
+    Estimate the tokens of one review before sending it.
+
+    Args:
+        *prompt_parts: The texts that make up the prompt.
+
+    Returns:
+        Estimated prompt tokens plus a typical response length.
+    """
+    return sum(estimate_tokens(part or "") for part in prompt_parts) + DEFAULT_RESPONSE_TOKEN_ESTIMATE
+
+
+def compute_cost(token_usage: Dict[str, Any], token_prices: Dict[str, Dict[str, float]]) -> Optional[float]:
+    """
+    Compute the cost of a run from its token usage.
+
+    Args:
+        token_usage: Token usage statistics with per-model totals.
+        token_prices: Prices in currency units per million tokens, by model,
+            with "input" and "output" keys.
+
+    Returns:
+        The cost, or None if no used model has a configured price.
+    """
+    cost = None
+    for model, usage in token_usage.get("by_model", {}).items():
+        prices = token_prices.get(model)
+        if not prices:
+            continue
+        cost = (cost or 0.0) + (
+            usage.get("prompt_tokens", 0) * prices.get("input", 0)
+            + usage.get("response_tokens", 0) * prices.get("output", 0)
+        ) / 1_000_000
+    return cost
+
+
+def make_budget_skip_result() -> Dict[str, Any]:
+    """
+    Build the synthetic analysis result for a file skipped for lack of budget.
+
+    Returns:
+        Analysis result with no findings.
+    """
+    return {
+        "issues": [],
+        "coding_convention_issues": [],
+        "security_concerns": [],
+        "summary": "Not reviewed: token budget exhausted",
+        "_meta": {
+            "skipped": True,
+            "skip_reason": BUDGET_SKIP_REASON,
+            "timestamp": time.time(),
+        },
+    }
+
+
+def _today() -> str:
+    """
+    Get the current local date.
+
+    Returns:
+        The date in ISO format.
+    """
+    return datetime.date.today().isoformat()
@@ -0,0 +1,21 @@
+"""
+Token estimation utilities.
+"""
+
+# Rough average for code and English text across common tokenizers
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a text without calling a tokenizer.
+
+    Args:
+        text: The text to measure.
+
+    Returns:
+        Estimated token count.
+    """
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
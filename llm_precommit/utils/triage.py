@@ -0,0 +1,338 @@
+"""
+Local triage of trivial changes that do not need an LLM review.
+"""
+import ast
+import os
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+from llm_precommit.constants import (
+    BLOCK_COMMENT_DELIMITERS,
+    COMMENT_PREFIXES,
+    IMPORT_PREFIXES,
+    INDENTATION_SENSITIVE_EXTENSIONS,
+    LINE_BREAK_SENSITIVE_EXTENSIONS,
+    LOCKFILE_NAMES,
+    TRIAGE_REASONS,
+)
+from llm_precommit.utils.diff_utils import get_changed_lines, parse_hunks
+from llm_precommit.utils.git_utils import get_file_content_at_revision
+
+
+def classify_trivial_change(
+    file_path: str,
+    diff: str,
+    rename_similarity: Optional[int] = None,
+    old_revision: str = "HEAD",
+    new_revision: str = "",
+) -> Optional[str]:
+    """
+    Classify a change that does not need an LLM review.
+
+    Diff-level heuristics are tried first. Python files are compared at the
+    AST level instead, since indentation is significant and comments and
+    docstrings cannot be told apart from code in a diff.
+
+    Args:
+        file_path: Path to the file.
+        diff: The git diff content for the file.
+        rename_similarity: Git similarity score if the file was renamed (optional).
+        old_revision: Revision holding the old version of the file.
+        new_revision: Revision holding the new version, or an empty string for
+            the staged version.
+
+    Returns:
+        A key of TRIAGE_REASONS, or None if the change needs a review.
+    """
+    if os.path.basename(file_path) in LOCKFILE_NAMES:
+        return "lockfile"
+
+    if rename_similarity == 100:
+        return "rename"
+
+    if file_path.endswith(".py"):
+        old_content = get_file_content_at_revision(file_path, old_revision)
+        new_content = get_file_content_at_revision(file_path, new_revision)
+        if old_content is None or new_content is None:
+            return None
+        return classify_python_change(old_content, new_content)
+
+    return classify_diff_change(file_path, diff)
+
+
+def classify_diff_change(file_path: str, diff: str) -> Optional[str]:
+    """
+    Classify a trivial change from its diff alone.
+
+    Args:
+        file_path: Path to the file.
+        diff: The git diff content for the file.
+
+    Returns:
+        A key of TRIAGE_REASONS, or None if the change needs a review.
+    """
+    removed, added = get_changed_lines(diff)
+    if not removed and not added:
+        return None
+
+    # Same tokens in the same order: reindent, re-wrap, trailing spaces. Lines
+    # with string literals may only change their indentation, since spaces
+    # inside the literals are part of the value
+    extension = os.path.splitext(file_path)[1]
+    if (
+        _split_tokens(removed, extension) == _split_tokens(added, extension)
+        and _quoted_lines(removed) == _quoted_lines(added)
+    ):
+        return "whitespace"
+
+    if _is_comment_change(file_path, diff):
+        return "comment"
+
+    stripped_removed = sorted(line.strip() for line in removed if line.strip())
+    stripped_added = sorted(line.strip() for line in added if line.strip())
+    if (
+        stripped_removed
+        and stripped_removed == stripped_added
+        and all(line.startswith(IMPORT_PREFIXES) for line in stripped_added)
+    ):
+        return "import-order"
+
+    return None
+
+
+def _split_tokens(lines: List[str], extension: str = "") -> List[Any]:
+    """Get the whitespace-separated tokens of lines, in order. Where line
+    breaks are significant the tokens are grouped by non-blank line, and where
+    indentation is significant the non-blank lines are kept whole."""
+    if extension in INDENTATION_SENSITIVE_EXTENSIONS:
+        return [line.rstrip() for line in lines if line.strip()]
+    if extension in LINE_BREAK_SENSITIVE_EXTENSIONS:
+        return [line.split() for line in lines if line.strip()]
+    return [token for line in lines for token in line.split()]
+
+
+def _quoted_lines(lines: List[str]) -> List[str]:
+    """Get the stripped lines that may contain string literals."""
+    return [line.strip() for line in lines if any(quote in line for quote in "\"'`")]
+
+
+def _scan_comment_line(
+    line: str,
+    in_block: bool,
+    line_prefixes: Tuple[str, ...],
+    block: Optional[Tuple[str, str]],
+) -> Tuple[bool, bool]:
+    """
+    Check whether a line holds only comments and whitespace.
+
+    Block comments are only opened at the start of a line, so that delimiters
+    in string literals or after code never turn the next lines into comments.
+
+    Args:
+        line: The source line.
+        in_block: Whether the line starts inside a block comment.
+        line_prefixes: Line comment prefixes of the language.
+        block: Opening and closing block comment delimiters, or None.
+
+    Returns:
+        Tuple of whether the line is comment-only, and whether the next line
+        starts inside a block comment.
+    """
+    rest = line
+    while True:
+        if in_block:
+            end = rest.find(block[1])
+            if end < 0:
+                return True, True
+            rest, in_block = rest[end + len(block[1]):], False
+        rest = rest.strip()
+        if not rest or rest.startswith(line_prefixes):
+            return True, False
+        if block and rest.startswith(block[0]):
+            rest, in_block = rest[len(block[0]):], True
+            continue
+        return False, False
+
+
+def _is_comment_change(file_path: str, diff: str) -> bool:
+    """
+    Check whether every changed line of a diff is a comment.
+
+    Each hunk is scanned on its old and new side to follow block comments.
+    Lines before the start of a hunk are unknown, so changes in the middle
+    of a block comment that opens outside the hunk are not recognized.
+
+    Args:
+        file_path: Path to the file.
+        diff: The git diff content for the file.
+
+    Returns:
+        True if only comments changed and no code was commented out or in.
+    """
+    extension = os.path.splitext(file_path)[1]
+    if extension not in COMMENT_PREFIXES:
+        return False
+    line_prefixes = COMMENT_PREFIXES[extension]
+    block = BLOCK_COMMENT_DELIMITERS.get(extension)
+
+    _, hunks = parse_hunks(diff)
+    if not hunks:
+        return False
+    for hunk in hunks:
+        old_in_block = new_in_block = False
+        for line in hunk["lines"]:
+            marker, text = line[:1], line[1:]
+            if marker == "\\":
+                # "\ No newline at end of file"
+                continue
+            old_comment = new_comment = True
+            if marker != "+":
+                old_comment, old_in_block = _scan_comment_line(text, old_in_block, line_prefixes, block)
+            if marker != "-":
+                new_comment, new_in_block = _scan_comment_line(text, new_in_block, line_prefixes, block)
+            if marker in ("+", "-"):
+                if not (old_comment and new_comment):
+                    return False
+            elif old_comment != new_comment:
+                # Unchanged code turned into a comment, or the reverse
+                return False
+    return True
+
+
+def classify_python_change(old_content: str, new_content: str) -> Optional[str]:
+    """
+    Classify a trivial Python change by comparing the old and new ASTs.
+
+    Args:
+        old_content: The file content before the change.
+        new_content: The file content after the change.
+
+    Returns:
+        A key of TRIAGE_REASONS, or None if the change needs a review.
+    """
+    try:
+        old_tree = ast.parse(old_content)
+        new_tree = ast.parse(new_content)
+    except (SyntaxError, ValueError):
+        # Files that do not parse always need a review
+        return None
+
+    # The AST drops comments and formatting
+    if ast.dump(old_tree) == ast.dump(new_tree):
+        return "whitespace" if _strip_comments(old_content) == _strip_comments(new_content) else "comment"
+
+    _strip_docstrings(old_tree)
+    _strip_docstrings(new_tree)
+    if ast.dump(old_tree) == ast.dump(new_tree):
+        return "docstring"
+
+    _sort_imports(old_tree)
+    _sort_imports(new_tree)
+    if ast.dump(old_tree) == ast.dump(new_tree):
+        return "import-order"
+
+    return None
+
+
+def make_triage_result(reason: str) -> Dict[str, Any]:
+    """
+    Build the synthetic analysis result for a change skipped by triage.
+
+    Args:
+        reason: A key of TRIAGE_REASONS.
+
+    Returns:
+        Analysis result with no findings.
+    """
+    return {
+        "issues": [],
+        "coding_convention_issues": [],
+        "security_concerns": [],
+        "summary": f"No review needed: {TRIAGE_REASONS.get(reason, reason)}",
+        "_meta": {
+            "skipped": True,
+            "skip_reason": reason,
+            "timestamp": time.time(),
+        },
+    }
+
+
+def _strip_comments(content: str) -> List[str]:
+    """
+    Get the non-blank lines of Python source with whitespace and comments removed.
+
+    This is only a coarse check used to tell whitespace edits from comment
+    edits once the ASTs are known to be equal.
+
+    Args:
+        content: Python source code.
+
+    Returns:
+        List of normalized lines.
+    """
+    lines = []
+    for line in content.splitlines():
+        line = line.strip()
+        if line.startswith("#"):
+            continue
+        line = "".join(line.split())
+        if line:
+            lines.append(line)
+    return lines
+
+
+def _is_docstring(node: ast.AST) -> bool:
+    """
+    Check if a statement is a string literal expression.
+
+    Args:
+        node: The AST statement.
+
+    Returns:
+        True if the statement is a docstring.
+    """
+    if not isinstance(node, ast.Expr):
+        return False
+    value = node.value
+    if isinstance(value, ast.Constant):
+        return isinstance(value.value, str)
+    return isinstance(value, getattr(ast, "Str", ()))
+
+
+def _strip_docstrings(tree: ast.AST) -> None:
+    """
+    Remove docstrings from modules, classes and functions in place.
+
+    Args:
+        tree: The AST to modify.
+    """
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            if node.body and _is_docstring(node.body[0]):
+                node.body = node.body[1:] or [ast.Pass()]
+
+
+def _sort_imports(tree: ast.AST) -> None:
+    """
+    Sort runs of consecutive import statements, and the names they import, in place.
+
+    Args:
+        tree: The AST to modify.
+    """
+    for node in ast.walk(tree):
+        body = getattr(node, "body", None)
+        if not isinstance(body, list):
+            continue
+
+        sorted_body: List[ast.AST] = []
+        run: List[Tuple[str, ast.AST]] = []
+        for stmt in body + [None]:
+            if isinstance(stmt, (ast.Import, ast.ImportFrom)):
+                stmt.names = sorted(stmt.names, key=lambda alias: (alias.name, alias.asname or ""))
+                run.append((ast.dump(stmt), stmt))
+                continue
+            sorted_body.extend(s for _, s in sorted(run, key=lambda item: item[0]))
+            run = []
+            if stmt is not None:
+                sorted_body.append(stmt)
+        node.body = sorted_body
@@ -0,0 +1,104 @@
+"""
+Two-phase review: a cheap screening pass flags suspicious hunks across many
+files, and only those hunks get the full review.
+"""
+import time
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+from llm_precommit.utils.diff_utils import parse_hunks, build_diff
+
+# A hunk to screen: its id, the file path and the hunk text
+ScreenedHunk = Tuple[str, str, str]
+
+
+def label_hunks(file_index: int, file_path: str, diff: str) -> List[ScreenedHunk]:
+    """
+    Give each hunk of a file's diff an id for the screening prompt.
+
+    Args:
+        file_index: Position of the file in the screening batch.
+        file_path: Path of the file.
+        diff: The git diff content for the file.
+
+    Returns:
+        The labeled hunks, in file order. Ids are "f<file>h<hunk>".
+    """
+    _, hunks = parse_hunks(diff)
+    return [
+        (f"f{file_index}h{i}", file_path, "\n".join([hunk["header"], *hunk["lines"]]))
+        for i, hunk in enumerate(hunks)
+    ]
+
+
+def build_screening_prompt(hunks: List[ScreenedHunk]) -> str:
+    """
+    Build the screening prompt listing the labeled hunks.
+
+    Args:
+        hunks: The labeled hunks of all files in the batch.
+
+    Returns:
+        The prompt text.
+    """
+    sections = ["## Hunks to Screen"]
+    for hunk_id, file_path, text in hunks:
+        sections.append(f"### Hunk {hunk_id} ({file_path})\n```\n{text}\n```")
+    return "\n\n".join(sections) + "\n"
+
+
+def parse_flagged_hunks(result: Dict[str, Any]) -> Optional[Set[str]]:
+    """
+    Get the ids of the hunks flagged by the screening pass.
+
+    Args:
+        result: The parsed screening response.
+
+    Returns:
+        The flagged ids, or None if the screening failed and every hunk should
+        be reviewed.
+    """
+    if "parsing_error" in result:
+        return None
+    suspicious = result.get("suspicious")
+    if not isinstance(suspicious, list):
+        return None
+    return {str(hunk_id).strip() for hunk_id in suspicious}
+
+
+def keep_hunks(diff: str, indexes: Set[int]) -> str:
+    """
+    Reduce a diff to some of its hunks, keeping the original hunk headers so
+    line numbers still refer to the real file.
+
+    Args:
+        diff: The git diff content for one file.
+        indexes: Positions of the hunks to keep.
+
+    Returns:
+        The reduced diff.
+    """
+    header, hunks = parse_hunks(diff)
+    return build_diff(header, [hunk for i, hunk in enumerate(hunks) if i in indexes])
+
+
+def make_cleared_result(phase_meta: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the analysis result of a file none of whose hunks were flagged.
+
+    Args:
+        phase_meta: Timings and hunk counts of the two phases.
+
+    Returns:
+        Analysis result with no findings.
+    """
+    return {
+        "issues": [],
+        "coding_convention_issues": [],
+        "security_concerns": [],
+        "summary": "No suspicious changes found by screening",
+        "_meta": {
+            "analysis_time_seconds": 0.0,
+            "timestamp": time.time(),
+            "two_phase": phase_meta,
+        },
+    }
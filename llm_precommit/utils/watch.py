@@ -0,0 +1,77 @@
+"""
+Detection of newly staged changes for the background pre-review.
+"""
+import os
+import time
+from typing import Callable, Optional, Tuple
+
+from llm_precommit.constants import DEFAULT_WATCH_DEBOUNCE_SECONDS
+
+
+class IndexWatcher:
+    """
+    Watch the git index for staged changes that have not been reviewed yet.
+
+    The index is rewritten by every `git add`, so its modification time and
+    size identify a staging state. A new state is reported once it has been
+    stable for the debounce interval and git no longer holds the index lock,
+    so a burst of `git add` commands results in a single review.
+    """
+
+    def __init__(
+        self,
+        index_path: str,
+        debounce_seconds: float = DEFAULT_WATCH_DEBOUNCE_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize the watcher.
+
+        Args:
+            index_path: Path of the git index file.
+            debounce_seconds: Time the index must stay unchanged before it is
+                reported.
+            clock: Monotonic time source (for tests).
+        """
+        self.index_path = index_path
+        self.debounce_seconds = debounce_seconds
+        self._clock = clock
+        self._reviewed: Optional[Tuple[int, int]] = None
+        self._pending: Optional[Tuple[int, int]] = None
+        self._pending_since = 0.0
+
+    def poll(self) -> bool:
+        """
+        Check whether the index holds staged content that is ready for review.
+
+        Returns:
+            True if the index changed since the last review and has settled.
+        """
+        if os.path.exists(self.index_path + ".lock"):
+            return False
+        state = self._get_state()
+        if state is None or state == self._reviewed:
+            return False
+        now = self._clock()
+        if state != self._pending:
+            self._pending, self._pending_since = state, now
+            return False
+        return now - self._pending_since >= self.debounce_seconds
+
+    def mark_reviewed(self) -> None:
+        """Record the state reported by the last successful poll as reviewed."""
+        self._reviewed = self._pending
+
+    def _get_state(self) -> Optional[Tuple[int, int]]:
+        """
+        Get the identity of the current index state.
+
+        Returns:
+            Modification time in nanoseconds and size of the index, or None
+            if there is no index yet.
+        """
+        try:
+            stat = os.stat(self.index_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
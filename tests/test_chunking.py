@@ -0,0 +1,75 @@
+"""
+Tests for chunked review of large diffs.
+"""
+import unittest
+
+from llm_precommit.utils.chunking import (
+    split_diff_into_chunks,
+    merge_chunk_results,
+    analyze_in_chunks,
+)
+from llm_precommit.utils.diff_utils import parse_hunks
+
+
+HEADER = "diff --git a/big.py b/big.py\n--- a/big.py\n+++ b/big.py\n"
+
+
+def make_hunk(start, count):
+    """Build a hunk adding `count` lines at `start`."""
+    body = "".join(f"+value_{start + i} = compute({start + i})\n" for i in range(count))
+    return f"@@ -{start},0 +{start},{count} @@\n" + body
+
+
+class TestChunking(unittest.TestCase):
+    """Tests for splitting diffs and merging chunk results."""
+
+    def test_split_groups_hunks_within_budget(self):
+        """Test that hunks are grouped and oversized hunks are split."""
+        diff = HEADER + make_hunk(10, 5) + make_hunk(100, 5) + make_hunk(500, 200)
+        chunks = split_diff_into_chunks(diff, token_budget=200)
+
+        self.assertGreater(len(chunks), 2)
+        for chunk in chunks:
+            self.assertTrue(chunk.startswith(HEADER))
+
+        # The new-side ranges of all chunks cover the original hunks
+        covered = set()
+        for chunk in chunks:
+            for hunk in parse_hunks(chunk)[1]:
+                covered.update(range(hunk["new_start"], hunk["new_start"] + hunk["new_count"]))
+        self.assertEqual(covered, set(range(10, 15)) | set(range(100, 105)) | set(range(500, 700)))
+
+    def test_merge_keeps_lines_and_collapses_duplicates(self):
+        """Test that line numbers are kept and duplicates collapsed."""
+        chunks = [HEADER + make_hunk(10, 5), HEADER + make_hunk(100, 5)]
+        results = [
+            {"issues": [{"severity": "low", "description": "Magic number", "line_number": "12"}]},
+            {"issues": [{"severity": "low", "description": "magic number.", "line_number": "101"}]},
+            # Lines outside the chunk's hunks are file lines of nearby code, not positions in the chunk
+            {"issues": [{"severity": "high", "description": "Bug", "line_number": "6"}]},
+        ]
+        merged = merge_chunk_results(results, chunks + [HEADER + make_hunk(200, 5)])
+
+        self.assertEqual(len(merged["issues"]), 2)
+        self.assertEqual(merged["issues"][0]["line_number"], "12, 101")
+        self.assertEqual(merged["issues"][1]["line_number"], "6")
+        self.assertEqual(merged["_meta"], {"chunks": 3, "failed_chunks": 0})
+        self.assertNotIn("error", merged)
+
+    def test_analyze_in_chunks_reports_failures(self):
+        """Test that failed chunks are counted and do not hide other results."""
+        diff = HEADER + make_hunk(10, 50) + make_hunk(500, 50)
+
+        def analyze(chunk):
+            if "@@ -500" in chunk:
+                raise RuntimeError("quota")
+            return {"issues": [{"severity": "high", "description": "Bug", "line_number": 11}]}
+
+        merged = analyze_in_chunks(analyze, diff, token_budget=600, max_workers=2)
+        self.assertEqual(merged["issues"][0]["line_number"], 11)
+        self.assertEqual(merged["_meta"]["failed_chunks"], 1)
+        self.assertEqual(merged["error"], "1 of 2 chunks could not be reviewed: quota")
+
+
+if __name__ == "__main__":
+    unittest.main()
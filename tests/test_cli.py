@@ -0,0 +1,52 @@
+"""
+Tests for the command line interface.
+"""
+import io
+import os
+import sys
+import tempfile
+import contextlib
+import unittest
+from unittest import mock
+
+from llm_precommit import cli
+from llm_precommit.utils.logging_utils import shutdown_logging
+
+
+class TestCli(unittest.TestCase):
+    """Tests for the diagnostics of the CLI commands."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.config_path = os.path.join(self.temp_dir.name, ".llm-precommit.yml")
+
+    def tearDown(self):
+        shutdown_logging()
+        self.temp_dir.cleanup()
+
+    def run_cli(self, *args: str):
+        output = io.StringIO()
+        with mock.patch.object(sys, "argv", ["llm-precommit", *args]), contextlib.redirect_stdout(output):
+            exit_code = cli.main()
+        return exit_code, output.getvalue()
+
+    def test_config_messages_are_logged(self):
+        """Test that the config command reports through logging."""
+        with self.assertLogs("llm_precommit", "INFO") as logs:
+            exit_code, output = self.run_cli("config", "--output", self.config_path)
+        self.assertEqual(exit_code, 0)
+        self.assertIn(f"Created default configuration file at {self.config_path}", logs.output[0])
+
+        with self.assertLogs("llm_precommit.cli", "ERROR") as logs:
+            exit_code, output = self.run_cli("config", "--output", self.config_path)
+        self.assertEqual(exit_code, 1)
+        self.assertIn("Use --force to overwrite.", logs.output[-1])
+
+    def test_diagnostics_are_displayed(self):
+        """Test that the logging set up by the CLI displays its diagnostics."""
+        exit_code, output = self.run_cli()
+        self.assertEqual(exit_code, 1)
+        self.assertEqual(output, "Please specify a command: install, uninstall, config, run, merge, or watch\n")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+"""
+Tests for adaptive concurrency control of LLM calls.
+"""
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from llm_precommit.utils.concurrency import (
+    AdaptiveConcurrencyController,
+    create_concurrency_controller,
+    is_overload_error,
+)
+from llm_precommit.utils.llm_client import BaseLLMClient, LLMOverloadError
+
+
+class FlakyClient(BaseLLMClient):
+    """Client failing with overload errors a given number of times."""
+
+    def __init__(self, failures, **kwargs):
+        super().__init__(api_key="key", **kwargs)
+        self.failures = failures
+        self.calls = 0
+
+    def _call_llm(self, prompt, model_name=None, system_instruction=None, response_schema=None):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise LLMOverloadError("429 Resource has been exhausted")
+        return {"issues": []}
+
+
+class TestConcurrency(unittest.TestCase):
+    """Tests for AdaptiveConcurrencyController and client retries."""
+
+    def test_additive_increase_up_to_max(self):
+        """Test that stable latencies raise the limit by about one per round."""
+        controller = AdaptiveConcurrencyController(initial_limit=1, max_limit=3)
+        for _ in range(20):
+            controller.acquire()
+            controller.release(latency=1.0)
+
+        stats = controller.get_stats()
+        self.assertEqual(stats["final_limit"], 3)
+        self.assertEqual([e["limit"] for e in stats["timeline"]], [1, 2, 3])
+
+    def test_multiplicative_decrease_on_overload(self):
+        """Test that overloads halve the limit, once per latency window."""
+        controller = AdaptiveConcurrencyController(initial_limit=8, max_limit=8)
+        controller.acquire()
+        controller.release(latency=10.0)
+        controller.acquire()
+        controller.acquire()
+        controller.release(overloaded=True)
+        controller.release(overloaded=True)
+
+        stats = controller.get_stats()
+        self.assertEqual(stats["final_limit"], 4)
+        self.assertEqual(stats["overloads"], 2)
+        self.assertEqual(stats["timeline"][-1]["reason"], "overload")
+
+    def test_latency_spike_decreases_limit(self):
+        """Test that a call much slower than the baseline backs off."""
+        controller = AdaptiveConcurrencyController(initial_limit=4, max_limit=4, latency_spike_factor=3.0)
+        controller.acquire()
+        controller.release(latency=0.0)
+        controller.acquire()
+        controller.release(latency=5.0)
+
+        self.assertEqual(controller.get_stats()["final_limit"], 2)
+        self.assertEqual(controller.get_stats()["latency_spikes"], 1)
+
+    def test_latency_baseline_per_class(self):
+        """Test that slow calls of a larger class are not spikes of small calls."""
+        controller = AdaptiveConcurrencyController(initial_limit=4, max_limit=4, latency_spike_factor=3.0)
+        for latency, latency_class in [(0.3, "screening"), (0.3, "screening"), (6.0, "review"), (0.4, "screening"),
+                                       (5.0, "review"), (0.3, "screening")]:
+            controller.acquire()
+            controller.release(latency=latency, latency_class=latency_class)
+        self.assertEqual(controller.get_stats()["latency_spikes"], 0)
+        self.assertEqual(controller.get_stats()["final_limit"], 4)
+
+        controller.acquire()
+        controller.release(latency=30.0, latency_class="review")
+        self.assertEqual(controller.get_stats()["latency_spikes"], 1)
+
+    def test_limit_bounds_calls_in_flight(self):
+        """Test that no more calls than the limit run at once."""
+        controller = create_concurrency_controller({"adaptive_concurrency": False, "max_concurrent_analyses": 2})
+        in_flight = []
+        peak = []
+        lock = threading.Lock()
+
+        def call():
+            controller.acquire()
+            with lock:
+                in_flight.append(1)
+                peak.append(len(in_flight))
+            time.sleep(0.02)
+            with lock:
+                in_flight.pop()
+            controller.release(latency=0.02)
+
+        threads = [threading.Thread(target=call) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(max(peak), 2)
+
+    def test_is_overload_error(self):
+        """Test classification of provider errors."""
+        self.assertTrue(is_overload_error(Exception("429 Too Many Requests")))
+        self.assertTrue(is_overload_error(Exception("503 The model is overloaded")))
+        self.assertFalse(is_overload_error(ValueError("invalid JSON")))
+
+    @patch("llm_precommit.utils.llm_client.time.sleep")
+    def test_client_retries_overloaded_calls(self, mock_sleep):
+        """Test that overloaded calls are retried and reported to the controller."""
+        controller = AdaptiveConcurrencyController(initial_limit=2, max_limit=2)
+        client = FlakyClient(failures=2, concurrency_controller=controller, max_retries=3)
+
+        self.assertEqual(client.analyze_code_changes("diff", "a.py"), {"issues": []})
+        self.assertEqual(client.calls, 3)
+        self.assertEqual(mock_sleep.call_count, 2)
+        self.assertEqual(client.get_run_stats()["concurrency"]["overloads"], 2)
+
+        client = FlakyClient(failures=5, max_retries=1)
+        result = client.analyze_code_changes("diff", "a.py")
+        self.assertIn("parsing_error", result)
+        self.assertEqual(client.calls, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -8,7 +8,12 @@ from unittest.mock import patch
 
 import yaml
 
-from llm_precommit.utils.config import load_config, should_analyze_file, create_default_config_file
+from llm_precommit.utils.config import (
+    compile_exclude_patterns,
+    create_default_config_file,
+    load_config,
+    should_analyze_file,
+)
 from llm_precommit.constants import DEFAULT_API_KEY_ENV_VAR, DEFAULT_INCLUDE_EXTENSIONS, DEFAULT_EXCLUDE_PATTERNS
 
 
@@ -48,6 +53,17 @@ class TestConfig(unittest.TestCase):
         finally:
             os.unlink(temp_path)
 
+    def test_exclude_patterns(self):
+        """Test that glob patterns match as globs and other patterns as substrings."""
+        exclude = compile_exclude_patterns(("node_modules/", "test_*", "*.min.js"))
+        self.assertTrue(exclude.match("web/node_modules/lib/index.js"))
+        self.assertTrue(exclude.match("test_file.py"))
+        self.assertTrue(exclude.match("src/test_file.py"))
+        self.assertTrue(exclude.match("static/app.min.js"))
+        self.assertFalse(exclude.match("src/contest.py"))
+        self.assertFalse(exclude.match("static/app.js"))
+        self.assertFalse(compile_exclude_patterns(()).match("app.py"))
+
     def test_should_analyze_file(self):
         """Test file filtering for analysis."""
         config = {
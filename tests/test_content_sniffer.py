@@ -0,0 +1,57 @@
+"""
+Tests for content sniffing.
+"""
+import os
+import tempfile
+import unittest
+
+from llm_precommit.utils.content_sniffer import sniff_content, get_linguist_attribute
+
+
+class TestContentSniffer(unittest.TestCase):
+    """Tests for binary, minified and generated file detection."""
+
+    def test_sniff_content(self):
+        """Test classification of content samples."""
+        self.assertIsNone(sniff_content(b"def f():\n    return 1\n" * 100, {}))
+        self.assertEqual(sniff_content(b"abc\0def", {}), "binary")
+        self.assertEqual(sniff_content(b"var a=1;" * 500, {}), "minified")
+        self.assertEqual(
+            sniff_content(b"# Generated by the protocol buffer compiler.  DO NOT EDIT!\nimport x\n", {}),
+            "generated",
+        )
+        self.assertEqual(sniff_content(bytes(range(256)) * 8, {}), "binary")
+
+    def test_generated_headers(self):
+        """Test that only established generated-file headers in comments match."""
+        for header in (
+            b"// Code generated by protoc-gen-go. DO NOT EDIT.\n",
+            b"/*\n * @generated by codegen\n */\n",
+            b"# @generated\n",
+        ):
+            self.assertEqual(sniff_content(header + b"package x\n", {}), "generated", header)
+        for text in (
+            b'"""Registry of handlers.\n\nDo not edit this list without updating the docs.\n"""\n',
+            b"# Autogenerated IDs are assigned by the database\nx = 1\n",
+            b"MARKER = '@generated'\n",
+            b"// Code generated by the build goes to gen/; do not edit it by hand.\n",
+        ):
+            self.assertIsNone(sniff_content(text, {}), text)
+
+    def test_linguist_attributes(self):
+        """Test .gitattributes linguist-generated and linguist-vendored parsing."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, ".gitattributes")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("*.pb.go linguist-generated=true\n")
+                f.write("third_party/** linguist-vendored\n")
+                f.write("third_party/ours/** -linguist-vendored\n")
+
+            self.assertEqual(get_linguist_attribute("api/v1/service.pb.go", path), "linguist-generated")
+            self.assertEqual(get_linguist_attribute("third_party/lib/a.js", path), "linguist-vendored")
+            self.assertIsNone(get_linguist_attribute("third_party/ours/a.js", path))
+            self.assertIsNone(get_linguist_attribute("src/main.go", path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+"""
+Tests for diff parsing and normalization.
+"""
+import unittest
+
+from llm_precommit.utils.diff_utils import (
+    collapse_moved_blocks,
+    get_hunk_starts,
+    get_new_line_numbers,
+    shift_line_number,
+)
+from llm_precommit.utils.git_utils import get_diff_args
+
+MOVED_DIFF = """diff --git a/m.py b/m.py
+--- a/m.py
++++ b/m.py
+@@ -1,3 +1,8 @@
++def helper():
++    first = 1
++    second = 2
++    return first + second
++
+ def main():
+     run()
+     stop()
+@@ -10,6 +15,2 @@ def main():
+ 
+-def helper():
+-        first = 1
+-        second = 2
+-        return first + second
+-
+ # end
+"""
+
+
+class TestDiffUtils(unittest.TestCase):
+    """Tests for diff normalization."""
+
+    def test_collapse_moved_blocks(self):
+        """Test that moved blocks become markers and line numbers are kept."""
+        collapsed = collapse_moved_blocks(MOVED_DIFF)
+
+        self.assertNotIn("+def helper():", collapsed)
+        self.assertNotIn("-def helper():", collapsed)
+        self.assertIn("\\ [moved] 5 lines moved here from old line 11", collapsed)
+        self.assertIn("\\ [moved] 5 lines moved to line 1", collapsed)
+
+        numbered = dict(zip(collapsed.splitlines(), get_new_line_numbers(collapsed)))
+        self.assertEqual(numbered[" def main():"], 6)
+        self.assertEqual(numbered[" # end"], 16)
+
+    def test_small_and_in_place_changes_are_kept(self):
+        """Test that short blocks and in-place rewrites are not collapsed."""
+        self.assertEqual(collapse_moved_blocks(MOVED_DIFF, min_lines=5), MOVED_DIFF)
+        in_place = (
+            "diff --git a/x.py b/x.py\n--- a/x.py\n+++ b/x.py\n@@ -1,3 +1,3 @@\n"
+            "-a = 1\n-b = 2\n-c = 3\n+  a = 1\n+  b = 2\n+  c = 3\n"
+        )
+        self.assertEqual(collapse_moved_blocks(in_place), in_place)
+
+    def test_moved_blocks_keep_indentation(self):
+        """Test that re-indented blocks are not collapsed where indentation is significant."""
+        self.assertEqual(collapse_moved_blocks(MOVED_DIFF, extension=".py"), MOVED_DIFF)
+
+        # Blocks moved with their indentation are still collapsed
+        moved_as_is = MOVED_DIFF.replace("-        ", "-    ")
+        collapsed = collapse_moved_blocks(moved_as_is, extension=".py")
+        self.assertIn("\\ [moved] 5 lines moved here from old line 11", collapsed)
+
+    def test_shift_line_number(self):
+        """Test that line numbers move with the offset of their hunk."""
+        self.assertEqual(get_hunk_starts(MOVED_DIFF), [1, 15])
+        self.assertEqual(shift_line_number(3, [1, 15], [4, 20]), 6)
+        self.assertEqual(shift_line_number("16-17", [1, 15], [4, 20]), "21-22")
+        self.assertEqual(shift_line_number("8", [10], [2]), "1")
+        self.assertEqual(shift_line_number("3", [1, 15], [4]), "3")
+
+    def test_get_diff_args(self):
+        """Test the git diff arguments built from diff options."""
+        self.assertEqual(
+            get_diff_args({"context_lines": 1, "algorithm": "patience", "ignore_whitespace_changes": True}),
+            ["--unified=1", "--diff-algorithm=patience", "--ignore-space-change", "--find-renames=50%"],
+        )
+        self.assertEqual(get_diff_args({"algorithm": "bogus", "find_renames": None}), ["--unified=3"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+"""
+Tests for the Gemini client, against a stand-in for the google.generativeai module.
+"""
+import contextlib
+import io
+import json
+import unittest
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+from unittest.mock import patch
+
+from llm_precommit.constants import SYSTEM_INSTRUCTIONS
+from llm_precommit.utils import gemini_client
+from llm_precommit.utils.gemini_client import GeminiClient
+from llm_precommit.utils.output_utils import print_summary
+from llm_precommit.utils.result_sink import ResultSink
+
+RESPONSE = json.dumps({"issues": [], "summary": "ok"})
+
+
+class FakeGenAI:
+    """Stand-in for google.generativeai recording the calls made to it."""
+
+    def __init__(self, caching: bool = True, caching_error: bool = False, system_instruction: bool = True):
+        self.cached_contents: List[Dict[str, Any]] = []
+        self.models: List[Dict[str, Any]] = []
+        self.prompts: List[str] = []
+        self.caching_error = caching_error
+        self.system_instruction = system_instruction
+        if caching:
+            self.caching = SimpleNamespace(CachedContent=SimpleNamespace(create=self._create_cached_content))
+        self.GenerativeModel = self._model_class()
+
+    def configure(self, api_key: str) -> None:
+        pass
+
+    def _create_cached_content(self, model: str, system_instruction: str, ttl: Any) -> Any:
+        if self.caching_error:
+            raise RuntimeError("400 Cached content is too small")
+        cached_content = {"model": model, "system_instruction": system_instruction, "deleted": False}
+        self.cached_contents.append(cached_content)
+        return SimpleNamespace(info=cached_content, delete=lambda: cached_content.update(deleted=True))
+
+    def _model_class(self) -> type:
+        genai = self
+
+        class GenerativeModel:
+            def __init__(self, model_name: str, system_instruction: Optional[str] = None, cached_content=None):
+                if system_instruction and not genai.system_instruction:
+                    raise TypeError("unexpected keyword argument 'system_instruction'")
+                self.cached_content = cached_content
+                self.info = {
+                    "model": model_name, "system_instruction": system_instruction, "cached": bool(cached_content)
+                }
+                genai.models.append(self.info)
+
+            @classmethod
+            def from_cached_content(cls, cached_content: Any) -> "GenerativeModel":
+                return cls(cached_content.info["model"], cached_content=cached_content)
+
+            def generate_content(self, prompt: str, generation_config: Any = None) -> Any:
+                genai.prompts.append(prompt)
+                usage = SimpleNamespace(
+                    prompt_token_count=500,
+                    candidates_token_count=20,
+                    cached_content_token_count=400 if self.cached_content else 0,
+                )
+                return SimpleNamespace(text=RESPONSE, usage_metadata=usage)
+
+        return GenerativeModel
+
+
+class TestGeminiClient(unittest.TestCase):
+    """Tests for GeminiClient."""
+
+    def make_client(self, genai: FakeGenAI, **kwargs: Any) -> GeminiClient:
+        patcher = patch.object(gemini_client, "genai", genai)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return GeminiClient(api_key="test-key", model_name="gemini-test", max_retries=0, **kwargs)
+
+    def test_system_instruction_sent_apart(self):
+        """Test that only the per-file part of the prompt is sent with each call."""
+        genai = FakeGenAI()
+        client = self.make_client(genai)
+
+        result = client.analyze_code_changes("+x = 1", "a.py")
+        self.assertEqual(result["summary"], "ok")
+        self.assertEqual(genai.cached_contents[0]["system_instruction"], SYSTEM_INSTRUCTIONS["full"])
+        self.assertIn("a.py", genai.prompts[0])
+        self.assertIn("+x = 1", genai.prompts[0])
+        self.assertNotIn(SYSTEM_INSTRUCTIONS["full"], genai.prompts[0])
+
+    def test_cached_content_reused_per_model(self):
+        """Test that cached content is created once per model and reused across files."""
+        genai = FakeGenAI()
+        client = self.make_client(genai)
+
+        client.analyze_code_changes("+x = 1", "a.py")
+        client.analyze_code_changes("+y = 2", "b.py")
+        client.analyze_code_changes("+z = 3", "c.py", model_name="gemini-large")
+        self.assertEqual(
+            [cached_content["model"] for cached_content in genai.cached_contents],
+            ["models/gemini-test", "models/gemini-large"],
+        )
+        self.assertEqual(len(genai.models), 2)
+        self.assertTrue(all(model["cached"] for model in genai.models))
+
+    def test_fallback_to_system_instruction(self):
+        """Test that the system instruction is sent with each call when it cannot be cached."""
+        for genai in (FakeGenAI(caching_error=True), FakeGenAI(caching=False)):
+            client = self.make_client(genai)
+
+            client.analyze_code_changes("+x = 1", "a.py")
+            self.assertEqual(genai.cached_contents, [])
+            self.assertEqual(genai.models[0]["system_instruction"], SYSTEM_INSTRUCTIONS["full"])
+            self.assertNotIn(SYSTEM_INSTRUCTIONS["full"], genai.prompts[0])
+            self.assertEqual(client.get_run_stats()["prompt_cache"]["cached_calls"], 0)
+
+    def test_fallback_to_inlined_prompt(self):
+        """Test that the system instruction is inlined for SDKs without system instructions."""
+        genai = FakeGenAI(caching_error=True, system_instruction=False)
+        client = self.make_client(genai)
+
+        client.analyze_code_changes("+x = 1", "a.py")
+        self.assertIsNone(genai.models[0]["system_instruction"])
+        self.assertTrue(genai.prompts[0].startswith(SYSTEM_INSTRUCTIONS["full"]))
+        self.assertIn("+x = 1", genai.prompts[0])
+
+    def test_cached_content_deleted_on_close(self):
+        """Test that the cached contents of the run are deleted at its end."""
+        genai = FakeGenAI()
+        client = self.make_client(genai)
+        client.analyze_code_changes("+x = 1", "a.py")
+        client.analyze_code_changes("+z = 3", "c.py", model_name="gemini-large")
+
+        client.close()
+        self.assertTrue(all(cached_content["deleted"] for cached_content in genai.cached_contents))
+        client.close()
+        self.assertEqual(len(genai.cached_contents), 2)
+
+    def test_no_cached_content_without_calls(self):
+        """Test that a run without LLM calls creates no cached content."""
+        genai = FakeGenAI()
+        client = self.make_client(genai)
+        client.close()
+        self.assertEqual(genai.cached_contents, [])
+
+    def test_cached_tokens_in_summary(self):
+        """Test that prompt tokens served from cached content are reported in the summary."""
+        genai = FakeGenAI()
+        client = self.make_client(genai)
+        client.analyze_code_changes("+x = 1", "a.py")
+        client.analyze_code_changes("+y = 2", "b.py")
+
+        run_stats = client.get_run_stats()
+        self.assertEqual(run_stats["prompt_cache"], {"calls": 2, "cached_calls": 2, "cached_tokens": 800})
+        self.assertEqual(run_stats["token_usage"]["prompt_tokens"], 1000)
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            print_summary(ResultSink(), run_stats)
+        self.assertIn("Prompt cache: static prefix reused in 2/2 calls (~800 input tokens saved)", output.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Tests for the git helpers of commit-range reviews.
+"""
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from llm_precommit.constants import DEFAULT_DIFF_OPTIONS
+from llm_precommit.utils.git_utils import get_range_diffs, resolve_revision_range
+
+CONTENT = "".join(f"line {i}\n" for i in range(20))
+
+
+class TestRevisionRanges(unittest.TestCase):
+    """Tests for resolving revision ranges and diffing them."""
+
+    def setUp(self):
+        self.old_cwd = os.getcwd()
+        self.repo = tempfile.mkdtemp()
+        os.chdir(self.repo)
+        self.git("init", "-q", "-b", "main")
+        self.git("config", "user.email", "test@example.com")
+        self.git("config", "user.name", "Test")
+        self.write("old.py", CONTENT)
+        self.write("gone.py", "x = 1\n")
+        self.write("app.py", "x = 1\n")
+        self.commit("base")
+
+        self.git("checkout", "-q", "-b", "feature")
+        self.git("mv", "old.py", "new.py")
+        self.write("new.py", CONTENT + "line 20\n")
+        self.git("rm", "-q", "gone.py")
+        self.write("app.py", "x = 2\n")
+        self.commit("feature")
+
+        self.git("checkout", "-q", "main")
+        self.write("main.py", "y = 1\n")
+        self.commit("main")
+
+    def tearDown(self):
+        os.chdir(self.old_cwd)
+        shutil.rmtree(self.repo)
+
+    def git(self, *args: str) -> str:
+        return subprocess.run(["git", *args], check=True, capture_output=True, text=True).stdout.strip()
+
+    def write(self, path: str, content: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def commit(self, message: str) -> None:
+        self.git("add", "-A")
+        self.git("commit", "-q", "-m", message)
+
+    def test_resolve_revision_range(self):
+        """Test two-dot, three-dot and single-revision ranges."""
+        base = self.git("rev-parse", "main~1")
+        self.assertEqual(resolve_revision_range("main..feature"), ("main", "feature"))
+        self.assertEqual(resolve_revision_range("main...feature"), (base, "feature"))
+        self.assertEqual(resolve_revision_range("main~1"), ("main~1", "HEAD"))
+        with self.assertRaises(ValueError):
+            resolve_revision_range("main..missing")
+
+    def test_range_diffs_follow_renames(self):
+        """Test that renamed files are diffed against their old path when renames are detected."""
+        diffs = get_range_diffs("main~1", "feature", diff_options=dict(DEFAULT_DIFF_OPTIONS))
+
+        self.assertEqual(sorted(diffs), ["app.py", "new.py"])
+        self.assertIn("rename from old.py", diffs["new.py"])
+        self.assertIn("+line 20", diffs["new.py"])
+        self.assertNotIn("+line 0", diffs["new.py"])
+        self.assertIn("+x = 2", diffs["app.py"])
+
+    def test_range_diffs_without_renames(self):
+        """Test that renamed files are whole new files when rename detection is disabled."""
+        for diff_options in ({**DEFAULT_DIFF_OPTIONS, "find_renames": None}, None):
+            diffs = get_range_diffs("main~1", "feature", diff_options=diff_options)
+            self.assertEqual(sorted(diffs), ["app.py", "new.py"])
+            self.assertNotIn("rename from", diffs["new.py"])
+            self.assertIn("+line 0", diffs["new.py"])
+
+
+if __name__ == "__main__":
+    unittest.main()
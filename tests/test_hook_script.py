@@ -0,0 +1,141 @@
+"""
+Tests for the hook run as a script, as the installed git hook does.
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from typing import List
+
+from tests.test_openai_client import StubHandler, StubServer, completion
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HOOK_SCRIPT = os.path.join(ROOT_DIR, "llm_precommit", "hooks", "llm_code_review.py")
+
+CONFIG = """llm_type: openai
+base_url: http://127.0.0.1:9/v1
+api_key_env_var: LLM_PRECOMMIT_TEST_KEY
+cache_enabled: false
+symbol_context: false
+"""
+
+
+class TestHookScript(unittest.TestCase):
+    """Tests for the script entry point of the hook."""
+
+    def setUp(self):
+        self.repo = tempfile.mkdtemp()
+        self.git("init", "-q")
+        self.git("config", "user.email", "test@example.com")
+        self.git("config", "user.name", "Test")
+        with open(os.path.join(self.repo, ".llm-precommit.yml"), "w", encoding="utf-8") as f:
+            f.write(CONFIG)
+
+    def tearDown(self):
+        shutil.rmtree(self.repo)
+
+    def git(self, *args: str) -> None:
+        subprocess.run(["git", *args], cwd=self.repo, check=True, capture_output=True)
+
+    def write_file(self, name: str, content: str) -> None:
+        with open(os.path.join(self.repo, name), "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def start_server(self, delay: float = 0, **config: str) -> StubServer:
+        """Start a stub LLM server and point the hook's configuration at it."""
+        server = StubServer(("127.0.0.1", 0), StubHandler)
+        server.requests = []
+        server.delay = delay
+        server.response = (200, completion('```json\n{"issues": [], "summary": "ok"}\n```'))
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+        lines = [CONFIG.replace("http://127.0.0.1:9/v1", base_url)]
+        lines += [f"{key}: {value}\n" for key, value in config.items()]
+        self.write_file(".llm-precommit.yml", "".join(lines))
+        return server
+
+    def hook_command(self, *args: str) -> dict:
+        # The package is importable as when installed
+        env = {**os.environ, "LLM_PRECOMMIT_TEST_KEY": "test-key", "PYTHONPATH": ROOT_DIR}
+        return {"args": [sys.executable, HOOK_SCRIPT, *args], "cwd": self.repo, "env": env, "text": True}
+
+    def run_hook(self, *args: str) -> subprocess.CompletedProcess:
+        return subprocess.run(**self.hook_command(*args), capture_output=True, timeout=60)
+
+    def commit_app(self) -> None:
+        """Commit a first version of app.py."""
+        self.write_file("app.py", "def f(x):\n    return x + 1\n")
+        self.git("add", "app.py")
+        self.git("commit", "-q", "-m", "init")
+
+    def test_no_staged_files(self):
+        """Test that the hook reports when there is nothing to review."""
+        result = self.run_hook()
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn("No staged files found.", result.stdout)
+
+    def test_progress_messages(self):
+        """Test that the progress messages of the pipeline are displayed."""
+        self.commit_app()
+        self.write_file("app.py", "def f(x):\n    return  x + 1\n")
+        self.git("add", "app.py")
+
+        result = self.run_hook()
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn("Skipping app.py: No review needed", result.stdout)
+
+    def test_unstaged_files_passed_as_arguments(self):
+        """Test that files passed outside of a commit are reviewed against HEAD."""
+        server = self.start_server()
+        self.commit_app()
+        self.write_file("app.py", "def f(x):\n    return x - 1\n")
+
+        result = self.run_hook("app.py")
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertNotIn("No changes detected", result.stdout)
+        self.assertEqual(len(server.requests), 1)
+        prompt = "\n".join(message["content"] for message in server.requests[0]["body"]["messages"])
+        self.assertIn("+    return x - 1", prompt)
+
+    def test_staged_files_passed_as_arguments(self):
+        """Test that staged files passed as arguments are reviewed as staged."""
+        server = self.start_server()
+        self.commit_app()
+        self.write_file("app.py", "def f(x):\n    return x - 1\n")
+        self.git("add", "app.py")
+        # Unstaged edits are not part of the commit
+        self.write_file("app.py", "def f(x):\n    return x * 2\n")
+
+        result = self.run_hook("app.py")
+        self.assertEqual(result.returncode, 0, result.stderr)
+        prompt = "\n".join(message["content"] for message in server.requests[0]["body"]["messages"])
+        self.assertIn("+    return x - 1", prompt)
+        self.assertNotIn("+    return x * 2", prompt)
+
+    def test_parallel_workers_share_cache(self):
+        """Test that hook processes running in parallel review a change once."""
+        cache_dir = os.path.join(self.repo, ".git", "review-cache")
+        server = self.start_server(delay=1, cache_enabled="true", cache_dir=cache_dir)
+        self.commit_app()
+        self.write_file("app.py", "def f(x):\n    return x - 1\n")
+        self.git("add", "app.py")
+
+        workers: List[subprocess.Popen] = [
+            subprocess.Popen(**self.hook_command("app.py"), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            for _ in range(2)
+        ]
+        outputs = [worker.communicate(timeout=60) for worker in workers]
+        for worker, (stdout, stderr) in zip(workers, outputs):
+            self.assertEqual(worker.returncode, 0, stderr)
+        self.assertEqual(len(server.requests), 1)
+        self.assertEqual(sum("Review cache: 1 hits" in stdout for stdout, _ in outputs), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
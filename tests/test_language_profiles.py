@@ -0,0 +1,42 @@
+"""
+Tests for the language prompt profiles.
+"""
+import unittest
+
+from llm_precommit.utils.language_profiles import (
+    get_language_profiles,
+    get_language_profile,
+    format_language_section,
+)
+
+
+class TestLanguageProfiles(unittest.TestCase):
+    """Tests for per-language prompt profiles."""
+
+    def test_profile_by_extension(self):
+        """Test that only the file's language is included in the section."""
+        section = format_language_section(get_language_profile("src/app.py", {}))
+        self.assertIn("Python", section)
+        self.assertIn("PEP 8", section)
+        self.assertNotIn("Java", section)
+
+    def test_unknown_extension(self):
+        """Test that files without a profile get no language section."""
+        self.assertEqual(format_language_section(get_language_profile("notes.txt", {})), "")
+
+    def test_user_overrides(self):
+        """Test that user profiles are merged over the defaults."""
+        config = {
+            "language_profiles": {
+                ".py": {"conventions": "the Black code style"},
+                "kt": {"language": "Kotlin"},
+            }
+        }
+        profiles = get_language_profiles(config)
+        self.assertEqual(profiles[".py"]["conventions"], "the Black code style")
+        self.assertEqual(profiles[".py"]["language"], "Python")
+        self.assertEqual(profiles[".kt"]["language"], "Kotlin")
+
+
+if __name__ == "__main__":
+    unittest.main()
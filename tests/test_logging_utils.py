@@ -0,0 +1,63 @@
+"""
+Tests for the logging setup.
+"""
+import io
+import os
+import json
+import logging
+import tempfile
+import contextlib
+import unittest
+
+from llm_precommit.utils.logging_utils import LOGGER_NAME, setup_logging, shutdown_logging
+
+
+class TestLoggingUtils(unittest.TestCase):
+    """Tests for setup_logging."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.logger = logging.getLogger(f"{LOGGER_NAME}.tests")
+
+    def tearDown(self):
+        shutdown_logging()
+        self.temp_dir.cleanup()
+
+    def test_repeated_setup_does_not_duplicate_output(self):
+        """Test that calling setup_logging again replaces the handlers."""
+        setup_logging()
+        setup_logging()
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.logger.info("Analyzing a.py...")
+            self.logger.debug("Using model m for a.py")
+        self.assertEqual(output.getvalue(), "Analyzing a.py...\n")
+
+    def test_verbose_shows_debug_messages(self):
+        """Test that debug messages reach stdout in verbose mode."""
+        setup_logging(verbose=True)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.logger.debug("Using model m for a.py")
+        self.assertEqual(output.getvalue(), "Using model m for a.py\n")
+
+    def test_json_log_file(self):
+        """Test that the log file gets structured records, debug ones included."""
+        log_file = os.path.join(self.temp_dir.name, "logs", "hook.jsonl")
+        setup_logging(log_file=log_file, log_format="json")
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.logger.info("Analyzing a.py...", extra={"file_path": "a.py", "stage": "build_prompts"})
+            self.logger.debug("Reviewed a.py in 1.50s", extra={"file_path": "a.py", "duration_seconds": 1.5})
+        shutdown_logging()
+
+        with open(log_file, "r", encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([r["message"] for r in records], ["Analyzing a.py...", "Reviewed a.py in 1.50s"])
+        self.assertEqual(records[0]["stage"], "build_prompts")
+        self.assertEqual(records[1]["level"], "DEBUG")
+        self.assertEqual(records[1]["duration_seconds"], 1.5)
+        self.assertNotIn("stage", records[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+"""
+Tests for the Prometheus textfile metrics.
+"""
+import os
+import tempfile
+import threading
+import unittest
+
+from llm_precommit.utils.metrics import (
+    collect_run_metrics,
+    format_metrics_text,
+    format_sample_key,
+    parse_metrics_text,
+    update_metrics_file,
+)
+from llm_precommit.utils.result_sink import ResultSink
+
+RESULTS = {
+    "a.py": {"issues": [], "_meta": {"model": "m"}},
+    "b.py": {"issues": [], "_meta": {"cache_hit": True}},
+    "c.py": {"_meta": {"skipped": True, "skip_reason": "whitespace"}},
+    "d.py": {"error": "boom", "parsing_error": "Failed to analyze file"},
+    "e.py": {"issues": [], "_meta": {"model": "m", "duplicate_of": "a.py"}},
+}
+
+SUMMARY = ResultSink()
+for file_path, result in RESULTS.items():
+    SUMMARY.add(file_path, result)
+
+RUN_STATS = {
+    "stage_seconds": {"load": 0.25, "call": 3.5},
+    "llm_calls": {"latencies": [0.7, 3.0], "retries": 1, "errors": 1},
+    "review_cache": {"hits": 1, "misses": 2},
+    "token_usage": {"prompt_tokens": 1200, "response_tokens": 150},
+}
+
+
+class TestMetrics(unittest.TestCase):
+    """Tests for collecting, formatting and merging metrics."""
+
+    def test_collect_run_metrics(self):
+        """Test the samples of one run."""
+        samples = collect_run_metrics(SUMMARY, RUN_STATS, duration=4.2, exit_code=1)
+
+        self.assertEqual(samples[format_sample_key("runs_total", {"exit_code": 1})], 1)
+        self.assertEqual(samples[format_sample_key("hook_duration_seconds_bucket", {"le": "2.5"})], 0)
+        self.assertEqual(samples[format_sample_key("hook_duration_seconds_bucket", {"le": "5.0"})], 1)
+        self.assertEqual(samples[format_sample_key("llm_call_duration_seconds_bucket", {"le": "1.0"})], 1)
+        self.assertEqual(samples[format_sample_key("llm_call_duration_seconds_bucket", {"le": "+Inf"})], 2)
+        self.assertAlmostEqual(samples[format_sample_key("llm_call_duration_seconds_sum")], 3.7)
+        self.assertEqual(samples[format_sample_key("stage_seconds_total", {"stage": "call"})], 3.5)
+        self.assertEqual(samples[format_sample_key("llm_retries_total")], 1)
+        self.assertEqual(samples[format_sample_key("review_cache_misses_total")], 2)
+        for outcome in ("reviewed", "cached", "skipped", "failed", "deduplicated"):
+            self.assertEqual(samples[format_sample_key("files_total", {"outcome": outcome})], 1)
+        self.assertEqual(samples[format_sample_key("skipped_files_total", {"reason": "whitespace"})], 1)
+        self.assertEqual(samples[format_sample_key("tokens_total", {"type": "prompt"})], 1200)
+
+    def test_text_round_trip(self):
+        """Test that formatted samples are read back unchanged, with type declarations."""
+        samples = collect_run_metrics(SUMMARY, RUN_STATS, duration=4.2, exit_code=0)
+        text = format_metrics_text(samples)
+
+        self.assertEqual(parse_metrics_text(text), samples)
+        self.assertIn("# TYPE llm_precommit_hook_duration_seconds histogram", text)
+        self.assertIn("# TYPE llm_precommit_files_total counter", text)
+        self.assertIn('llm_precommit_files_total{outcome="cached"} 1\n', text)
+
+    def test_label_escaping(self):
+        """Test that quotes and backslashes in label values are escaped."""
+        self.assertEqual(format_sample_key("x", {"path": 'a"b\\c'}), 'llm_precommit_x{path="a\\"b\\\\c"}')
+
+    def test_concurrent_updates_are_merged(self):
+        """Test that concurrent runs add up instead of overwriting each other."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "llm_precommit.prom")
+            increments = collect_run_metrics(SUMMARY, RUN_STATS, duration=1.0, exit_code=0)
+            threads = [threading.Thread(target=update_metrics_file, args=(path, increments)) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            with open(path, "r", encoding="utf-8") as f:
+                samples = parse_metrics_text(f.read())
+            self.assertEqual(samples[format_sample_key("runs_total", {"exit_code": 0})], 8)
+            self.assertEqual(samples[format_sample_key("tokens_total", {"type": "response"})], 8 * 150)
+            self.assertIn(format_sample_key("last_run_timestamp_seconds"), samples)
+            self.assertEqual([name for name in os.listdir(temp_dir) if name.endswith(".tmp")], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+"""
+Tests for the model router.
+"""
+import unittest
+
+from llm_precommit.utils.model_router import ModelRouter, count_changed_lines
+
+
+SMALL_DIFF = """diff --git a/app.py b/app.py
+--- a/app.py
++++ b/app.py
+@@ -1,2 +1,2 @@
+-x = 1
++x = 2
+"""
+
+
+class TestModelRouter(unittest.TestCase):
+    """Tests for per-file model routing."""
+
+    def test_count_changed_lines(self):
+        """Test that file headers are not counted as changes."""
+        self.assertEqual(count_changed_lines(SMALL_DIFF), 2)
+
+    def test_default_model(self):
+        """Test that the configured model_name is used when no rule matches."""
+        router = ModelRouter({"llm_type": "gemini", "model_name": "gemini-1.5-flash"})
+        self.assertEqual(router.select_model("app.py", SMALL_DIFF), "gemini-1.5-flash")
+
+    def test_rules_first_match_wins(self):
+        """Test path, size and extension rules in order."""
+        config = {
+            "llm_type": "gemini",
+            "model_name": "gemini-2.0-flash-exp",
+            "model_routing_rules": [
+                {"model": "gemini-1.5-pro", "paths": ["auth/"]},
+                {"model": "gemini-1.5-pro", "min_diff_lines": 10},
+                {"model": "gemini-1.5-flash", "max_diff_lines": 5, "extensions": [".py"]},
+            ],
+        }
+        router = ModelRouter(config)
+        self.assertEqual(router.select_model("src/auth/login.py", SMALL_DIFF), "gemini-1.5-pro")
+        self.assertEqual(router.select_model("src/app.py", SMALL_DIFF), "gemini-1.5-flash")
+        self.assertEqual(router.select_model("src/app.js", SMALL_DIFF), "gemini-2.0-flash-exp")
+
+        large_diff = SMALL_DIFF + "".join(f"+line {i}\n" for i in range(20))
+        self.assertEqual(router.select_model("src/app.py", large_diff), "gemini-1.5-pro")
+
+
+if __name__ == "__main__":
+    unittest.main()
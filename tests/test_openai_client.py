@@ -0,0 +1,190 @@
+"""
+Tests for the OpenAI-compatible client, against a local stub server.
+"""
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm_precommit.constants import RESPONSE_SCHEMAS, SYSTEM_INSTRUCTIONS
+from llm_precommit.utils.llm_client import LLMClientFactory
+from llm_precommit.utils.openai_client import OpenAICompatibleClient
+from llm_precommit.utils.output_utils import OutputFormatter
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Chat completions endpoint answering with the server's canned response."""
+
+    protocol_version = "HTTP/1.1"  # Keep connections alive
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append({"path": self.path, "headers": dict(self.headers), "body": body})
+        time.sleep(self.server.delay)
+        status, payload = self.server.response
+        if "response_format" in body and getattr(self.server, "reject_response_format", False):
+            status, payload = 400, {"error": {"message": "response_format is not supported"}}
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    """Stub server that ignores clients going away, e.g. after a timeout."""
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass
+
+
+def completion(content: str) -> dict:
+    """Build a chat completions response."""
+    return {
+        "choices": [{"message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": 120, "completion_tokens": 30, "prompt_tokens_details": {"cached_tokens": 64}},
+    }
+
+
+class TestOpenAICompatibleClient(unittest.TestCase):
+    """Tests for OpenAICompatibleClient."""
+
+    def setUp(self):
+        self.server = StubServer(("127.0.0.1", 0), StubHandler)
+        self.server.requests = []
+        self.server.delay = 0
+        self.server.response = (200, completion('```json\n{"issues": [], "summary": "ok"}\n```'))
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+        self.thread.start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+        self.client = OpenAICompatibleClient(
+            api_key="test-key",
+            model_name="local-model",
+            base_url=self.base_url,
+            max_retries=0,
+        )
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_registered_with_factory(self):
+        """Test that the client is available as llm_type openai."""
+        client = LLMClientFactory.create("openai", api_key="k", base_url="http://localhost:8000/v1")
+        self.assertIsInstance(client, OpenAICompatibleClient)
+
+    def test_invalid_base_url(self):
+        """Test that a base URL without an http scheme is rejected."""
+        with self.assertRaises(ValueError):
+            OpenAICompatibleClient(api_key="k", base_url="localhost:8000")
+
+    def test_analyze_code_changes(self):
+        """Test the request sent and the parsed result."""
+        result = self.client.analyze_code_changes(diff="+x = 1", file_path="a.py")
+
+        self.assertEqual(result["summary"], "ok")
+        self.assertEqual(result["_meta"]["prompt_tokens"], 120)
+        self.assertEqual(result["_meta"]["response_tokens"], 30)
+        request = self.server.requests[0]
+        self.assertEqual(request["path"], "/v1/chat/completions")
+        self.assertEqual(request["headers"]["Authorization"], "Bearer test-key")
+        self.assertEqual(request["body"]["model"], "local-model")
+        self.assertEqual([m["role"] for m in request["body"]["messages"]], ["system", "user"])
+        # The default profile requests every field the output displays
+        self.assertEqual(request["body"]["messages"][0]["content"], SYSTEM_INSTRUCTIONS["full"])
+        self.assertIn("+x = 1", request["body"]["messages"][1]["content"])
+        self.assertEqual(self.client.get_run_stats()["prompt_cache"]["cached_tokens"], 64)
+
+    def test_lean_structured_output(self):
+        """Test that the lean profile requests only its fields, with their schema."""
+        client = OpenAICompatibleClient(api_key="k", base_url=self.base_url, response_profile="lean")
+        client.analyze_code_changes(diff="+x = 1", file_path="a.py")
+        client.close()
+
+        body = self.server.requests[0]["body"]
+        self.assertEqual(body["messages"][0]["content"], SYSTEM_INSTRUCTIONS["lean"])
+        self.assertEqual(body["response_format"]["json_schema"]["schema"], RESPONSE_SCHEMAS["lean"])
+        self.assertNotIn("explanation", json.dumps(body["response_format"]))
+
+    def test_lean_fields_are_displayed(self):
+        """Test that the lean profile requests exactly the fields the output displays."""
+        schema = RESPONSE_SCHEMAS["lean"]["properties"]
+        result = {"general_feedback": "feedback-text", "file_type": "file-type-text"}
+        for field in ("issues", "coding_convention_issues", "security_concerns"):
+            result[field] = [{key: f"{field}-{key}" for key in schema[field]["items"]["properties"]}]
+            result[field][0]["severity"] = "low"
+        output = OutputFormatter().format_analysis_result(result, "a.py")
+
+        self.assertNotIn("summary", schema)
+        for field, value in result.items():
+            for text in ([value] if isinstance(value, str) else value[0].values()):
+                if text != "low":
+                    self.assertIn(text, output, field)
+
+    def test_full_profile_without_structured_output(self):
+        """Test the full profile with plain JSON instructions."""
+        client = OpenAICompatibleClient(
+            api_key="k",
+            base_url=self.base_url,
+            response_profile="full",
+            structured_output=False,
+        )
+        client.analyze_code_changes(diff="+x = 1", file_path="a.py")
+        client.close()
+
+        body = self.server.requests[0]["body"]
+        self.assertIn('"explanation"', body["messages"][0]["content"])
+        self.assertNotIn("response_format", body)
+
+    def test_unknown_response_profile(self):
+        """Test that an unknown response profile is rejected."""
+        with self.assertRaises(ValueError):
+            OpenAICompatibleClient(api_key="k", base_url="http://localhost:8000/v1", response_profile="tiny")
+
+    def test_structured_output_fallback(self):
+        """Test that servers rejecting response_format get plain requests for the rest of the run."""
+        self.server.reject_response_format = True
+        first = self.client.analyze_code_changes(diff="+x = 1", file_path="a.py")
+        second = self.client.analyze_code_changes(diff="+y = 2", file_path="b.py")
+
+        self.assertEqual(first["summary"], "ok")
+        self.assertEqual(second["summary"], "ok")
+        self.assertEqual(["response_format" in r["body"] for r in self.server.requests], [True, False, False])
+
+    def test_connections_are_reused(self):
+        """Test that consecutive calls share one keep-alive connection."""
+        for _ in range(3):
+            self.client.analyze_code_changes(diff="+x = 1", file_path="a.py")
+        self.assertEqual(self.client.get_run_stats()["http"], {"requests": 3, "connections": 1})
+
+    def test_overload_error(self):
+        """Test that 429 responses are reported as overload once retries are exhausted."""
+        self.server.response = (429, {"error": {"message": "rate limited"}})
+        result = self.client.analyze_code_changes(diff="+x = 1", file_path="a.py")
+        self.assertIn("overloaded", result["parsing_error"])
+
+    def test_http_error(self):
+        """Test that other error statuses become an error result."""
+        self.server.response = (404, {"error": {"message": "model not found"}})
+        result = self.client.analyze_code_changes(diff="+x = 1", file_path="a.py")
+        self.assertIn("404", result["error"])
+        self.assertIn("model not found", result["error"])
+
+    def test_read_timeout(self):
+        """Test that a server not answering in time gives an error result."""
+        self.client.pool.read_timeout = 0.1
+        self.server.delay = 0.5
+        result = self.client.analyze_code_changes(diff="+x = 1", file_path="a.py")
+        self.assertEqual(result["parsing_error"], "Failed to call OpenAI-compatible API")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Tests for the streaming pipeline helpers.
+"""
+import threading
+import time
+import unittest
+
+from llm_precommit.utils.pipeline import StageTimer, bounded_map
+
+
+class TestPipeline(unittest.TestCase):
+    """Tests for bounded_map and StageTimer."""
+
+    def test_results_in_input_order(self):
+        """Test that results keep the input order whatever the completion order."""
+        def slow_for_small(n):
+            time.sleep(0.01 * (5 - n))
+            return n * n
+
+        self.assertEqual(list(bounded_map(slow_for_small, range(5), max_workers=5, max_pending=5)),
+                         [0, 1, 4, 9, 16])
+
+    def test_items_are_pulled_lazily(self):
+        """Test that no more than max_pending items are taken ahead of the consumer."""
+        pulled = []
+
+        def items():
+            for n in range(100):
+                pulled.append(n)
+                yield n
+
+        consumed = 0
+        for _ in bounded_map(lambda n: n, items(), max_workers=2, max_pending=3):
+            consumed += 1
+            self.assertLessEqual(len(pulled) - consumed, 3)
+        self.assertEqual(consumed, 100)
+
+    def test_concurrency(self):
+        """Test that items are processed concurrently up to max_workers."""
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def work(n):
+            with lock:
+                active.append(n)
+                peak.append(len(active))
+            time.sleep(0.02)
+            with lock:
+                active.remove(n)
+            return n
+
+        list(bounded_map(work, range(8), max_workers=4, max_pending=8))
+        self.assertEqual(max(peak), 4)
+
+    def test_early_stop_cancels_queued_work(self):
+        """Test that closing the stream stops pulling and running items."""
+        calls = []
+
+        def work(n):
+            calls.append(n)
+            time.sleep(0.01)
+            return n
+
+        stream = bounded_map(work, range(100), max_workers=1, max_pending=2)
+        self.assertEqual(next(stream), 0)
+        stream.close()
+        self.assertLess(len(calls), 5)
+
+    def test_stage_timer(self):
+        """Test that each stage is charged only for its own work."""
+        timer = StageTimer()
+
+        def slow(items, delay):
+            for item in items:
+                time.sleep(delay)
+                yield item
+
+        items = timer.wrap("outer", slow(timer.wrap("inner", slow(range(3), 0.02)), 0.01))
+        self.assertEqual(list(items), [0, 1, 2])
+        self.assertAlmostEqual(timer.seconds["inner"], 0.06, delta=0.03)
+        self.assertAlmostEqual(timer.seconds["outer"], 0.03, delta=0.03)
+
+
+if __name__ == "__main__":
+    unittest.main()
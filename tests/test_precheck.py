@@ -0,0 +1,104 @@
+"""
+Tests for the fast precheck of the installed hook.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from llm_precommit.constants import CACHE_DIR_NAME, DEFAULT_CONFIG_PATHS
+from llm_precommit.hooks import precheck
+from llm_precommit.utils.config import compile_precheck_rules
+
+SHA_A = "a" * 40
+SHA_B = "b" * 40
+ZERO_SHA = "0" * 40
+
+
+def raw_entry(status: str, path: str, new_sha: str = SHA_B) -> str:
+    """Build one record of `git diff --cached --raw -z --no-abbrev`."""
+    return f":100644 100644 {SHA_A} {new_sha} {status}\0{path}\0"
+
+
+class TestPrecheck(unittest.TestCase):
+    """Tests for the precheck helpers."""
+
+    def setUp(self):
+        self.rules = compile_precheck_rules({
+            "include_extensions": [".py"],
+            "exclude_patterns": ["vendor/", "test_*"],
+        })
+        self.temp_dir = tempfile.mkdtemp()
+        self.state_path = precheck.get_state_path(self.temp_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_constants_match_package(self):
+        """Test that the duplicated constants match the package's."""
+        self.assertEqual(precheck.CACHE_DIR_NAME, CACHE_DIR_NAME)
+        self.assertEqual(precheck.CONFIG_PATHS, DEFAULT_CONFIG_PATHS)
+
+    def test_parse_staged_changes(self):
+        """Test parsing of the raw NUL-separated diff."""
+        output = raw_entry("M", "a.py") + raw_entry("D", "old file.py", ZERO_SHA)
+        self.assertEqual(precheck.parse_staged_changes(output), [
+            ("M", SHA_B, "a.py"),
+            ("D", ZERO_SHA, "old file.py"),
+        ])
+        self.assertEqual(precheck.parse_staged_changes(""), [])
+
+    def test_select_changes(self):
+        """Test that deleted, excluded and other files are dropped."""
+        changes = [
+            ("M", SHA_B, "src/app.py"),
+            ("D", ZERO_SHA, "src/gone.py"),
+            ("A", SHA_B, "README.md"),
+            ("M", SHA_B, "vendor/lib.py"),
+            ("M", SHA_B, "tests/test_app.py"),
+        ]
+        self.assertEqual(precheck.select_changes(changes, self.rules), [("M", SHA_B, "src/app.py")])
+
+    def test_check_without_state(self):
+        """Test that the reviewer runs when no state was saved yet."""
+        self.assertIsNone(precheck.check(precheck.load_state(self.state_path), []))
+
+    def test_check_no_matching_files(self):
+        """Test that the review is skipped when no staged file matches the rules."""
+        precheck.save_state(self.state_path, self.rules, None)
+        state = precheck.load_state(self.state_path)
+        self.assertEqual(precheck.check(state, [("M", SHA_B, "README.md")]), precheck.NO_MATCHING_FILES)
+        self.assertIsNone(precheck.check(state, [("M", SHA_B, "app.py")]))
+
+    def test_check_already_reviewed(self):
+        """Test that staged changes that passed are skipped until they change."""
+        changes = [("M", SHA_B, "app.py")]
+        fingerprint = precheck.compute_fingerprint(changes, self.rules)
+        precheck.save_state(self.state_path, self.rules, fingerprint)
+        state = precheck.load_state(self.state_path)
+        self.assertEqual(precheck.check(state, changes), precheck.ALREADY_REVIEWED)
+        self.assertIsNone(precheck.check(state, [("M", SHA_A, "app.py")]))
+
+    def test_check_config_changed(self):
+        """Test that rules of another configuration are not used."""
+        precheck.save_state(self.state_path, self.rules, None)
+        state = precheck.load_state(self.state_path)
+        with patch.object(precheck, "get_config_signatures", return_value={"other": [1, 2]}):
+            self.assertIsNone(precheck.check(state, [("M", SHA_B, "README.md")]))
+
+    def test_check_all_files_mode(self):
+        """Test that the precheck never skips when all files are checked."""
+        rules = compile_precheck_rules({"check_all_files": True})
+        precheck.save_state(self.state_path, rules, None)
+        self.assertIsNone(precheck.check(precheck.load_state(self.state_path), []))
+
+    def test_main_with_arguments(self):
+        """Test that any argument runs the full reviewer."""
+        with patch("sys.argv", ["precheck.py", "--verbose"]):
+            self.assertEqual(precheck.main(), 1)
+        self.assertFalse(os.path.exists(self.state_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+"""
+Tests for the sink of the results of a run.
+"""
+import os
+import tempfile
+import unittest
+
+from llm_precommit.constants import BUDGET_SKIP_REASON
+from llm_precommit.utils.result_sink import ResultSink
+from llm_precommit.utils.sharding import merge_results_json
+
+
+class TestResultSink(unittest.TestCase):
+    """Tests for counting and streaming results."""
+
+    def test_counts(self):
+        """Test the counts of the summary, exit code and metrics."""
+        sink = ResultSink()
+        sink.add("a.py", {"issues": [{}], "_meta": {"cache_hit": True}})
+        sink.add("b.py", {"security_concerns": [{}], "coding_convention_issues": [{}]})
+        sink.add("c.py", {"_meta": {"skipped": True, "skip_reason": BUDGET_SKIP_REASON}})
+        sink.add("d.py", {"error": "boom", "parsing_error": "Failed to analyze file"})
+
+        self.assertEqual(sink.files, 4)
+        self.assertEqual(
+            (sink.files_with_issues, sink.files_with_convention_issues, sink.files_with_security_concerns),
+            (1, 1, 1),
+        )
+        self.assertEqual(sink.incomplete_files, 2)
+        self.assertEqual(sink.outcomes, {"cached": 1, "reviewed": 1, "skipped": 1, "failed": 1})
+        self.assertEqual(sink.skip_reasons, {BUDGET_SKIP_REASON: 1})
+
+    def test_json_output(self):
+        """Test that streamed results are written in the format read by the merge."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "results.json")
+            sink = ResultSink(path, shard="1/2")
+            sink.add("a.py", {"issues": [{"description": "x"}]})
+            sink.add('b "quoted".py', {"issues": []})
+            self.assertFalse(os.path.exists(path))
+            sink.finish({"token_usage": {"calls": 2}}, exit_code=1)
+            sink.close()
+
+            results, run_stats, exit_code = merge_results_json([path])
+            self.assertEqual(list(results), ["a.py", 'b "quoted".py'])
+            self.assertEqual(run_stats["token_usage"]["calls"], 2)
+            self.assertEqual(exit_code, 1)
+            self.assertEqual(os.listdir(temp_dir), ["results.json"])
+
+    def test_unfinished_output_is_discarded(self):
+        """Test that a run that fails leaves no partial output."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            sink = ResultSink(os.path.join(temp_dir, "results.json"))
+            sink.add("a.py", {"issues": []})
+            sink.close()
+            self.assertEqual(os.listdir(temp_dir), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
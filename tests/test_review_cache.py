@@ -0,0 +1,162 @@
+"""
+Tests for the review result cache.
+"""
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from llm_precommit.utils.file_lock import FileLock
+from llm_precommit.utils.git_utils import get_patch_id, split_diff_by_file
+from llm_precommit.utils.review_cache import PRUNE_MARKER_NAME, ReviewCache, normalize_diff_for_cache
+
+
+class TestReviewCache(unittest.TestCase):
+    """Tests for ReviewCache and range diff helpers."""
+
+    def setUp(self):
+        """Create a temporary cache directory."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = ReviewCache(self.temp_dir.name, ttl_days=1)
+
+    def tearDown(self):
+        """Remove the temporary cache directory."""
+        self.temp_dir.cleanup()
+
+    def test_put_and_get(self):
+        """Test that stored results are returned without their metadata."""
+        key = ReviewCache.make_key(model="m", diff="d")
+        self.assertIsNone(self.cache.get(key))
+
+        self.cache.put(key, {"summary": "ok", "issues": [], "_meta": {"model": "m"}})
+        self.assertEqual(self.cache.get(key), {"summary": "ok", "issues": []})
+        self.assertNotEqual(key, ReviewCache.make_key(model="m", diff="other"))
+
+    def test_failed_results_are_not_cached(self):
+        """Test that results with parsing errors are not stored."""
+        key = ReviewCache.make_key(model="m")
+        self.cache.put(key, {"error": "boom", "parsing_error": "Failed"})
+        self.assertIsNone(self.cache.get(key))
+        # Partly reviewed, e.g. a large file with failed chunks
+        self.cache.put(key, {"issues": [], "error": "1 of 3 chunks could not be reviewed"})
+        self.assertIsNone(self.cache.get(key))
+
+    def test_expired_entries_are_removed(self):
+        """Test that entries older than the TTL are ignored and deleted."""
+        key = ReviewCache.make_key(model="m")
+        self.cache.put(key, {"summary": "ok"})
+        path = self.cache._path(key)
+        self.cache.ttl_seconds = 0
+        time.sleep(0.01)
+
+        self.assertIsNone(self.cache.get(key))
+        self.assertFalse(os.path.exists(path))
+
+    def test_prune(self):
+        """Test that expired entries and leftover files are pruned about once a day."""
+        old_key, new_key = ReviewCache.make_key(model="old"), ReviewCache.make_key(model="new")
+        self.cache.put(old_key, {"summary": "old"})
+        old_path = self.cache._path(old_key)
+        old_files = [old_path, old_path + ".lock", os.path.join(os.path.dirname(old_path), "tmpabc.tmp")]
+        for path in old_files[1:]:
+            open(path, "w").close()
+        two_days_ago = time.time() - 2 * 24 * 3600
+        for path in old_files:
+            os.utime(path, (two_days_ago, two_days_ago))
+        os.utime(os.path.join(self.temp_dir.name, PRUNE_MARKER_NAME), (two_days_ago, two_days_ago))
+
+        # The next write prunes, since the last pruning is older than a day
+        self.cache.put(new_key, {"summary": "new"})
+        self.assertEqual([path for path in old_files if os.path.exists(path)], [])
+        self.assertEqual(self.cache.get(new_key), {"summary": "new"})
+
+        # Not again within the day
+        open(old_files[1], "w").close()
+        os.utime(old_files[1], (two_days_ago, two_days_ago))
+        self.cache.put(old_key, {"summary": "old"})
+        self.assertTrue(os.path.exists(old_files[1]))
+        self.assertEqual(self.cache.prune(), 1)
+
+    def test_single_flight(self):
+        """Test that a concurrent request for the same key waits for the first result."""
+        key = ReviewCache.make_key(model="m")
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return {"summary": "ok"}
+
+        outcomes = []
+        first = threading.Thread(target=lambda: outcomes.append(self.cache.get_or_compute(key, compute)))
+        first.start()
+        time.sleep(0.05)
+        second = self.cache.get_or_compute(key, compute)
+        first.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(outcomes, [({"summary": "ok"}, False)])
+        self.assertEqual(second, ({"summary": "ok"}, True))
+        self.assertFalse(os.path.exists(self.cache._path(key) + ".lock"))
+
+    def test_single_flight_failure_is_recomputed(self):
+        """Test that failed results are not shared with waiting processes."""
+        key = ReviewCache.make_key(model="m")
+        result, from_cache = self.cache.get_or_compute(key, lambda: {"error": "x", "parsing_error": "Failed"})
+        self.assertFalse(from_cache)
+        self.assertEqual(self.cache.get_or_compute(key, lambda: {"summary": "ok"}), ({"summary": "ok"}, False))
+
+    def test_file_lock_timeout(self):
+        """Test that a held lock times out for other holders."""
+        path = os.path.join(self.temp_dir.name, "locks", "a.lock")
+        with FileLock(path) as acquired:
+            self.assertTrue(acquired)
+            self.assertFalse(FileLock(path, timeout=0.1).acquire())
+        with FileLock(path, timeout=0.1) as acquired:
+            self.assertTrue(acquired)
+
+    def test_patch_results_are_shifted(self):
+        """Test that results stored by patch ID follow the hunks to their new lines."""
+        key = ReviewCache.make_key(index="patch-id", patch_id="p")
+        self.cache.put_patch_result(key, {
+            "summary": "ok",
+            "issues": [{"description": "a", "line_number": "12"}, {"description": "b", "line_number": "41-43"}],
+            "security_concerns": [{"description": "c"}],
+        }, [10, 40])
+
+        result = self.cache.get_patch_result(key, [15, 52])
+        self.assertEqual([i["line_number"] for i in result["issues"]], ["17", "53-55"])
+        self.assertEqual(result["security_concerns"], [{"description": "c"}])
+        self.assertIsNone(self.cache.get_patch_result(key, [15]))
+
+    def test_patch_id_ignores_line_numbers(self):
+        """Test that the same patch at another position has the same patch ID."""
+        diff = "diff --git a/x.py b/x.py\n--- a/x.py\n+++ b/x.py\n@@ -10,2 +10,2 @@ def f():\n a = 1\n-b = 2\n+b = 3\n"
+        moved = diff.replace("@@ -10,2 +10,2 @@", "@@ -25,2 +27,2 @@")
+        patch_id = get_patch_id(diff)
+        self.assertTrue(patch_id)
+        self.assertEqual(get_patch_id(moved), patch_id)
+        self.assertNotEqual(get_patch_id(diff.replace("+b = 3", "+b = 4")), patch_id)
+
+    def test_normalize_diff_for_cache(self):
+        """Test that index lines do not affect the cache key."""
+        staged = "diff --git a/x.py b/x.py\nindex 111..222 100644\n+x = 1"
+        committed = "diff --git a/x.py b/x.py\nindex 333..444 100644\n+x = 1"
+        self.assertEqual(normalize_diff_for_cache(staged), normalize_diff_for_cache(committed))
+
+    def test_split_diff_by_file(self):
+        """Test splitting a multi-file diff."""
+        diff = (
+            "diff --git a/a.py b/a.py\n--- a/a.py\n+++ b/a.py\n@@ -1 +1 @@\n-a\n+b\n"
+            "diff --git a/dir/b.js b/dir/b.js\n--- /dev/null\n+++ b/dir/b.js\n@@ -0,0 +1 @@\n+c\n"
+        )
+        diffs = split_diff_by_file(diff)
+
+        self.assertEqual(list(diffs), ["a.py", "dir/b.js"])
+        self.assertTrue(diffs["a.py"].startswith("diff --git a/a.py"))
+        self.assertIn("+c", diffs["dir/b.js"])
+
+
+if __name__ == "__main__":
+    unittest.main()
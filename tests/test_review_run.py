@@ -0,0 +1,140 @@
+"""
+Tests for the stages of a review run.
+"""
+import contextlib
+import io
+import threading
+import unittest
+from typing import Any, Dict, List, Optional
+
+from llm_precommit.hooks.llm_code_review import ReviewRun
+from llm_precommit.utils.model_router import ModelRouter
+from llm_precommit.utils.output_utils import OutputFormatter
+from llm_precommit.utils.result_sink import ResultSink
+
+CONFIG = {
+    "llm_type": "openai",
+    "cache_enabled": False,
+    "symbol_context": False,
+    "triage_trivial_changes": False,
+    "two_phase_review": True,
+}
+
+DIFF = """diff --git a/{path} b/{path}
+--- a/{path}
++++ b/{path}
+@@ -1,2 +1,2 @@
+-x = 1
++x = 2
+ y = 3
+"""
+
+
+class FakeClient:
+    """LLM client returning canned responses."""
+
+    def __init__(self, suspicious: List[str]):
+        self.suspicious = suspicious
+        self.screened: List[str] = []
+        self.reviewed: List[str] = []
+        self.lock = threading.Lock()
+
+    def screen_hunks(self, prompt: str, model_name: Any = None) -> Dict[str, Any]:
+        self.screened.append(prompt)
+        return {"suspicious": self.suspicious, "_meta": {"prompt_tokens": 50, "response_tokens": 5}}
+
+    def analyze_code_changes(self, diff: str, file_path: str, **kwargs: Any) -> Dict[str, Any]:
+        with self.lock:
+            self.reviewed.append(file_path)
+        return {"issues": [], "summary": "ok", "_meta": {"prompt_tokens": 100, "response_tokens": 10}}
+
+
+def make_run(client: FakeClient, **config: Any) -> ReviewRun:
+    """Create a run that does not record usage on the machine."""
+    config = {**CONFIG, **config}
+    run = ReviewRun(config, client, OutputFormatter(), ModelRouter(config))
+    run.usage_ledger = None
+    return run
+
+
+def make_jobs(run: ReviewRun, *paths: str, content: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Build the prompts of files changed with the same edit."""
+    loaded = [
+        {"file_path": path, "diff": DIFF.format(path=path), "file_content": content or f"# {path}\n",
+         "large_file": False}
+        for path in paths
+    ]
+    return list(run.build_prompts(loaded))
+
+
+class TestReviewRun(unittest.TestCase):
+    """Tests for the stages of the review pipeline."""
+
+    def test_screening_reserves_tokens(self):
+        """Test that screening calls are reserved before being sent, and settled."""
+        client = FakeClient(suspicious=["f0h0"])
+        run = make_run(client)
+        jobs = make_jobs(run, "a.py", "b.py")
+        reserved = run.token_budget.reserved
+
+        run.screen_batch(jobs)
+        self.assertEqual(len(client.screened), 1)
+        self.assertEqual(run.token_budget.reserved, reserved)
+        self.assertEqual(run.token_budget.used, 55)
+        self.assertIn("two_phase", jobs[0])
+        self.assertEqual(jobs[1]["result"]["_meta"]["two_phase"]["flagged_hunks"], 0)
+        self.assertEqual(run.get_run_stats()["two_phase"]["files_cleared"], 1)
+
+    def test_screening_skipped_without_budget(self):
+        """Test that files are reviewed in full when the screening call does not fit the budget."""
+        client = FakeClient(suspicious=[])
+        run = make_run(client)
+        jobs = make_jobs(run, "a.py", "b.py")
+        # The reviews of the batch take up the whole budget
+        run.token_budget.limit = run.token_budget.reserved
+
+        run.screen_batch(jobs)
+        self.assertEqual(client.screened, [])
+        self.assertFalse(any("result" in job for job in jobs))
+        self.assertEqual(run.phase_stats["screening_calls"], 0)
+
+    def test_identical_changes_reviewed_once(self):
+        """Test that copies of a change share the result of its review."""
+        client = FakeClient(suspicious=[])
+        run = make_run(client, two_phase_review=False)
+        jobs = make_jobs(run, "a.py", "vendor/a.py", content="x = 2\ny = 3\n")
+        self.assertIs(jobs[1]["duplicate_of"], jobs[0]["dedup"])
+
+        results = [run.call(job)["result"] for job in jobs]
+        self.assertEqual(client.reviewed, ["a.py"])
+        self.assertEqual(results[1]["summary"], "ok")
+        self.assertEqual(results[1]["_meta"]["duplicate_of"], "a.py")
+        self.assertEqual(run.get_run_stats()["dedup"], {"duplicates": 1})
+
+    def test_leaders_released_after_rendering(self):
+        """Test that the results of identical changes are not kept once they are rendered."""
+        client = FakeClient(suspicious=[])
+        run = make_run(client, two_phase_review=False)
+        jobs = [run.call(job) for job in make_jobs(run, "a.py", "vendor/a.py", content="x = 2\ny = 3\n")]
+        leader = jobs[0]["dedup"]
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            rendered = run.render(iter(jobs))
+            next(rendered)
+            self.assertIn(leader["key"], run.dedup_leaders)
+            list(rendered)
+        self.assertEqual(run.dedup_leaders, {})
+        self.assertIsNone(leader["result"])
+
+        # A later copy is a new leader, reviewed again without the review cache
+        sink = ResultSink()
+        for job in make_jobs(run, "copy/a.py", content="x = 2\ny = 3\n"):
+            with contextlib.redirect_stdout(io.StringIO()):
+                for file_path, result in run.render(iter([run.call(job)])):
+                    sink.add(file_path, result)
+        self.assertEqual(client.reviewed, ["a.py", "copy/a.py"])
+        self.assertEqual(sink.outcomes, {"reviewed": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+"""
+Tests for the review order.
+"""
+import unittest
+
+from llm_precommit.constants import DEFAULT_RISK_RULES
+from llm_precommit.utils.scheduling import get_risk_score, prioritize_files
+
+RULES = [
+    {"weight": 3, "paths": ["auth/"]},
+    {"weight": 1, "min_diff_lines": 100},
+    {"weight": -2, "paths": ["tests/"]},
+]
+
+
+class TestScheduling(unittest.TestCase):
+    """Tests for risk scoring and prioritization."""
+
+    def test_get_risk_score(self):
+        """Test that the weights of all matching rules add up."""
+        self.assertEqual(get_risk_score("auth/login.py", 150, RULES), 4)
+        self.assertEqual(get_risk_score("tests/test_auth.py", 10, RULES), -2)
+        self.assertEqual(get_risk_score("app.py", 10, RULES), 0)
+        self.assertEqual(get_risk_score("app.py", 10, [{"paths": ["app"]}]), 1)
+
+    def test_riskiest_then_shortest_first(self):
+        """Test the order by risk, then diff size, then original order."""
+        files = ["tests/test_app.py", "b.py", "big.py", "a.py", "auth/views.py"]
+        weights = {"tests/test_app.py": 1, "b.py": 20, "big.py": 500, "a.py": 20, "auth/views.py": 40}
+
+        self.assertEqual(
+            prioritize_files(files, weights, RULES),
+            ["auth/views.py", "big.py", "b.py", "a.py", "tests/test_app.py"],
+        )
+
+    def test_default_rules(self):
+        """Test that the default rules put security-sensitive code before tests and docs."""
+        files = ["docs/index.md", "src/util.py", "src/session_store.py"]
+        weights = dict.fromkeys(files, 10)
+        self.assertEqual(
+            prioritize_files(files, weights, DEFAULT_RISK_RULES),
+            ["src/session_store.py", "src/util.py", "docs/index.md"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
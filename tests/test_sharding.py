@@ -0,0 +1,59 @@
+"""
+Tests for sharding review work across runners.
+"""
+import json
+import os
+import tempfile
+import unittest
+
+from llm_precommit.utils.sharding import (
+    parse_shard_spec,
+    shard_files,
+    write_results_json,
+    merge_results_json,
+)
+
+
+class TestSharding(unittest.TestCase):
+    """Tests for shard selection and merging."""
+
+    def test_parse_shard_spec(self):
+        """Test valid and invalid shard specifications."""
+        self.assertEqual(parse_shard_spec("2/4"), (2, 4))
+        for spec in ("0/4", "5/4", "1", "a/b"):
+            with self.assertRaises(ValueError):
+                parse_shard_spec(spec)
+
+    def test_shards_partition_files_balanced_by_weight(self):
+        """Test that shards are disjoint, complete and balanced by diff size."""
+        files = ["big.py", "a.py", "b.py", "c.py", "d.py"]
+        weights = {"big.py": 400, "a.py": 100, "b.py": 100, "c.py": 100, "d.py": 100}
+        shards = [shard_files(files, weights, i, 2) for i in (1, 2)]
+
+        self.assertEqual(sorted(shards[0] + shards[1]), sorted(files))
+        self.assertEqual(shards[0], ["big.py"])
+        self.assertEqual(shards[1], ["a.py", "b.py", "c.py", "d.py"])
+        self.assertEqual(shard_files(files, weights, 1, 1), files)
+
+    def test_merge_results(self):
+        """Test merging per-shard outputs."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            first = os.path.join(temp_dir, "1.json")
+            second = os.path.join(temp_dir, "2.json")
+            write_results_json(first, {"a.py": {"issues": []}}, {"prompt_cache": {"calls": 2}}, 0, "1/2")
+            write_results_json(second, {"b.py": {"issues": [{}]}}, {"prompt_cache": {"calls": 3}}, 1, "2/2")
+
+            results, run_stats, exit_code = merge_results_json([first, second])
+            self.assertEqual(sorted(results), ["a.py", "b.py"])
+            self.assertEqual(run_stats["prompt_cache"]["calls"], 5)
+            self.assertEqual(exit_code, 1)
+
+            bogus = os.path.join(temp_dir, "bogus.json")
+            with open(bogus, "w", encoding="utf-8") as f:
+                json.dump({"results": {}}, f)
+            with self.assertRaises(ValueError):
+                merge_results_json([bogus])
+
+
+if __name__ == "__main__":
+    unittest.main()
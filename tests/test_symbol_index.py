@@ -0,0 +1,96 @@
+"""
+Tests for the local symbol index.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from llm_precommit.utils import symbol_index
+from llm_precommit.utils.symbol_index import SymbolIndex, extract_symbols, extract_python_symbols
+
+
+class TestSymbolIndex(unittest.TestCase):
+    """Tests for symbol extraction and related-definition lookup."""
+
+    def test_extract_python_symbols(self):
+        """Test classes, methods and multi-line signatures."""
+        source = (
+            "class Store:\n"
+            "    def save(self, key,\n"
+            "             value=None) -> bool:\n"
+            "        return True\n"
+            "\n"
+            "async def fetch(url): return url\n"
+        )
+        symbols = {s["name"]: s for s in extract_python_symbols(source)}
+
+        self.assertEqual(symbols["Store"]["kind"], "class")
+        self.assertEqual(symbols["save"]["signature"], "Store: def save(self, key, value=None) -> bool")
+        self.assertEqual(symbols["save"]["line"], 2)
+        self.assertEqual(symbols["fetch"]["signature"], "async def fetch(url)")
+        self.assertEqual(extract_python_symbols("def broken(:"), [])
+
+    def test_extract_regex_symbols(self):
+        """Test the scanners for languages without a parser."""
+        js = "export async function load(id) {\n  return id;\n}\nconst add = (a, b) => a + b;\n"
+        self.assertEqual(
+            [(s["name"], s["signature"]) for s in extract_symbols("a.js", js)],
+            [("load", "export async function load(id)"), ("add", "const add = (a, b) => a + b;")],
+        )
+        go = "func (s *Server) Handle(w http.ResponseWriter) error {\n}\n"
+        self.assertEqual(extract_symbols("a.go", go)[0]["name"], "Handle")
+
+    def test_build_related_section(self):
+        """Test that only referenced symbols of other files are added, within budget."""
+        index = SymbolIndex("/nonexistent/symbols.json")
+        index.files = {"util.py": "sha1", "use.py": "sha2"}
+        index.blobs = {
+            "sha1": {"symbols": extract_python_symbols("def compute_total(items):\n    pass\n\ndef unused():\n    pass\n")},
+            "sha2": {"symbols": extract_python_symbols("def local_helper():\n    pass\n")},
+        }
+        diff = "@@ -1 +1,2 @@\n+total = compute_total(items)\n+local_helper()\n"
+
+        section = index.build_related_section("use.py", diff, token_budget=200)
+        self.assertIn("- util.py:1: def compute_total(items)", section)
+        self.assertNotIn("unused", section)
+        self.assertNotIn("local_helper", section)
+        self.assertEqual(index.build_related_section("use.py", diff, token_budget=5), "")
+
+    def test_update_saves_only_changes(self):
+        """Test that the index file is only rewritten when blobs are added, refreshed or pruned."""
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        index_path = os.path.join(temp_dir, "symbols.json")
+        blobs = {"a.py": "sha1"}
+        contents = {"sha1": "def a():\n    pass\n", "sha2": "def b():\n    pass\n"}
+
+        def update(now: float) -> bool:
+            """Update the index at a given time, returning whether it was saved."""
+            index = SymbolIndex(index_path)
+            with patch.object(symbol_index, "_list_blobs", return_value=dict(blobs)), \
+                    patch.object(symbol_index, "_read_blobs", lambda shas: [(sha, contents[sha]) for sha in shas]), \
+                    patch.object(symbol_index.time, "time", return_value=now), \
+                    patch.object(SymbolIndex, "_save", autospec=True, side_effect=SymbolIndex._save) as save:
+                index.update()
+            return save.called
+
+        day = 24 * 3600
+        self.assertTrue(update(0))
+        self.assertFalse(update(3600))
+        # Last use of live blobs is refreshed once a day
+        self.assertTrue(update(day + 1))
+        self.assertFalse(update(day + 3600))
+
+        # New blobs are added; blobs no longer used are pruned after the retention period
+        blobs["b.py"] = "sha2"
+        self.assertTrue(update(day + 7200))
+        del blobs["a.py"]
+        self.assertFalse(update(2 * day))
+        self.assertTrue(update(symbol_index.SYMBOL_INDEX_RETENTION_DAYS * day + 2 * day))
+        self.assertEqual(set(SymbolIndex(index_path)._load()), {"sha2"})
+
+
+if __name__ == "__main__":
+    unittest.main()
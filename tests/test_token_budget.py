@@ -0,0 +1,80 @@
+"""
+Tests for token accounting and budgets.
+"""
+import os
+import tempfile
+import unittest
+
+from llm_precommit.utils.chunking import merge_chunk_results
+from llm_precommit.utils.llm_client import BaseLLMClient
+from llm_precommit.utils.token_budget import TokenBudget, DailyUsageLedger, compute_cost
+
+
+class UsageClient(BaseLLMClient):
+    """Client reporting token usage like a provider without usage metadata."""
+
+    def __init__(self):
+        super().__init__(api_key="key", model_name="model-a")
+
+    def _call_llm(self, prompt, model_name=None, system_instruction=None, response_schema=None):
+        return self._record_token_usage(
+            {"issues": []},
+            model_name or self.model_name,
+            prompt_tokens=None,
+            response_tokens=None,
+            prompt=self._combine_prompt(prompt, system_instruction),
+            response_text="x" * 40,
+        )
+
+
+class TestTokenBudget(unittest.TestCase):
+    """Tests for token usage capture, budgets and the daily ledger."""
+
+    def test_budget_reservations(self):
+        """Test that reservations cannot exceed the limit until settled."""
+        budget = TokenBudget(100)
+        self.assertTrue(budget.reserve(60))
+        self.assertFalse(budget.reserve(50))
+        budget.settle(60, 20)
+        self.assertTrue(budget.reserve(50))
+        self.assertTrue(TokenBudget(None).reserve(10 ** 9))
+
+    def test_daily_ledger(self):
+        """Test that daily totals accumulate across ledger instances."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "usage.json")
+            DailyUsageLedger(path).add(100)
+            DailyUsageLedger(path).add(50)
+            self.assertEqual(DailyUsageLedger(path).get_today(), 150)
+
+    def test_usage_is_estimated_without_metadata(self):
+        """Test the offline estimate and the per-run totals."""
+        client = UsageClient()
+        result = client.analyze_code_changes("+x = 1", "a.py")
+
+        self.assertTrue(result["_meta"]["tokens_estimated"])
+        self.assertEqual(result["_meta"]["response_tokens"], 10)
+        usage = client.get_run_stats()["token_usage"]
+        self.assertEqual(usage["calls"], 1)
+        self.assertEqual(usage["estimated_calls"], 1)
+        self.assertEqual(usage["by_model"]["model-a"]["prompt_tokens"], result["_meta"]["prompt_tokens"])
+
+    def test_compute_cost(self):
+        """Test cost computation from per-model prices."""
+        usage = {"by_model": {"a": {"prompt_tokens": 1_000_000, "response_tokens": 500_000}, "b": {}}}
+        self.assertAlmostEqual(compute_cost(usage, {"a": {"input": 0.1, "output": 0.4}}), 0.3)
+        self.assertIsNone(compute_cost(usage, {}))
+
+    def test_chunk_token_counts_are_summed(self):
+        """Test that token counts of chunked reviews add up."""
+        results = [
+            {"issues": [], "_meta": {"prompt_tokens": 10, "response_tokens": 2}},
+            {"issues": [], "_meta": {"prompt_tokens": 5, "response_tokens": 1}},
+        ]
+        merged = merge_chunk_results(results, ["", ""])
+        self.assertEqual(merged["_meta"]["prompt_tokens"], 15)
+        self.assertEqual(merged["_meta"]["response_tokens"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
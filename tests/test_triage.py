@@ -0,0 +1,106 @@
+"""
+Tests for the local triage of trivial changes.
+"""
+import unittest
+
+from llm_precommit.utils.triage import (
+    classify_diff_change,
+    classify_python_change,
+    classify_trivial_change,
+)
+
+
+def make_diff(removed, added):
+    """Build a minimal single-hunk diff."""
+    lines = ["diff --git a/f b/f", "--- a/f", "+++ b/f", "@@ -1,1 +1,1 @@"]
+    lines += [f"-{line}" for line in removed] + [f"+{line}" for line in added]
+    return "\n".join(lines) + "\n"
+
+
+OLD_PY = '''import sys
+import os
+
+
+def add(a, b):
+    """Add two numbers."""
+    return a + b
+'''
+
+
+class TestTriage(unittest.TestCase):
+    """Tests for trivial change classification."""
+
+    def test_lockfile_and_rename(self):
+        """Test path-based and rename-based classification."""
+        self.assertEqual(classify_trivial_change("web/package-lock.json", ""), "lockfile")
+        self.assertEqual(classify_trivial_change("src/new.js", "", rename_similarity=100), "rename")
+
+    def test_diff_heuristics(self):
+        """Test whitespace, comment and import reordering detection."""
+        self.assertEqual(
+            classify_diff_change("a.c", make_diff(["if (x) {  return 1; }"], ["if (x) {", "  return 1;", "}"])),
+            "whitespace",
+        )
+        self.assertEqual(
+            classify_diff_change("a.js", make_diff(["// old note"], ["// new note", "/* block */"])),
+            "comment",
+        )
+        self.assertEqual(
+            classify_diff_change("a.ts", make_diff(["import a from 'a';", "import b from 'b';"],
+                                                   ["import b from 'b';", "import a from 'a';"])),
+            "import-order",
+        )
+        self.assertIsNone(classify_diff_change("a.js", make_diff(["return 1;"], ["return 2;"])))
+
+    def test_whitespace_inside_tokens(self):
+        """Test that joined tokens and spaces in string literals need a review."""
+        self.assertIsNone(classify_diff_change("a.js", make_diff(['say("Hello world");'], ['say("Helloworld");'])))
+        self.assertIsNone(classify_diff_change("a.js", make_diff(['say("Hello world");'], ['say("Hello  world");'])))
+        self.assertIsNone(classify_diff_change("a.go", make_diff(["x := a - -b"], ["x := a --b"])))
+        self.assertEqual(
+            classify_diff_change("a.js", make_diff(['say("Hello world");'], ['    say("Hello world");'])),
+            "whitespace",
+        )
+        # Automatic semicolon insertion returns undefined; Go no longer compiles
+        self.assertIsNone(classify_diff_change("a.js", make_diff(["return x + y;"], ["return", "x + y;"])))
+        self.assertIsNone(classify_diff_change("a.go", make_diff(["return x + y"], ["return", "x + y"])))
+        self.assertEqual(
+            classify_diff_change("a.ts", make_diff(["return x + y;  "], ["", "    return x + y;"])),
+            "whitespace",
+        )
+        # Indentation changes the structure of YAML
+        self.assertIsNone(classify_diff_change("a.yaml", make_diff(["  key: 1"], ["key: 1"])))
+
+    def test_block_comments(self):
+        """Test that block comments are followed across the lines of a hunk."""
+        diff = "\n".join([
+            "--- a/a.c", "+++ b/a.c", "@@ -1,4 +1,4 @@",
+            " /*", "- * Old note", "+ * New note", " */", " int x;",
+        ]) + "\n"
+        self.assertEqual(classify_diff_change("a.c", diff), "comment")
+        # Pointer dereferences are code
+        self.assertIsNone(classify_diff_change("a.c", make_diff(["*ptr = 1;"], ["*ptr = 0;"])))
+        # Removing the delimiters uncomments the code between them
+        uncommented = "\n".join([
+            "--- a/a.c", "+++ b/a.c", "@@ -1,3 +1,1 @@", "-/*", " x = 1;", "-*/",
+        ]) + "\n"
+        self.assertIsNone(classify_diff_change("a.c", uncommented))
+        self.assertIsNone(classify_diff_change("a.js", make_diff(["x = 1; /* a */"], ["x = 2; /* a */"])))
+
+    def test_python_ast(self):
+        """Test AST-based classification of Python changes."""
+        comment = OLD_PY.replace("return a + b", "return a + b  # sum")
+        docstring = OLD_PY.replace("Add two numbers.", "Return the sum of a and b.")
+        imports = OLD_PY.replace("import sys\nimport os", "import os\nimport sys")
+        logic = OLD_PY.replace("a + b", "a - b")
+
+        self.assertEqual(classify_python_change(OLD_PY, OLD_PY + "\n\n"), "whitespace")
+        self.assertEqual(classify_python_change(OLD_PY, comment), "comment")
+        self.assertEqual(classify_python_change(OLD_PY, docstring), "docstring")
+        self.assertEqual(classify_python_change(OLD_PY, imports), "import-order")
+        self.assertIsNone(classify_python_change(OLD_PY, logic))
+        self.assertIsNone(classify_python_change(OLD_PY, "def broken(:\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+"""
+Tests for the two-phase review helpers.
+"""
+import unittest
+
+from llm_precommit.utils.two_phase import (
+    build_screening_prompt,
+    keep_hunks,
+    label_hunks,
+    make_cleared_result,
+    parse_flagged_hunks,
+)
+
+DIFF = """diff --git a/app.py b/app.py
+--- a/app.py
++++ b/app.py
+@@ -1,2 +1,2 @@
+-x = 1
++x = 2
+ y = 3
+@@ -10,2 +10,3 @@ def f():
+     a = 1
++    b = a / 0
+     return a
+"""
+
+
+class TestTwoPhase(unittest.TestCase):
+    """Tests for screening and hunk selection."""
+
+    def test_label_hunks(self):
+        """Test that hunks get per-file ids with their text."""
+        hunks = label_hunks(3, "app.py", DIFF)
+        self.assertEqual([hunk_id for hunk_id, _, _ in hunks], ["f3h0", "f3h1"])
+        self.assertTrue(hunks[1][2].startswith("@@ -10,2 +10,3 @@ def f():"))
+        self.assertIn("+    b = a / 0", hunks[1][2])
+
+    def test_screening_prompt(self):
+        """Test that the prompt labels every hunk with its file."""
+        prompt = build_screening_prompt(label_hunks(0, "app.py", DIFF))
+        self.assertIn("### Hunk f0h0 (app.py)", prompt)
+        self.assertIn("### Hunk f0h1 (app.py)", prompt)
+
+    def test_parse_flagged_hunks(self):
+        """Test parsing of the screening response, failing open on bad responses."""
+        self.assertEqual(parse_flagged_hunks({"suspicious": ["f0h1", " f1h0 "]}), {"f0h1", "f1h0"})
+        self.assertEqual(parse_flagged_hunks({"suspicious": []}), set())
+        self.assertIsNone(parse_flagged_hunks({"issues": []}))
+        self.assertIsNone(parse_flagged_hunks({"raw_response": "?", "parsing_error": "Invalid JSON"}))
+
+    def test_keep_hunks(self):
+        """Test that kept hunks keep their original line numbers."""
+        reduced = keep_hunks(DIFF, {1})
+        self.assertTrue(reduced.startswith("diff --git a/app.py b/app.py"))
+        self.assertNotIn("+x = 2", reduced)
+        self.assertIn("@@ -10,2 +10,3 @@ def f():", reduced)
+
+    def test_cleared_result(self):
+        """Test that a cleared file has no findings and records the phases."""
+        result = make_cleared_result({"hunks": 2, "flagged_hunks": 0})
+        self.assertEqual(result["issues"], [])
+        self.assertEqual(result["_meta"]["two_phase"]["hunks"], 2)
+        self.assertNotIn("skipped", result["_meta"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+Tests for the detection of newly staged changes.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from llm_precommit.utils.watch import IndexWatcher
+
+
+class TestIndexWatcher(unittest.TestCase):
+    """Tests for IndexWatcher."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.index_path = os.path.join(self.temp_dir, "index")
+        self.now = 0.0
+        self.watcher = IndexWatcher(self.index_path, debounce_seconds=2.0, clock=lambda: self.now)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def stage(self, content: str) -> None:
+        """Rewrite the index with a new modification time."""
+        with open(self.index_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.utime(self.index_path, ns=(int(self.now * 1e9), int(self.now * 1e9)))
+
+    def test_no_index(self):
+        """Test that a missing index is never reported."""
+        self.assertFalse(self.watcher.poll())
+
+    def test_reported_after_debounce(self):
+        """Test that a new index state is reported once it has settled."""
+        self.stage("a")
+        self.assertFalse(self.watcher.poll())
+        self.now = 1.0
+        self.assertFalse(self.watcher.poll())
+        self.now = 2.5
+        self.assertTrue(self.watcher.poll())
+
+    def test_burst_of_changes_restarts_debounce(self):
+        """Test that staging again before the debounce delays the report."""
+        self.stage("a")
+        self.watcher.poll()
+        self.now = 1.5
+        self.stage("ab")
+        self.assertFalse(self.watcher.poll())
+        self.now = 3.0
+        self.assertFalse(self.watcher.poll())
+        self.now = 3.5
+        self.assertTrue(self.watcher.poll())
+
+    def test_reviewed_state_not_reported_again(self):
+        """Test that a reviewed state is only reported again after a change."""
+        self.stage("a")
+        self.watcher.poll()
+        self.now = 2.0
+        self.assertTrue(self.watcher.poll())
+        self.watcher.mark_reviewed()
+        self.now = 10.0
+        self.assertFalse(self.watcher.poll())
+        self.stage("ab")
+        self.watcher.poll()
+        self.now = 12.0
+        self.assertTrue(self.watcher.poll())
+
+    def test_locked_index_not_reported(self):
+        """Test that nothing is reported while git holds the index lock."""
+        self.stage("a")
+        self.watcher.poll()
+        self.now = 5.0
+        open(self.index_path + ".lock", "w").close()
+        self.assertFalse(self.watcher.poll())
+        os.remove(self.index_path + ".lock")
+        self.assertTrue(self.watcher.poll())
+
+
+if __name__ == "__main__":
+    unittest.main()